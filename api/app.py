@@ -1,18 +1,42 @@
+# Only the hardware libraries (board, busio, adafruit_max31865, picamera2) are deferred to the
+# startup warm-up. FastAPI, NumPy and the route modules below are still imported here: the
+# routes have to be registered before uvicorn serves /livez, and NumPy backs the history ring
+# allocated in startup_event
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from config import RTD_NOMINAL, REF_RESISTOR, WIRES, CS_NAME
+from config import RTD_NOMINAL, REF_RESISTOR, WIRES, CS_NAME, INTERLOCK_ENABLED
 from logger import logger
-from hardware import HARDWARE_AVAILABLE
+from hardware import HARDWARE_AVAILABLE, get_sampler
+from controller import get_controller
+from heater_output import get_heater_output
+from history import get_history
+from recipes import get_recipe_executor
+from autotune import get_autotuner
+from telemetry import get_broadcaster
+from metrics import MetricsMiddleware
+from startup import get_startup
+from hardware_actor import get_hardware_actor
+from interlock import get_interlock
+from diagnostics import get_diagnostics
 
 # Import individual route files
 from routes import (
     root,
     health,
     temperature_get,
+    temperature_history,
     logs,
     camera,
+    telemetry_stream,
     heater_set,
-    heater_control
+    heater_control,
+    heater_autotune,
+    heater_model,
+    recipe_program,
+    sessions,
+    metrics,
+    safety,
+    diagnostics
 )
 
 app = FastAPI(title="Pi Sensor/GPIO API (Docker)")
@@ -28,6 +52,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Count and time every request per route for /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Log startup configuration
 logger.info(f"Starting Smart Oven API with config: RTD={RTD_NOMINAL}, REF={REF_RESISTOR}, WIRES={WIRES}, CS={CS_NAME}")
 
@@ -35,12 +62,56 @@ logger.info(f"Starting Smart Oven API with config: RTD={RTD_NOMINAL}, REF={REF_R
 app.include_router(root.router, tags=["health"])
 app.include_router(health.router, tags=["health"])
 app.include_router(temperature_get.router, tags=["temperature"])
+app.include_router(temperature_history.router, tags=["temperature"])
 app.include_router(logs.router, tags=["debug"])
+app.include_router(metrics.router, tags=["debug"])
+app.include_router(diagnostics.router, tags=["debug"])
 app.include_router(camera.router, tags=["camera"])
+app.include_router(telemetry_stream.router, tags=["telemetry"])
 app.include_router(heater_set.router, tags=["heater"])
 app.include_router(heater_control.router, tags=["heater-control"])
+app.include_router(heater_autotune.router, tags=["heater-control"])
+app.include_router(heater_model.router, tags=["heater-control"])
+app.include_router(recipe_program.router, tags=["recipes"])
+app.include_router(sessions.router, tags=["sessions"])
+app.include_router(safety.router, tags=["safety"])
 
 @app.on_event("startup")
 async def startup_event():
     logger.info("Smart Oven API starting up...")
     logger.info(f"Hardware available: {HARDWARE_AVAILABLE}")
+    
+    # Record every sample in the history; the sampler itself starts once the sensor is warmed up
+    get_sampler().add_listener(get_history().record_snapshot)
+    
+    # Watch the samples for over-temperature, sensor errors and stale readings
+    if HARDWARE_AVAILABLE and INTERLOCK_ENABLED:
+        get_interlock().start()
+    
+    # Import hardware libraries and open the sensor, heater GPIOs and camera in the background,
+    # so requests are served right away while /readyz reports progress
+    get_startup().start()
+    
+    # Push live telemetry to subscribed dashboards
+    get_broadcaster().start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    logger.info("Smart Oven API shutting down...")
+    # First, so stopping the sampler below doesn't trip it
+    get_interlock().stop()
+    await get_broadcaster().stop()
+    recipe_executor = get_recipe_executor()
+    if recipe_executor.is_running:
+        recipe_executor.stop()
+    autotuner = get_autotuner()
+    if autotuner.is_running:
+        autotuner.stop()
+    controller = get_controller()
+    if controller.is_running:
+        controller.stop()
+    get_heater_output().stop()
+    get_sampler().stop()
+    get_diagnostics().shutdown()
+    # Last, so the heater cutoffs above still reach the GPIOs
+    get_hardware_actor().stop()
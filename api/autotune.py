@@ -0,0 +1,283 @@
+# Import logger first to avoid circular imports
+from logger import logger
+import math
+import time
+import threading
+from enum import Enum
+from hardware import get_sampler, set_outputs
+from controller import HeaterMode, HEATER_MODE_GPIOS, get_controller
+from heater_output import get_heater_output
+from sessions import get_session_recorder
+from tunings import save_autotune_result
+from config import (
+    BACK_HEATER_GPIO, FRONT_HEATER_GPIO, HEATER_LOOP_MAX_SAMPLE_AGE, SENSOR_SAMPLE_INTERVAL,
+    AUTOTUNE_HYSTERESIS, AUTOTUNE_CYCLES, AUTOTUNE_TIMEOUT, AUTOTUNE_MAX_OVERSHOOT
+)
+
+# Relay output levels; the relay amplitude d is half their difference
+RELAY_HIGH = 1.0
+RELAY_LOW = 0.0
+
+class TuningRule(str, Enum):
+    CLASSIC = "classic"                # Ziegler-Nichols: fastest, roughly 25% overshoot
+    SOME_OVERSHOOT = "some_overshoot"  # Ziegler-Nichols variant with less overshoot
+    NO_OVERSHOOT = "no_overshoot"      # Ziegler-Nichols variant tuned to avoid overshoot
+
+# (Kp / Ku, Ti / Pu, Td / Pu) for each rule
+TUNING_RULES = {
+    TuningRule.CLASSIC: (0.6, 0.5, 0.125),
+    TuningRule.SOME_OVERSHOOT: (0.33, 0.5, 1.0 / 3.0),
+    TuningRule.NO_OVERSHOOT: (0.2, 0.5, 1.0 / 3.0),
+}
+
+class AutotuneState(str, Enum):
+    IDLE = "idle"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    STOPPED = "stopped"
+
+# --- Global autotuner instance ---
+_autotuner = None
+_autotuner_lock = threading.Lock()
+
+class RelayAutotuner:
+    """Relay-feedback (Åström-Hägglund) PID autotuning experiment
+    
+    The elements are switched fully on below `setpoint - hysteresis` and
+    fully off above `setpoint + hysteresis`, which makes the oven oscillate
+    around the setpoint. From the oscillation amplitude `a` and period `Pu`
+    the ultimate gain is Ku = 4d / (π·sqrt(a² - ε²)), where d is the relay
+    amplitude and ε the hysteresis. PID gains follow from Ku and Pu using one
+    of TUNING_RULES and are saved for the controller.
+    """
+    
+    def __init__(self, interval: float = SENSOR_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.state = AutotuneState.IDLE
+        self.setpoint = None
+        self.hysteresis = AUTOTUNE_HYSTERESIS
+        self.cycles = AUTOTUNE_CYCLES
+        self.mode = HeaterMode.BOTH
+        self.rule = TuningRule.NO_OVERSHOOT
+        self.relay_on = False
+        self.started_at = None
+        self.ended_at = None
+        self.message = None
+        self.result = None
+        self._switch_on_times = []  # Monotonic times the relay switched on
+        self._peaks = []            # Highest temperature of each off half-cycle
+        self._troughs = []          # Lowest temperature of each on half-cycle
+        self._extreme = None
+        self._started_monotonic = None
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self, setpoint: float, hysteresis: float = AUTOTUNE_HYSTERESIS, cycles: int = AUTOTUNE_CYCLES,
+              mode: HeaterMode = HeaterMode.BOTH, rule: TuningRule = TuningRule.NO_OVERSHOOT):
+        """Start the relay experiment around the setpoint
+        
+        Raises:
+            Exception: If an experiment or the heater control loop is already running
+        """
+        if self.is_running:
+            raise Exception("Autotune is already running")
+        if get_controller().is_running:
+            raise Exception("Stop the heater control loop before autotuning")
+        
+        self.setpoint = setpoint
+        self.hysteresis = hysteresis
+        self.cycles = cycles
+        self.mode = HeaterMode(mode)
+        self.rule = TuningRule(rule)
+        self.state = AutotuneState.RUNNING
+        self.started_at = time.time()
+        self.ended_at = None
+        self.message = None
+        self.result = None
+        self.relay_on = False
+        self._switch_on_times = []
+        self._peaks = []
+        self._troughs = []
+        self._extreme = None
+        self._started_monotonic = time.monotonic()
+        
+        # The relay drives the GPIOs directly, so keep the output stage off them
+        get_heater_output().release()
+        try:
+            get_session_recorder().start({
+                "kind": "autotune",
+                "target_temperature": setpoint,
+                "mode": self.mode.value,
+                "hysteresis": hysteresis,
+                "sample_interval": self.interval
+            })
+        except Exception as e:
+            logger.error(f"Failed to start bake session recording: {e}")
+        
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="pid-autotune", daemon=True)
+        self._thread.start()
+        logger.info(f"PID autotune started: setpoint={setpoint}°C, hysteresis={hysteresis}°C, "
+                    f"cycles={cycles}, mode={self.mode.value}, rule={self.rule.value}")
+    
+    def stop(self):
+        """Abort the experiment and turn the heaters off"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2 + 1.0)
+            self._thread = None
+        if self.state == AutotuneState.RUNNING:
+            self._finish(AutotuneState.STOPPED, "Stopped by request")
+    
+    def _run(self):
+        next_tick = time.monotonic()
+        try:
+            while not self._stop_event.is_set() and self.state == AutotuneState.RUNNING:
+                self._step(time.monotonic())
+                next_tick += self.interval
+                self._stop_event.wait(max(0.0, next_tick - time.monotonic()))
+        except Exception as e:
+            logger.error(f"PID autotune failed: {e}")
+            self._finish(AutotuneState.FAILED, str(e))
+        finally:
+            self._set_relay(False)
+    
+    def _step(self, now: float):
+        snapshot = get_sampler().get_snapshot()
+        if snapshot is None or not snapshot.ok or snapshot.age_ms() > HEATER_LOOP_MAX_SAMPLE_AGE * 1000.0:
+            self._finish(AutotuneState.FAILED, "No fresh temperature sample available")
+            return
+        temperature = snapshot.temperature
+        
+        if temperature > self.setpoint + AUTOTUNE_MAX_OVERSHOOT:
+            self._finish(AutotuneState.FAILED, f"Temperature {temperature:.1f}°C exceeded the safety limit")
+            return
+        if now - self._started_monotonic > AUTOTUNE_TIMEOUT:
+            self._finish(AutotuneState.FAILED, f"No stable oscillation within {AUTOTUNE_TIMEOUT} s")
+            return
+        
+        # Track the extreme of the current half-cycle
+        if self._extreme is None:
+            self._extreme = temperature
+        elif self.relay_on:
+            self._extreme = min(self._extreme, temperature)
+        else:
+            self._extreme = max(self._extreme, temperature)
+        
+        if not self.relay_on and temperature < self.setpoint - self.hysteresis:
+            if self._switch_on_times:
+                self._peaks.append(self._extreme)
+            self._switch_on_times.append(now)
+            self._extreme = temperature
+            self._set_relay(True)
+        elif self.relay_on and temperature > self.setpoint + self.hysteresis:
+            if len(self._switch_on_times) > 1:
+                self._troughs.append(self._extreme)
+            self._extreme = temperature
+            self._set_relay(False)
+        if self.state != AutotuneState.RUNNING:
+            # The relay write failed and aborted the experiment
+            return
+        
+        get_session_recorder().record(temperature, self.setpoint, (0.0, 0.0, 0.0),
+                                      RELAY_HIGH if self.relay_on else RELAY_LOW,
+                                      self.mode.value if self.relay_on else HeaterMode.OFF.value, snapshot.faults)
+        
+        # The first cycle starts from an arbitrary temperature, so it is not measured
+        if len(self._switch_on_times) >= self.cycles + 2:
+            self._complete()
+    
+    def _complete(self):
+        periods = [b - a for a, b in zip(self._switch_on_times[1:], self._switch_on_times[2:])]
+        peaks = self._peaks[-len(periods):]
+        troughs = self._troughs[-len(periods):]
+        amplitude = (sum(peaks) / len(peaks) - sum(troughs) / len(troughs)) / 2.0
+        if amplitude <= self.hysteresis:
+            self._finish(AutotuneState.FAILED, f"Oscillation amplitude {amplitude:.2f}°C is within the hysteresis")
+            return
+        
+        relay_amplitude = (RELAY_HIGH - RELAY_LOW) / 2.0
+        ultimate_gain = 4.0 * relay_amplitude / (math.pi * math.sqrt(amplitude ** 2 - self.hysteresis ** 2))
+        ultimate_period = sum(periods) / len(periods)
+        
+        kp_factor, ti_factor, td_factor = TUNING_RULES[self.rule]
+        kp = kp_factor * ultimate_gain
+        ki = kp / (ti_factor * ultimate_period)
+        kd = kp * td_factor * ultimate_period
+        
+        self.result = {
+            "setpoint": self.setpoint,
+            "mode": self.mode.value,
+            "rule": self.rule.value,
+            "ultimate_gain": ultimate_gain,
+            "ultimate_period": ultimate_period,
+            "amplitude": amplitude,
+            "hysteresis": self.hysteresis,
+            "periods": periods,
+            "tunings": {"kp": kp, "ki": ki, "kd": kd},
+            "completed_at": time.time()
+        }
+        save_autotune_result(self.result)
+        self._finish(AutotuneState.COMPLETED,
+                     f"Ku={ultimate_gain:.4f}, Pu={ultimate_period:.1f}s -> Kp={kp:.4f}, Ki={ki:.5f}, Kd={kd:.3f}")
+    
+    def _set_relay(self, on: bool):
+        self.relay_on = on
+        energized = HEATER_MODE_GPIOS[self.mode] if on else ()
+        try:
+            set_outputs({gpio_num: gpio_num in energized for gpio_num in (BACK_HEATER_GPIO, FRONT_HEATER_GPIO)})
+        except Exception as e:
+            logger.error(f"Failed to set heater GPIOs: {e}")
+            # The relay state is unknown, so the oscillation can't be trusted any more
+            if self.state == AutotuneState.RUNNING:
+                self._finish(AutotuneState.FAILED, f"Relay write failed: {e}")
+    
+    def _finish(self, state: AutotuneState, message: str):
+        # Leave RUNNING first so a failing relay write here doesn't finish twice
+        self.state = state
+        self._set_relay(False)
+        self.message = message
+        self.ended_at = time.time()
+        self._stop_event.set()
+        get_session_recorder().stop()
+        if state == AutotuneState.COMPLETED:
+            logger.info(f"PID autotune completed: {message}")
+        else:
+            logger.warning(f"PID autotune {state.value}: {message}")
+    
+    def get_status(self):
+        """Get experiment progress for the API"""
+        measured = max(0, len(self._switch_on_times) - 2)
+        return {
+            "state": self.state.value,
+            "setpoint": self.setpoint,
+            "hysteresis": self.hysteresis,
+            "mode": self.mode.value,
+            "rule": self.rule.value,
+            "relay_on": self.relay_on,
+            "cycles_measured": min(measured, self.cycles),
+            "cycles_required": self.cycles,
+            "peaks": self._peaks,
+            "troughs": self._troughs,
+            "started_at": self.started_at,
+            "ended_at": self.ended_at,
+            "elapsed": None if self._started_monotonic is None or self.state != AutotuneState.RUNNING
+                       else round(time.monotonic() - self._started_monotonic, 1),
+            "message": self.message,
+            "result": self.result
+        }
+
+def get_autotuner() -> RelayAutotuner:
+    """Get global PID autotuner instance"""
+    global _autotuner
+    
+    with _autotuner_lock:
+        if _autotuner is None:
+            _autotuner = RelayAutotuner(interval=SENSOR_SAMPLE_INTERVAL)
+    
+    return _autotuner
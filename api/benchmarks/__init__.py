@@ -0,0 +1 @@
+# Load tests and benchmarks for the Smart Oven API
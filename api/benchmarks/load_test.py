@@ -0,0 +1,516 @@
+# API load test: starts the app on the simulated hardware backend (or targets --url),
+# drives each scenario at a fixed concurrency and reports latency percentiles,
+# throughput, stream frame rates and server RSS/CPU as JSON.
+#
+# Usage, from the api/ directory:
+#   python -m benchmarks.load_test --duration 10 --concurrency 8 --output results/after.json
+#   python -m benchmarks.load_test --baseline results/before.json      # run, then compare
+#   python -m benchmarks.load_test --compare results/before.json results/after.json
+#
+# Only the standard library is used so the same script runs on the Pi.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Seconds to wait for a launched server to answer /health
+SERVER_START_TIMEOUT = 30.0
+# Seconds between server RSS/CPU samples
+RESOURCE_SAMPLE_INTERVAL = 0.2
+# Multipart boundary the MJPEG stream separates frames with
+FRAME_BOUNDARY = b"--frame\r\n"
+
+class Scenario(NamedTuple):
+    name: str
+    method: str
+    path: str
+    body: Optional[dict] = None
+    stream: bool = False  # Long-lived MJPEG stream measured in frames/s instead of requests
+
+SCENARIOS = {
+    scenario.name: scenario for scenario in (
+        Scenario("temperature", "GET", "/temperature"),
+        Scenario("heater_control", "POST", "/heater/control", {"target_temperature": 180.0}),
+        Scenario("heater_status", "GET", "/heater/status"),
+        Scenario("camera_snapshot", "GET", "/camera/snapshot?quality=85"),
+        Scenario("camera_stream", "GET", "/camera/stream?profile=dashboard", stream=True),
+    )
+}
+
+# Metrics compared by --compare/--baseline, and whether a higher value is better
+COMPARED_METRICS = {
+    "throughput_rps": True,
+    "p50_ms": False,
+    "p99_ms": False,
+    "error_rate": False,
+    "fps_per_client": True,
+    "total_fps": True,
+    "rss_peak_mb": False,
+    "cpu_percent": False,
+}
+
+# --- HTTP client ---
+
+class HttpConnection:
+    """Minimal HTTP/1.1 keep-alive client on asyncio streams"""
+    
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+    
+    async def request(self, method: str, path: str, body: Optional[dict] = None):
+        """Send a request and read the whole response
+        
+        Returns:
+            (status code, response body)
+        """
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode() if body is not None else b""
+        headers = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", "Connection: keep-alive"]
+        if body is not None:
+            headers += ["Content-Type: application/json", f"Content-Length: {len(payload)}"]
+        self._writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + payload)
+        
+        try:
+            status, response_headers = await _read_head(self._reader)
+            if response_headers.get("transfer-encoding") == "chunked":
+                content = await _read_chunked(self._reader)
+            else:
+                content = await self._reader.readexactly(int(response_headers.get("content-length", "0")))
+        except Exception:
+            await self.close()
+            raise
+        if response_headers.get("connection") == "close":
+            await self.close()
+        return status, content
+    
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except Exception:
+                pass
+            self._reader = self._writer = None
+
+async def _read_head(reader: asyncio.StreamReader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Server closed the connection")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip().lower()
+    return status, headers
+
+async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+    parts = []
+    while True:
+        size = int((await reader.readline()).split(b";")[0], 16)
+        if size == 0:
+            await reader.readline()
+            return b"".join(parts)
+        parts.append(await reader.readexactly(size))
+        await reader.readline()
+
+# --- Measurements ---
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000.0, 3)
+
+class ResourceMonitor:
+    """Samples a process's resident memory and CPU time from /proc while a scenario runs"""
+    
+    def __init__(self, pid: Optional[int]):
+        self.pid = pid
+        self.rss_samples = []
+        self._cpu_start = None
+        self._wall_start = None
+        self._task = None
+    
+    def _rss_mb(self) -> Optional[float]:
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) / 1024.0
+        except OSError:
+            return None
+        return None
+    
+    def _cpu_seconds(self) -> Optional[float]:
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            # utime and stime are fields 14 and 15 of /proc/<pid>/stat
+            return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        except (OSError, ValueError, IndexError):
+            return None
+    
+    async def _sample(self):
+        while True:
+            rss = self._rss_mb()
+            if rss is not None:
+                self.rss_samples.append(rss)
+            await asyncio.sleep(RESOURCE_SAMPLE_INTERVAL)
+    
+    def start(self):
+        if self.pid is None:
+            return
+        self._cpu_start = self._cpu_seconds()
+        self._wall_start = time.monotonic()
+        self._task = asyncio.ensure_future(self._sample())
+    
+    async def stop(self) -> dict:
+        if self._task is None:
+            return {}
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        cpu_end = self._cpu_seconds()
+        wall = time.monotonic() - self._wall_start
+        result = {
+            "rss_peak_mb": round(max(self.rss_samples), 1) if self.rss_samples else None,
+            "rss_end_mb": round(self.rss_samples[-1], 1) if self.rss_samples else None,
+            "cpu_percent": None
+        }
+        if self._cpu_start is not None and cpu_end is not None and wall > 0:
+            result["cpu_percent"] = round((cpu_end - self._cpu_start) / wall * 100.0, 1)
+        return result
+
+async def run_requests(host: str, port: int, scenario: Scenario, concurrency: int, duration: float) -> dict:
+    """Hammer one endpoint with `concurrency` keep-alive clients for `duration` seconds"""
+    latencies = []
+    statuses = {}
+    errors = 0
+    deadline = time.monotonic() + duration
+    
+    async def worker():
+        nonlocal errors
+        connection = HttpConnection(host, port)
+        try:
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    status, _ = await connection.request(scenario.method, scenario.path, scenario.body)
+                except Exception:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+                if status >= 400:
+                    errors += 1
+        finally:
+            await connection.close()
+    
+    started = time.monotonic()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.monotonic() - started
+    
+    latencies.sort()
+    completed = len(latencies)
+    return {
+        "concurrency": concurrency,
+        "requests": completed,
+        "errors": errors,
+        "error_rate": round(errors / max(1, completed), 4),
+        "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+        "throughput_rps": round(completed / elapsed, 1),
+        "mean_ms": _ms(sum(latencies) / completed if completed else None),
+        "p50_ms": _ms(percentile(latencies, 0.50)),
+        "p90_ms": _ms(percentile(latencies, 0.90)),
+        "p99_ms": _ms(percentile(latencies, 0.99)),
+        "max_ms": _ms(latencies[-1] if latencies else None)
+    }
+
+async def run_stream(host: str, port: int, scenario: Scenario, clients: int, duration: float) -> dict:
+    """Hold `clients` MJPEG streams open for `duration` seconds and count the frames each receives"""
+    
+    async def client():
+        frames = 0
+        received = 0
+        first_frame = None
+        started = time.monotonic()
+        deadline = started + duration
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            # HTTP/1.0 keeps the body unchunked, so frame boundaries can be counted in the raw bytes
+            writer.write(f"GET {scenario.path} HTTP/1.0\r\nHost: {host}:{port}\r\n\r\n".encode())
+            status, _ = await _read_head(reader)
+            if status != 200:
+                return {"status": status, "frames": 0, "bytes": 0, "fps": 0.0, "first_frame_ms": None}
+            tail = b""
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    chunk = await asyncio.wait_for(reader.read(65536), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                if not chunk:
+                    break
+                received += len(chunk)
+                data = tail + chunk
+                count = data.count(FRAME_BOUNDARY)
+                if count and first_frame is None:
+                    first_frame = time.monotonic() - started
+                frames += count
+                tail = data[-(len(FRAME_BOUNDARY) - 1):]
+        finally:
+            writer.close()
+        elapsed = time.monotonic() - started
+        return {
+            "status": 200,
+            "frames": frames,
+            "bytes": received,
+            "fps": frames / elapsed,
+            "first_frame_ms": _ms(first_frame)
+        }
+    
+    results = await asyncio.gather(*(client() for _ in range(clients)), return_exceptions=True)
+    failed = [result for result in results if isinstance(result, Exception) or result["status"] != 200]
+    ok = [result for result in results if not isinstance(result, Exception) and result["status"] == 200]
+    fps = sorted(result["fps"] for result in ok)
+    first_frames = sorted(result["first_frame_ms"] for result in ok if result["first_frame_ms"] is not None)
+    return {
+        "concurrency": clients,
+        "errors": len(failed),
+        "error_rate": round(len(failed) / max(1, clients), 4),
+        "frames": sum(result["frames"] for result in ok),
+        "total_fps": round(sum(fps), 2),
+        "fps_per_client": round(sum(fps) / len(fps), 2) if fps else 0.0,
+        "min_client_fps": round(fps[0], 2) if fps else 0.0,
+        "throughput_mbps": round(sum(result["bytes"] for result in ok) * 8 / 1e6 / duration, 2),
+        "first_frame_p50_ms": percentile(first_frames, 0.50)
+    }
+
+# --- Server under test ---
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(port: int, workdir: str, extra_env: Dict[str, str]) -> subprocess.Popen:
+    """Launch the API with uvicorn on the simulated backend and wait until it answers"""
+    env = dict(os.environ)
+    env.update({
+        "HARDWARE_BACKEND": "simulated",
+        "SESSIONS_DIR": os.path.join(workdir, "sessions"),
+        "PID_TUNINGS_FILE": os.path.join(workdir, "pid_tunings.json"),
+        "THERMAL_MODEL_FILE": os.path.join(workdir, "thermal_model.json"),
+        "LOG_FILE": os.path.join(workdir, "smart-oven.log"),
+    })
+    env.update(extra_env)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--app-dir", API_DIR,
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited during startup:\n{process.stderr.read().decode(errors='replace')}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5) as sock:
+                sock.sendall(b"GET /health HTTP/1.0\r\n\r\n")
+                if sock.recv(12).startswith(b"HTTP/1.1 200"):
+                    return process
+        except OSError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Server did not answer /health within {SERVER_START_TIMEOUT} s")
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+# --- Runner ---
+
+async def run_benchmark(host: str, port: int, pid: Optional[int], scenarios: List[Scenario],
+                        concurrency: int, stream_clients: int, duration: float, warmup: float) -> Dict[str, dict]:
+    results = {}
+    for scenario in scenarios:
+        clients = stream_clients if scenario.stream else concurrency
+        runner = run_stream if scenario.stream else run_requests
+        if warmup > 0:
+            # Warms caches and starts the camera so its startup isn't measured
+            await runner(host, port, scenario, 1, warmup)
+        monitor = ResourceMonitor(pid)
+        monitor.start()
+        result = await runner(host, port, scenario, clients, duration)
+        result.update(await monitor.stop())
+        results[scenario.name] = result
+        print(f"  {scenario.name}: {_summarize(result)}", file=sys.stderr)
+    return results
+
+def _summarize(result: dict) -> str:
+    if "total_fps" in result:
+        return (f"{result['concurrency']} clients, {result['fps_per_client']} fps/client, "
+                f"{result['errors']} errors, RSS {result.get('rss_peak_mb')} MB")
+    return (f"{result['throughput_rps']} req/s, p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, "
+            f"{result['errors']} errors, RSS {result.get('rss_peak_mb')} MB")
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=API_DIR, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+def compare(baseline: dict, current: dict) -> Dict[str, dict]:
+    """Per-scenario change of each compared metric, in percent of the baseline
+    
+    Positive `change_percent` means the metric went up; `regression` says
+    whether the change is in the wrong direction.
+    """
+    comparison = {}
+    for name, result in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        metrics = {}
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = before.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            change = None if old == 0 else round((new - old) / old * 100.0, 1)
+            metrics[metric] = {
+                "baseline": old,
+                "current": new,
+                "change_percent": change,
+                "regression": (new < old) if higher_is_better else (new > old)
+            }
+        comparison[name] = metrics
+    return comparison
+
+def _print_comparison(comparison: Dict[str, dict]):
+    for name, metrics in comparison.items():
+        print(name, file=sys.stderr)
+        for metric, values in metrics.items():
+            change = "n/a" if values["change_percent"] is None else f"{values['change_percent']:+.1f}%"
+            marker = " (worse)" if values["regression"] and values["change_percent"] else ""
+            print(f"  {metric:16} {values['baseline']!s:>10} -> {values['current']!s:>10}  {change}{marker}",
+                  file=sys.stderr)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the Smart Oven API")
+    parser.add_argument("--url", help="Benchmark a running server instead of launching one on the simulated backend")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients per request scenario")
+    parser.add_argument("--stream-clients", type=int, default=4, help="Concurrent MJPEG stream clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds each scenario runs")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Seconds of single-client warm-up before each scenario")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Extra environment for the launched server, e.g. --env CAMERA_ENCODER=pil")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare this run with an earlier results file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="Compare two results files without running anything")
+    args = parser.parse_args(argv)
+    
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        comparison = compare(baseline, current)
+        _print_comparison(comparison)
+        print(json.dumps(comparison, indent=2))
+        return 0
+    
+    unknown = [name for name in args.scenarios.split(",") if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {unknown}. Available scenarios: {list(SCENARIOS)}")
+    scenarios = [SCENARIOS[name] for name in args.scenarios.split(",")]
+    extra_env = dict(item.split("=", 1) for item in args.env)
+    
+    process = None
+    workdir = None
+    if args.url:
+        target = urlsplit(args.url)
+        host, port, pid = target.hostname, target.port or 80, None
+    else:
+        workdir = tempfile.TemporaryDirectory(prefix="smart-oven-bench-")
+        host, port = "127.0.0.1", _free_port()
+        process = start_server(port, workdir.name, extra_env)
+        pid = process.pid
+    
+    print(f"Benchmarking http://{host}:{port} for {args.duration:g} s per scenario", file=sys.stderr)
+    try:
+        results = asyncio.run(run_benchmark(host, port, pid, scenarios, args.concurrency, args.stream_clients,
+                                            args.duration, args.warmup))
+    finally:
+        if process is not None:
+            stop_server(process)
+            workdir.cleanup()
+    
+    report = {
+        "meta": {
+            "timestamp": time.time(),
+            "commit": _git_commit(),
+            "target": args.url or "simulated",
+            "server_env": extra_env,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "stream_clients": args.stream_clients
+        },
+        "scenarios": results
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(json.load(f), report)
+        _print_comparison(report["comparison"])
+    
+    output = json.dumps(report, indent=2)
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,46 +3,527 @@ from logger import logger
 import time
 import threading
 import io
-from typing import Optional, Generator
+import asyncio
+import importlib.util
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Callable, Dict, Iterable, NamedTuple, Optional, Tuple
 import numpy as np
+from metrics import (
+    CAMERA_ENCODE_SECONDS, CAMERA_CAPTURE_ERRORS, CAMERA_ACTIVE_STREAMS, CAMERA_FRAMES_SENT,
+    CAMERA_FRAME_SEND_SECONDS, CAMERA_FRAMES_DROPPED
+)
+from config import CAMERA_ENCODER, CAMERA_ENCODER_MAX_FAILURES, CAMERA_RESOLUTION, CAMERA_LORES_RESOLUTION, CAMERA_FRAMERATE, HARDWARE_BACKEND
 
 # --- Camera imports with error handling ---
-try:
-    from picamera2 import Picamera2
+# Importing picamera2 pulls in libcamera and takes a large share of startup on the Pi,
+# so only check it is installed here; load_picamera2() imports it when the camera is first opened
+Picamera2 = None
+MappedArray = None
+_picamera2_lock = threading.Lock()
+
+if HARDWARE_BACKEND == "simulated":
     CAMERA_AVAILABLE = True
-    logger.info("Picamera2 imported successfully")
-except ImportError as e:
-    CAMERA_AVAILABLE = False
-    logger.info("Picamera2 not available in container environment (import error):" + str(e))
-except Exception as e:
-    CAMERA_AVAILABLE = False
-    logger.info("Picamera2 not available in container environment (general error):" + str(e))
+    logger.info("Using the simulated camera")
+else:
+    try:
+        CAMERA_AVAILABLE = importlib.util.find_spec("picamera2") is not None
+    except Exception as e:
+        CAMERA_AVAILABLE = False
+        logger.info("Picamera2 not available in container environment (general error):" + str(e))
+    if CAMERA_AVAILABLE:
+        logger.info("Picamera2 found, importing it on first use")
+    else:
+        logger.info("Picamera2 not available in container environment (not installed)")
+
+def load_picamera2():
+    """Import Picamera2 (or the simulated camera) on first use
+    
+    Raises:
+        Exception: If Picamera2 is not installed or fails to import
+    """
+    global Picamera2, MappedArray
+    if Picamera2 is not None:
+        return
+    if not CAMERA_AVAILABLE:
+        raise Exception("Picamera2 not available in container environment")
+    
+    with _picamera2_lock:
+        if Picamera2 is not None:
+            return
+        start = time.monotonic()
+        try:
+            if HARDWARE_BACKEND == "simulated":
+                # Synthetic frame source with the Picamera2 interface (see simulator.py)
+                from simulator import Picamera2 as camera_class, MappedArray as mapped_array_class
+            else:
+                from picamera2 import Picamera2 as camera_class, MappedArray as mapped_array_class
+        except Exception as e:
+            logger.error(f"Failed to import Picamera2: {e}")
+            raise Exception(f"Failed to import Picamera2: {e}")
+        # Picamera2 last: it is the flag the unlocked check above looks at
+        MappedArray = mapped_array_class
+        Picamera2 = camera_class
+        logger.info(f"Picamera2 imported in {(time.monotonic() - start) * 1000:.0f} ms")
+
+# --- Optional JPEG encoder imports ---
+try:
+    import simplejpeg
+    SIMPLEJPEG_AVAILABLE = True
+except ImportError:
+    SIMPLEJPEG_AVAILABLE = False
 
 # --- Global camera instance ---
 _camera = None
 _camera_lock = threading.Lock()
+
+# Blocking camera operations (init, start, stop) run here instead of on the event loop
+_camera_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="camera")
+
+# Seconds the capture thread keeps running after the last consumer leaves
+BROADCAST_IDLE_TIMEOUT = 5.0
+
+# Number of recent frames used to compute encoder fps
+ENCODER_STATS_WINDOW = 60
+
+# Slowest pace adaptive streaming will back off to, in seconds per frame
+MAX_STREAM_INTERVAL = 2.0
+
+class StreamProfile(NamedTuple):
+    """Named streaming settings selectable per request"""
+    name: str
+    stream: str     # Picamera2 stream the frames come from: "main" or "lores"
+    fps: float      # Frame rate ceiling; adaptive pacing only ever goes slower
+    quality: int    # Default JPEG quality
+
+STREAM_PROFILES = {
+    "thumbnail": StreamProfile("thumbnail", "lores", 5, 70),
+    "dashboard": StreamProfile("dashboard", "lores", 15, 80),
+    "full": StreamProfile("full", "main", 30, 85),
+}
+DEFAULT_STREAM_PROFILE = "full"
+
+# Frames are shared per (stream, quality)
+FrameKey = Tuple[str, int]
+
+class EncoderStats:
+    """Frame rate and per-frame cost of a JPEG encoder"""
+    
+    def __init__(self):
+        self.frames = 0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self._frame_times = deque(maxlen=ENCODER_STATS_WINDOW)
+    
+    def record(self, wall_time: float, cpu_time: float):
+        self.frames += 1
+        self.wall_time += wall_time
+        self.cpu_time += cpu_time
+        self._frame_times.append(time.monotonic())
+    
+    def to_dict(self):
+        times = self._frame_times
+        fps = (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 and times[-1] > times[0] else None
+        return {
+            "frames": self.frames,
+            "fps": round(fps, 2) if fps is not None else None,
+            "wall_ms_per_frame": round(self.wall_time * 1000.0 / self.frames, 3) if self.frames else None,
+            "cpu_ms_per_frame": round(self.cpu_time * 1000.0 / self.frames, 3) if self.frames else None
+        }
+
+def _yuv420_planes(array: np.ndarray, width: int, height: int):
+    """Split a YUV420 buffer of shape (height * 3 / 2, stride) into Y, U and V planes"""
+    stride = array.shape[1]
+    y = array[:height, :width]
+    chroma = array[height:].reshape(-1, stride // 2)
+    u = chroma[:height // 2, :width // 2]
+    v = chroma[height // 2:height, :width // 2]
+    return np.ascontiguousarray(y), np.ascontiguousarray(u), np.ascontiguousarray(v)
+
+class EncoderError(Exception):
+    """The JPEG encoder itself failed, as opposed to the frame capture"""
+
+class JpegEncoder:
+    """Captures one frame and encodes it as JPEG for one or more (stream, quality) keys
+    
+    Subclasses implement `_encode`; this base class records the wall-clock and
+    CPU time (of the calling thread) spent per frame. Failures of the encoder
+    itself are raised as EncoderError, capture failures as they come.
+    """
+    
+    name = "base"
+    
+    def __init__(self):
+        self.stats = EncoderStats()
+    
+    def encode(self, camera_manager, keys: Iterable[FrameKey]) -> Dict[FrameKey, bytes]:
+        """Capture a frame and return its JPEG encoding for each requested key"""
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        frames = self._encode(camera_manager, sorted(set(keys)))
+        self.stats.record(time.perf_counter() - wall_start, time.thread_time() - cpu_start)
+        return frames
+    
+    def _encode(self, camera_manager, keys) -> Dict[FrameKey, bytes]:
+        raise NotImplementedError
+    
+    def close(self, camera_manager):
+        """Release any resources held on the camera"""
+        pass
+
+class SimpleJpegEncoder(JpegEncoder):
+    """Encodes straight from the mapped capture buffers with libjpeg-turbo via simplejpeg"""
+    
+    name = "simplejpeg"
+    
+    def _encode(self, camera_manager, keys):
+        frames = {}
+        # One request holds the main and lores images of the same sensor frame;
+        # MappedArray exposes each buffer without copying it into a new array
+        with camera_manager.camera.captured_request() as request:
+            for stream in sorted({stream for stream, _ in keys}):
+                pixel_format, (width, height) = camera_manager.stream_config(stream)
+                with MappedArray(request, stream) as mapped:
+                    try:
+                        if pixel_format == "YUV420":
+                            planes = _yuv420_planes(mapped.array, width, height)
+                        for key_stream, quality in keys:
+                            if key_stream != stream:
+                                continue
+                            if pixel_format == "YUV420":
+                                frames[(stream, quality)] = simplejpeg.encode_jpeg_yuv_planes(*planes, quality=quality)
+                            else:
+                                frames[(stream, quality)] = simplejpeg.encode_jpeg(mapped.array, quality=quality, colorspace="BGR")
+                    except Exception as e:
+                        raise EncoderError(str(e)) from e
+        return frames
+
+class PILEncoder(JpegEncoder):
+    """Fallback encoder using PIL, reusing a single output buffer"""
+    
+    name = "pil"
+    
+    def __init__(self):
+        super().__init__()
+        self._buffer = io.BytesIO()
+    
+    def _encode(self, camera_manager, keys):
+        from PIL import Image
+        
+        streams = sorted({stream for stream, _ in keys})
+        arrays, _ = camera_manager.camera.capture_arrays(streams)
+        frames = {}
+        for stream, array in zip(streams, arrays):
+            pixel_format, _ = camera_manager.stream_config(stream)
+            if pixel_format == "YUV420":
+                import cv2
+                image = Image.fromarray(cv2.cvtColor(array, cv2.COLOR_YUV420p2RGB))
+            else:
+                # RGB888 frames are laid out as BGR in memory
+                image = Image.fromarray(array[:, :, ::-1])
+            for key_stream, quality in keys:
+                if key_stream != stream:
+                    continue
+                self._buffer.seek(0)
+                self._buffer.truncate()
+                image.save(self._buffer, format="JPEG", quality=quality)
+                frames[(stream, quality)] = self._buffer.getvalue()
+        return frames
+
+class _EncodedFrameSink(io.BufferedIOBase):
+    """File-like target receiving frames from the Picamera2 hardware encoder"""
+    
+    def __init__(self):
+        self.frame = None
+        self.sequence = 0
+        self.condition = threading.Condition()
+    
+    def writable(self):
+        return True
+    
+    def write(self, buffer):
+        with self.condition:
+            self.frame = bytes(buffer)
+            self.sequence += 1
+            self.condition.notify_all()
+        return len(buffer)
+
+class HardwareMJPEGEncoder(JpegEncoder):
+    """Uses the Picamera2 MJPEG encoder (V4L2 hardware on Pi 4)
+    
+    The encoder runs continuously on the main stream at one quality level, so
+    every requested key gets the same frame and the encoder is restarted when
+    the highest requested quality changes. CPU figures only cover waiting for
+    frames.
+    """
+    
+    name = "hardware"
+    
+    def __init__(self):
+        super().__init__()
+        self._encoder = None
+        self._sink = None
+        self._quality = None
+        self._last_sequence = 0
+    
+    def _encode(self, camera_manager, keys):
+        quality = max(quality for _, quality in keys)
+        if self._encoder is None or quality != self._quality:
+            try:
+                self._start(camera_manager, quality)
+            except Exception as e:
+                raise EncoderError(f"Failed to start the hardware MJPEG encoder: {e}") from e
+        
+        with self._sink.condition:
+            if not self._sink.condition.wait_for(lambda: self._sink.sequence > self._last_sequence, timeout=1.0):
+                raise EncoderError("Hardware MJPEG encoder produced no frame")
+            self._last_sequence = self._sink.sequence
+            frame = self._sink.frame
+        return {key: frame for key in keys}
+    
+    def _start(self, camera_manager, quality: int):
+        from picamera2.encoders import MJPEGEncoder, Quality
+        from picamera2.outputs import FileOutput
+        
+        self.close(camera_manager)
+        levels = [Quality.VERY_LOW, Quality.LOW, Quality.MEDIUM, Quality.HIGH, Quality.VERY_HIGH]
+        level = levels[min(len(levels) - 1, max(0, (quality - 1) * len(levels) // 100))]
+        self._encoder = MJPEGEncoder()
+        self._sink = _EncodedFrameSink()
+        self._last_sequence = 0
+        camera_manager.camera.start_encoder(self._encoder, FileOutput(self._sink), quality=level)
+        self._quality = quality
+        logger.info(f"Hardware MJPEG encoder started at quality {quality} ({level.name})")
+    
+    def close(self, camera_manager):
+        if self._encoder is not None:
+            try:
+                camera_manager.camera.stop_encoder(self._encoder)
+            except Exception as e:
+                logger.error(f"Error stopping hardware MJPEG encoder: {e}")
+            self._encoder = None
+            self._quality = None
+
+ENCODERS = {
+    SimpleJpegEncoder.name: SimpleJpegEncoder,
+    HardwareMJPEGEncoder.name: HardwareMJPEGEncoder,
+    PILEncoder.name: PILEncoder,
+}
+
+def create_encoder(name: str = CAMERA_ENCODER) -> JpegEncoder:
+    """Create a JPEG encoder by name, resolving "auto" to the best one installed"""
+    if name == "auto":
+        name = SimpleJpegEncoder.name if SIMPLEJPEG_AVAILABLE else PILEncoder.name
+    if name not in ENCODERS:
+        raise ValueError(f"Unknown camera encoder: {name}. Available encoders: {list(ENCODERS)}")
+    if name == SimpleJpegEncoder.name and not SIMPLEJPEG_AVAILABLE:
+        raise ValueError("simplejpeg encoder requested but simplejpeg is not installed")
+    return ENCODERS[name]()
+
+class Frame(NamedTuple):
+    """An encoded frame shared by every consumer"""
+    sequence: int
+    data: bytes
+    monotonic: float
+
+class AsyncFrameSubscriber:
+    """Hands broadcaster frames to a coroutine through a single-slot asyncio queue
+    
+    Each subscriber is paced independently: it starts at its profile's frame
+    rate and backs off when the client takes longer to receive a frame than the
+    interval allows, or when frames pile up undelivered.
+    """
+    
+    def __init__(self, key: FrameKey, fps: Optional[float], loop: asyncio.AbstractEventLoop):
+        self.key = key
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=1)
+        self.base_interval = 1.0 / fps if fps else 0.0
+        self.interval = self.base_interval
+        self.next_due = 0.0
+        self.send_time = None
+        self.delivered = 0
+        self.dropped = 0
+    
+    def offer(self, frame: Frame):
+        """Replace any undelivered frame with the newer one (runs on the event loop)"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            CAMERA_FRAMES_DROPPED.inc()
+            # The client isn't keeping up, slow down
+            self.interval = min(MAX_STREAM_INTERVAL, max(self.interval, 0.01) * 1.25)
+        self.queue.put_nowait(frame)
+    
+    def record_send(self, seconds: float):
+        """Adapt the pace to how long the client took to receive the last frame"""
+        self.delivered += 1
+        self.send_time = seconds if self.send_time is None else 0.8 * self.send_time + 0.2 * seconds
+        # Never faster than the profile, never faster than the client drains, and recover gradually
+        self.interval = min(MAX_STREAM_INTERVAL, max(self.base_interval, self.send_time * 1.2, self.interval * 0.95))
+    
+    def get_stats(self):
+        return {
+            "stream": self.key[0],
+            "quality": self.key[1],
+            "target_fps": round(1.0 / self.interval, 2) if self.interval else None,
+            "delivered": self.delivered,
+            "dropped": self.dropped
+        }
+
+class FrameBroadcaster:
+    """Captures each frame once and shares the encoded result with every consumer
+    
+    A single producer thread captures a frame, encodes it once per (stream,
+    quality) that a due consumer asked for, and publishes the results into
+    shared slots tagged with the capture sequence number. Consumers only ever
+    hold the newest frame, so slow consumers skip ahead and the cost stays flat
+    regardless of how many viewers are connected. The producer only captures
+    as often as the fastest consumer currently needs.
+    """
+    
+    def __init__(self, camera_manager):
+        self.camera_manager = camera_manager
+        self.frames_captured = 0
+        self._frames = {}
+        self._subscribers = set()
+        self._last_consumer_time = 0.0
+        self._condition = threading.Condition()
+        self._thread = None
+    
+    @property
+    def consumer_count(self):
+        return len(self._subscribers)
+    
+    @asynccontextmanager
+    async def async_subscription(self, stream: str = "main", quality: int = 85, fps: Optional[float] = None):
+        """Register a coroutine consumer; frames arrive on the returned subscriber's queue
+        
+        Args:
+            stream: Picamera2 stream to take frames from
+            quality: JPEG quality
+            fps: Frame rate ceiling, or None to receive every captured frame
+        """
+        subscriber = AsyncFrameSubscriber((stream, quality), fps, asyncio.get_running_loop())
+        with self._condition:
+            self._subscribers.add(subscriber)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="camera-broadcaster", daemon=True)
+                self._thread.start()
+                logger.info("Camera broadcaster started")
+            self._condition.notify_all()
+        try:
+            yield subscriber
+        finally:
+            with self._condition:
+                self._subscribers.discard(subscriber)
+                if not any(other.key == subscriber.key for other in self._subscribers):
+                    self._frames.pop(subscriber.key, None)
+                self._last_consumer_time = time.monotonic()
+    
+    def _run(self):
+        while True:
+            with self._condition:
+                subscribers = list(self._subscribers)
+                idle = not subscribers and time.monotonic() - self._last_consumer_time > BROADCAST_IDLE_TIMEOUT
+                if idle or not self.camera_manager.is_streaming:
+                    self._thread = None
+                    logger.info("Camera broadcaster stopped")
+                    return
+                
+                now = time.monotonic()
+                due = [subscriber for subscriber in subscribers if now >= subscriber.next_due]
+                if not due:
+                    # Sleep until the next consumer is due, waking early if a new one subscribes
+                    next_due = min((subscriber.next_due for subscriber in subscribers), default=now + 0.05)
+                    self._condition.wait(timeout=min(0.1, max(0.0, next_due - now)))
+                    continue
+            
+            frames = self.camera_manager.capture_jpegs({subscriber.key for subscriber in due})
+            if not frames:
+                # If capture fails, wait a bit before trying again
+                time.sleep(0.1)
+                continue
+            
+            now = time.monotonic()
+            with self._condition:
+                self.frames_captured += 1
+                published = {key: Frame(self.frames_captured, data, now) for key, data in frames.items()}
+                self._frames.update(published)
+            
+            for subscriber in due:
+                subscriber.next_due = now + subscriber.interval
+                frame = published.get(subscriber.key)
+                if frame is not None:
+                    try:
+                        subscriber.loop.call_soon_threadsafe(subscriber.offer, frame)
+                    except RuntimeError:
+                        # Event loop already closed
+                        pass
+    
+    def latest_frame(self, stream: str = "main", quality: int = 85) -> Optional[Frame]:
+        return self._frames.get((stream, quality))
+    
+    def get_stats(self):
+        subscribers = list(self._subscribers)
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "consumers": len(subscribers),
+            "frames_captured": self.frames_captured,
+            "frames_dropped": sum(subscriber.dropped for subscriber in subscribers),
+            "subscribers": [subscriber.get_stats() for subscriber in subscribers]
+        }
+
 class CameraManager:
-    """Camera management using simple Picamera2"""
+    """Camera management using simple Picamera2
+    
+    The camera runs a dual-stream configuration: a full-size RGB888 main stream
+    and a smaller YUV420 lores stream, so previews don't pay full-resolution
+    encode costs.
+    """
     
-    def __init__(self, resolution=(1024, 576), framerate=30):
+    def __init__(self, resolution=CAMERA_RESOLUTION, framerate=CAMERA_FRAMERATE, lores_resolution=CAMERA_LORES_RESOLUTION):
         """Initialize camera with specified resolution and framerate"""
         self.resolution = resolution
+        self.lores_resolution = lores_resolution
         self.framerate = framerate
         self.camera = None
         self.is_streaming = False
+        self.broadcaster = FrameBroadcaster(self)
+        self.encoder = create_encoder(CAMERA_ENCODER)
+        self._preferred_encoder = self.encoder.name
+        self._encoders = {self.encoder.name: self.encoder}
+        self._encoder_failures = 0
+        self._stream_configs = {
+            "main": ("RGB888", tuple(resolution)),
+            "lores": ("YUV420", tuple(lores_resolution)),
+        }
         
         if not CAMERA_AVAILABLE:
             raise Exception("Picamera2 not available")
+        load_picamera2()
         
         try:
-            # Simple Picamera2 initialization
             self.camera = Picamera2()
-            logger.info(f"Picamera2 initialized with resolution {resolution} at {framerate}fps")
-                
+            # RGB888 gives a packed 3-channel buffer the encoders can read directly;
+            # lores must be YUV420 on the Pi 4 ISP
+            self.camera.configure(self.camera.create_video_configuration(
+                main={"size": tuple(resolution), "format": "RGB888"},
+                lores={"size": tuple(lores_resolution), "format": "YUV420"},
+                controls={"FrameRate": framerate}
+            ))
+            logger.info(f"Picamera2 initialized with resolution {resolution} (lores {lores_resolution}) "
+                        f"at {framerate}fps, {self.encoder.name} encoder")
+        
         except Exception as e:
             logger.error(f"Failed to initialize camera: {e}")
             raise
     
+    def stream_config(self, stream: str):
+        """Get the (pixel format, (width, height)) of a Picamera2 stream"""
+        return self._stream_configs[stream]
+    
     def start(self):
         """Start the camera"""
         if not self.camera:
@@ -52,14 +533,31 @@ class CameraManager:
             self.camera.start()
             self.is_streaming = True
             logger.info("Picamera2 started successfully")
+            if self.encoder.name != self._preferred_encoder:
+                # Give the preferred encoder another chance after falling back
+                self.encoder = self._encoders[self._preferred_encoder]
+                self._encoder_failures = 0
+                logger.info(f"Retrying the {self.encoder.name} encoder")
         except Exception as e:
             logger.error(f"Failed to start camera: {e}")
             raise
     
+    def ensure_started(self):
+        """Start the camera unless it is already streaming
+        
+        Consumers call this on the camera thread instead of checking
+        `is_streaming` themselves, so it is ordered after any camera work
+        already queued there, such as a diagnostic capture that briefly starts
+        and stops the camera.
+        """
+        if not self.is_streaming:
+            self.start()
+    
     def stop(self):
         """Stop the camera"""
         if self.camera and self.is_streaming:
             try:
+                self.encoder.close(self)
                 self.camera.stop()
                 self.is_streaming = False
                 logger.info("Picamera2 stopped successfully")
@@ -78,38 +576,99 @@ class CameraManager:
             logger.error(f"Error capturing frame: {e}")
             return None
     
-    def capture_jpeg(self, quality: int = 85) -> Optional[bytes]:
+    def capture_jpeg(self, quality: int = 85, stream: str = "main") -> Optional[bytes]:
         """Capture a frame and encode as JPEG"""
+        frames = self.capture_jpegs([(stream, quality)])
+        return frames.get((stream, quality)) if frames else None
+    
+    def capture_jpegs(self, keys: Iterable[FrameKey]) -> Optional[Dict[FrameKey, bytes]]:
+        """Capture one frame and encode it as JPEG for each requested (stream, quality)"""
         if not self.camera or not self.is_streaming:
             return None
         
+        encoder = self.encoder
+        start = time.perf_counter()
         try:
-            # Use Picamera2's built-in JPEG capture
-            buffer = io.BytesIO()
-            self.camera.capture_file(buffer, format='jpeg')
-            return buffer.getvalue()
+            frames = encoder.encode(self, keys)
+            CAMERA_ENCODE_SECONDS.labels(encoder.name).observe(time.perf_counter() - start)
+            self._encoder_failures = 0
+            return frames
+        except EncoderError as e:
+            CAMERA_CAPTURE_ERRORS.inc()
+            if encoder.name == PILEncoder.name or not self.is_streaming:
+                # Nothing to fall back to, or the camera was stopped under the capture
+                logger.error(f"Error encoding JPEG: {e}")
+                return None
+            self._encoder_failures += 1
+            if self._encoder_failures < CAMERA_ENCODER_MAX_FAILURES:
+                logger.warning(f"{encoder.name} encoder failed ({e}), "
+                               f"{self._encoder_failures}/{CAMERA_ENCODER_MAX_FAILURES} before falling back to PIL")
+                return None
+            logger.warning(f"{encoder.name} encoder failed {self._encoder_failures} times in a row ({e}), "
+                           f"falling back to PIL until the camera is restarted")
+            encoder.close(self)
+            self.encoder = self._encoders.setdefault(PILEncoder.name, PILEncoder())
+            return None
         except Exception as e:
+            # Capture errors, e.g. the camera being stopped, don't count against the encoder
+            CAMERA_CAPTURE_ERRORS.inc()
             logger.error(f"Error capturing JPEG: {e}")
             return None
     
-    def get_mjpeg_stream(self, quality: int = 85) -> Generator[bytes, None, None]:
-        """Generate MJPEG stream for video streaming"""
-        if not self.is_streaming:
-            self.start()
+    def get_encoder_info(self):
+        """Get the active encoder and fps / CPU-per-frame figures for every encoder used"""
+        return {
+            "active": self.encoder.name,
+            "stats": {name: encoder.stats.to_dict() for name, encoder in self._encoders.items()}
+        }
+    
+    async def get_snapshot_jpeg(self, quality: int = 90, timeout: float = 2.0) -> Optional[bytes]:
+        """Get the next main-stream frame from the shared broadcaster as JPEG without blocking the event loop"""
+        await run_in_camera_executor(self.ensure_started)
         
-        while self.is_streaming:
+        async with self.broadcaster.async_subscription("main", quality) as subscriber:
+            latest = self.broadcaster.latest_frame("main", quality)
+            # A frame younger than two frame intervals is as good as a fresh capture
+            if latest is not None and time.monotonic() - latest.monotonic < 2.0 / self.framerate:
+                return latest.data
             try:
-                jpeg_data = self.capture_jpeg(quality)
-                if jpeg_data:
+                frame = await asyncio.wait_for(subscriber.queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return None
+            return frame.data
+    
+    async def get_mjpeg_stream(self, profile: StreamProfile = STREAM_PROFILES[DEFAULT_STREAM_PROFILE],
+                               quality: Optional[int] = None) -> AsyncGenerator[bytes, None]:
+        """Generate MJPEG stream for video streaming from the shared broadcaster
+        
+        Args:
+            profile: Stream profile selecting the source stream and frame rate ceiling
+            quality: JPEG quality, defaults to the profile's quality
+        """
+        await run_in_camera_executor(self.ensure_started)
+        
+        quality = quality or profile.quality
+        fps = min(profile.fps, self.framerate)
+        frames_sent = CAMERA_FRAMES_SENT.labels(profile.name)
+        CAMERA_ACTIVE_STREAMS.inc()
+        try:
+            async with self.broadcaster.async_subscription(profile.stream, quality, fps) as subscriber:
+                while self.is_streaming:
+                    try:
+                        frame = await asyncio.wait_for(subscriber.queue.get(), timeout=1.0)
+                    except asyncio.TimeoutError:
+                        continue
+                    # The generator resumes once the server has handed the chunk to the client,
+                    # so the time spent in yield measures the client's throughput
+                    send_start = time.monotonic()
                     yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + jpeg_data + b'\r\n')
-                else:
-                    # If capture fails, wait a bit before trying again
-                    time.sleep(0.1)
-                    
-            except Exception as e:
-                logger.error(f"Error in MJPEG stream: {e}")
-                break
+                           b'Content-Type: image/jpeg\r\n\r\n' + frame.data + b'\r\n')
+                    send_time = time.monotonic() - send_start
+                    subscriber.record_send(send_time)
+                    frames_sent.inc()
+                    CAMERA_FRAME_SEND_SECONDS.observe(send_time)
+        finally:
+            CAMERA_ACTIVE_STREAMS.dec()
     
     def close(self):
         """Clean up camera resources"""
@@ -132,7 +691,11 @@ def get_camera() -> CameraManager:
         if _camera is None:
             logger.info("Initializing camera...")
             try:
-                _camera = CameraManager(resolution=(1024, 576), framerate=30)
+                _camera = CameraManager(
+                    resolution=CAMERA_RESOLUTION,
+                    framerate=CAMERA_FRAMERATE,
+                    lores_resolution=CAMERA_LORES_RESOLUTION
+                )
                 logger.info("Camera initialized successfully")
             except Exception as e:
                 logger.error(f"Failed to initialize camera hardware: {e}")
@@ -140,17 +703,72 @@ def get_camera() -> CameraManager:
     
     return _camera
 
+async def run_in_camera_executor(func, *args):
+    """Run a blocking camera call on the dedicated camera thread"""
+    return await asyncio.get_running_loop().run_in_executor(_camera_executor, func, *args)
+
 def get_camera_info():
     """Get camera availability and status information"""
     return {
         "camera_available": CAMERA_AVAILABLE,
         "is_streaming": _camera.is_streaming if _camera else False,
         "resolution": _camera.resolution if _camera else None,
-        "framerate": _camera.framerate if _camera else None
+        "lores_resolution": _camera.lores_resolution if _camera else None,
+        "framerate": _camera.framerate if _camera else None,
+        "profiles": {name: profile._asdict() for name, profile in STREAM_PROFILES.items()},
+        "broadcaster": _camera.broadcaster.get_stats() if _camera else None,
+        "encoder": _camera.get_encoder_info() if _camera else None
     }
 
-def diagnose_camera(max_devices: int = 20):
-    """Diagnose camera access and return detailed information"""
+def _capture_shared_frame(camera: CameraManager) -> Optional[np.ndarray]:
+    """Capture one frame from the shared camera, starting it just for the capture if it is stopped
+    
+    Runs on the camera thread, where consumers start the camera through
+    ensure_started(): one that arrives mid-capture waits for this to finish
+    and then starts the camera again, rather than having it stopped under it.
+    """
+    if camera.is_streaming:
+        return camera.camera.capture_array()
+    camera.start()
+    try:
+        return camera.camera.capture_array()
+    finally:
+        camera.stop()
+
+def _capture_test_frame():
+    """Capture one frame for the diagnostics
+    
+    A second Picamera2 instance can't open a camera the API already holds,
+    so once get_camera() has opened it the frame comes from the shared
+    instance, on the camera thread.
+    
+    Returns:
+        tuple: (frame, whether the shared camera was used)
+    """
+    with _camera_lock:
+        shared = _camera
+        if shared is None:
+            # Holding the lock keeps get_camera() from opening the camera at the same time
+            test_camera = Picamera2()
+            try:
+                test_camera.start()
+                
+                # Allow camera to initialize
+                time.sleep(0.1)
+                return test_camera.capture_array(), False
+            finally:
+                test_camera.stop()
+                test_camera.close()
+    
+    return _camera_executor.submit(_capture_shared_frame, shared).result(timeout=10.0), True
+
+def diagnose_camera(max_devices: int = 20, progress: Optional[Callable[[int, int], None]] = None):
+    """Diagnose camera access and return detailed information
+    
+    Args:
+        max_devices: Number of /dev/video devices to check
+        progress: Called with (steps done, total steps) as the checks finish
+    """
     diagnostics = {
         "camera_available": CAMERA_AVAILABLE,
         "tests": {}
@@ -197,6 +815,8 @@ def diagnose_camera(max_devices: int = 20):
         diagnostics["tests"]["device_check"] = "FAILED: No video devices found"
     else:
         diagnostics["tests"]["device_check"] = f"SUCCESS: Found {len(video_devices)} video devices"
+    if progress is not None:
+        progress(1, 2)
     
     # If no camera libraries available, return early BUT with device info
     if not CAMERA_AVAILABLE:
@@ -209,31 +829,19 @@ def diagnose_camera(max_devices: int = 20):
         
         # Test simple Picamera2 initialization
         try:
-            # Simple initialization like your example
-            test_camera = Picamera2()
-            test_camera.start()
-            
-            # Allow camera to initialize
-            time.sleep(0.1)
-            
-            # Try to capture a frame
-            try:
-                frame = test_camera.capture_array()
-                if frame is not None and frame.size > 0:
-                    working_devices.append({
-                        "device": "picamera2",
-                        "frame_shape": frame.shape,
-                        "status": "SUCCESS"
-                    })
-                    diagnostics["tests"]["picamera2_simple"] = f"SUCCESS - Frame shape {frame.shape}"
-                else:
-                    diagnostics["tests"]["picamera2_simple"] = "FAILED: Could not capture frame"
-            except Exception as e:
-                diagnostics["tests"]["picamera2_simple"] = f"FAILED: Frame capture error - {e}"
-                
-            test_camera.stop()
-            test_camera.close()
-                
+            load_picamera2()
+            frame, shared = _capture_test_frame()
+            diagnostics["camera_in_use"] = shared
+            if frame is not None and frame.size > 0:
+                working_devices.append({
+                    "device": "picamera2",
+                    "frame_shape": frame.shape,
+                    "status": "SUCCESS"
+                })
+                diagnostics["tests"]["picamera2_simple"] = f"SUCCESS - Frame shape {frame.shape}"
+            else:
+                diagnostics["tests"]["picamera2_simple"] = "FAILED: Could not capture frame"
+        
         except Exception as e:
             diagnostics["tests"]["picamera2_simple"] = f"FAILED: {e}"
         
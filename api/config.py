@@ -1,3 +1,4 @@
+import json
 import os
 
 # --- Config via env ---
@@ -7,10 +8,138 @@ WIRES = int(os.getenv("SENSOR_WIRES", "3"))                     # 2, 3, or 4
 CS_NAME = os.getenv("SENSOR_CS", "CE0")                         # CE0 or CE1
 
 # --- Heater Control Constants ---
-# Fixed PID controller parameters - these cannot be changed via API
+# Default PID gains; replaced by autotuned gains once an autotune result is saved (see autotune.py)
 HEATER_PID_KP = 1.0          # Proportional gain
 HEATER_PID_KI = 0.1          # Integral gain  
 HEATER_PID_KD = 0.05         # Derivative gain
 HEATER_PID_SAMPLE_TIME = 1.0 # Sample time in seconds
 HEATER_PID_OUTPUT_LIMITS = (0, 1)  # Output limits (0-1 for heater on/off)
-HEATER_PID_THRESHOLD = 0.5   # Threshold for determining if heater should be on
\ No newline at end of file
+HEATER_PID_THRESHOLD = 0.5   # Threshold for determining if heater should be on
+
+# Gain schedule: (upper temperature bound in °C, Kp, Ki, Kd), checked in order against the setpoint.
+# Override with a JSON list of [bound, kp, ki, kd] rows in HEATER_PID_GAIN_TABLE; use null for no upper bound.
+_gain_table_rows = json.loads(os.getenv("HEATER_PID_GAIN_TABLE") or "null") or [[None, HEATER_PID_KP, HEATER_PID_KI, HEATER_PID_KD]]
+HEATER_PID_GAIN_TABLE = tuple(
+    (float("inf") if bound is None else float(bound), float(kp), float(ki), float(kd))
+    for bound, kp, ki, kd in _gain_table_rows
+)
+HEATER_PID_INTEGRAL_LIMITS = (0.0, 1.0)  # Clamp on the integral term's contribution to the output
+HEATER_PID_INTEGRAL_BAND = float(os.getenv("HEATER_PID_INTEGRAL_BAND", "20.0"))  # °C; integrate only this close to the setpoint
+HEATER_SETPOINT_RAMP_RATE = float(os.getenv("HEATER_SETPOINT_RAMP_RATE", "0"))  # °C per minute; 0 applies new setpoints at once
+
+# --- PID Autotune (relay feedback) ---
+PID_TUNINGS_FILE = os.getenv("PID_TUNINGS_FILE", "pid_tunings.json")  # Autotuned gains; overrides HEATER_PID_GAIN_TABLE when present
+AUTOTUNE_HYSTERESIS = 1.0      # °C either side of the setpoint before the relay switches
+AUTOTUNE_CYCLES = 3            # Oscillation cycles measured after the first (transient) one
+AUTOTUNE_TIMEOUT = 2 * 3600    # Seconds before an unfinished experiment is aborted
+AUTOTUNE_MAX_OVERSHOOT = 25.0  # °C above the setpoint at which the experiment is aborted
+
+# --- Thermal Model / Predictive Heat-up ---
+THERMAL_MODEL_FILE = os.getenv("THERMAL_MODEL_FILE", "thermal_model.json")  # Fitted FOPDT model parameters
+THERMAL_MODEL_MAX_SESSIONS = 10      # Most recent recorded sessions used for a fit
+THERMAL_MODEL_MAX_DEAD_TIME = 120.0  # Seconds; longest dead time tried by the fit
+PREDICTIVE_BOOST_BAND = 10.0         # °C below target at which predictive mode heats at full power
+PREDICTIVE_OVERSHOOT_MARGIN = 1.0    # °C; cut power once the predicted coast-up comes this close to the target
+
+# --- Heater Elements ---
+BACK_HEATER_GPIO = 23        # GPIO driving the back heater element
+FRONT_HEATER_GPIO = 24       # GPIO driving the front heater element
+HEATER_LOOP_MAX_SAMPLE_AGE = 2.0  # Seconds; the control loop turns the heaters off if the latest sample is older
+
+# --- Hardware Actor ---
+# All sensor and GPIO access runs on one thread, safety cutoffs first (see hardware_actor.py)
+HARDWARE_COMMAND_TIMEOUT = float(os.getenv("HARDWARE_COMMAND_TIMEOUT", "5.0"))  # Seconds a caller waits for a hardware command
+
+# --- Heater GPIO Bank ---
+# Both heater GPIOs are switched together in one write and their state is kept in memory (see GpioBank in hardware.py)
+GPIO_BANK_BACKEND = os.getenv("GPIO_BANK_BACKEND", "auto")  # "auto" (lgpio group writes if available), "lgpio" or "digitalio"
+GPIO_CHIP = int(os.getenv("GPIO_CHIP", "0"))                # gpiochip with the header GPIOs (0 on Pi 4 and current Pi 5 kernels)
+
+# --- Over-temperature Interlock ---
+# Independent thread that latches both heaters off on over-temperature, sensor faults and errors or stale readings (see interlock.py)
+INTERLOCK_ENABLED = os.getenv("INTERLOCK_ENABLED", "1") == "1"
+INTERLOCK_MAX_TEMPERATURE = float(os.getenv("INTERLOCK_MAX_TEMPERATURE", "300.0"))  # °C; trips above this
+INTERLOCK_RESET_HYSTERESIS = 10.0  # °C below the limit the oven must cool to before a reset is accepted
+INTERLOCK_MAX_SAMPLE_AGE = float(os.getenv("INTERLOCK_MAX_SAMPLE_AGE", "1.0"))  # Seconds without a valid sample before tripping
+INTERLOCK_MAX_SENSOR_ERRORS = 3    # Consecutive failed samples before tripping
+INTERLOCK_STARTUP_GRACE = 30.0     # Seconds allowed for the first valid sample after the interlock starts
+INTERLOCK_CHECK_INTERVAL = 0.05    # Seconds between checks when no sample arrives
+INTERLOCK_DEADLINE = float(os.getenv("INTERLOCK_DEADLINE", "0.25"))  # Seconds from a breach to both heaters off
+INTERLOCK_REALTIME_PRIORITY = int(os.getenv("INTERLOCK_REALTIME_PRIORITY", "50"))  # SCHED_FIFO priority (needs CAP_SYS_NICE); 0 disables
+
+# --- Heater Output (time-proportioning) ---
+# The 0-1 controller output is spread over a fixed window: duty 0.25 with a 4 s window = 1 s on, 3 s off
+HEATER_PWM_WINDOW = float(os.getenv("HEATER_PWM_WINDOW", "4.0"))      # Window length in seconds
+HEATER_PWM_MIN_ON = float(os.getenv("HEATER_PWM_MIN_ON", "0.5"))      # Shortest allowed on pulse in seconds
+HEATER_PWM_MIN_OFF = float(os.getenv("HEATER_PWM_MIN_OFF", "0.5"))    # Shortest allowed off gap in seconds
+HEATER_PWM_RESOLUTION = 0.05  # Seconds between output updates
+
+# --- Sensor Sampling ---
+# The MAX31865 is read by a background sampler thread; routes serve the cached reading
+SENSOR_SAMPLE_INTERVAL = float(os.getenv("SENSOR_SAMPLE_INTERVAL", "0.2"))  # Seconds between sensor reads
+
+# --- Sensor Filtering ---
+# Each sample is the median of several conversions, checked for faults, range and rate of change, then smoothed
+SENSOR_CONTINUOUS_CONVERSION = os.getenv("SENSOR_CONTINUOUS_CONVERSION", "1") == "1"  # Keep the MAX31865 converting instead of one-shot reads
+SENSOR_CONVERSION_TIME = 0.021   # Seconds per conversion in continuous mode (50 Hz filter; 60 Hz is 0.017)
+SENSOR_OVERSAMPLE = int(os.getenv("SENSOR_OVERSAMPLE", "5"))      # Conversions per sample, combined with median-of-N
+SENSOR_SMOOTHING = os.getenv("SENSOR_SMOOTHING", "ema")           # "none", "ema" or "kalman"
+SENSOR_EMA_ALPHA = float(os.getenv("SENSOR_EMA_ALPHA", "0.5"))    # Weight of the newest sample for "ema"
+SENSOR_KALMAN_PROCESS_NOISE = 0.05      # °C² per second the true temperature may drift, for "kalman"
+SENSOR_KALMAN_MEASUREMENT_NOISE = 0.25  # °C² variance of a sample, for "kalman"
+SENSOR_MIN_TEMPERATURE = -200.0  # °C; conversions outside the PT100 range are discarded
+SENSOR_MAX_TEMPERATURE = 850.0
+SENSOR_MAX_RATE = float(os.getenv("SENSOR_MAX_RATE", "20.0"))  # °C per second; faster changes between samples are glitches
+SENSOR_MAX_REJECTED = 5          # Consecutive rejected samples before the sensor reports an error
+
+
+# --- Temperature History ---
+# Samples are kept in a fixed-size ring buffer (9 bytes per sample, ~7.8 MB for 24 h at 10 Hz)
+HISTORY_RATE = 10  # Hz the default capacity is sized for, so the sample interval can go down to 0.1 s
+HISTORY_CAPACITY = int(os.getenv("HISTORY_CAPACITY", str(24 * 3600 * HISTORY_RATE)))  # Samples kept
+HISTORY_MAX_BUCKETS = 2000   # Upper bound on buckets returned by one history query
+HISTORY_DEFAULT_BUCKETS = 500  # Buckets returned when no resolution is requested
+
+# --- Recipe Programs ---
+RECIPE_TICK_INTERVAL = 1.0           # Seconds between recipe scheduler updates
+RECIPE_TEMPERATURE_TOLERANCE = 2.0   # °C; a phase counts as at temperature within this band
+
+# --- Bake Session Recording ---
+SESSIONS_DIR = os.getenv("SESSIONS_DIR", "sessions")                        # One .bin + .json pair per control-loop run
+SESSION_FSYNC_INTERVAL = float(os.getenv("SESSION_FSYNC_INTERVAL", "5.0"))  # Seconds between fsyncs of the active session
+SESSION_MAX_POINTS = 5000     # Upper bound on samples returned by one series query
+
+# --- Telemetry Push ---
+TELEMETRY_INTERVAL = float(os.getenv("TELEMETRY_INTERVAL", "0.5"))  # Seconds between telemetry frames
+
+# --- Camera ---
+# JPEG encoder: "auto" (simplejpeg if installed, else PIL), "simplejpeg", "hardware" (Picamera2 MJPEG encoder) or "pil"
+CAMERA_ENCODER = os.getenv("CAMERA_ENCODER", "auto")
+CAMERA_ENCODER_MAX_FAILURES = int(os.getenv("CAMERA_ENCODER_MAX_FAILURES", "3"))  # Encode failures in a row before falling back to PIL
+CAMERA_RESOLUTION = tuple(int(v) for v in os.getenv("CAMERA_RESOLUTION", "1024x576").split("x"))        # Main stream size
+CAMERA_LORES_RESOLUTION = tuple(int(v) for v in os.getenv("CAMERA_LORES_RESOLUTION", "512x288").split("x"))  # Preview stream size
+CAMERA_FRAMERATE = int(os.getenv("CAMERA_FRAMERATE", "30"))
+
+# --- Startup Warm-up ---
+# The sensor, heater GPIOs and camera are initialized on a background thread once the server is up (see startup.py)
+STARTUP_WARM_CAMERA = os.getenv("STARTUP_WARM_CAMERA", "1") == "1"  # Open the camera during warm-up instead of on first use
+
+# --- Diagnostics ---
+# GPIO and camera diagnostics run as background jobs (see diagnostics.py)
+DIAGNOSTICS_GPIO_PARALLELISM = int(os.getenv("DIAGNOSTICS_GPIO_PARALLELISM", "8"))  # GPIOs probed at the same time
+DIAGNOSTICS_CACHE_TTL = float(os.getenv("DIAGNOSTICS_CACHE_TTL", "300"))  # Seconds a result is served before probing again
+DIAGNOSTICS_MAX_JOBS = int(os.getenv("DIAGNOSTICS_MAX_JOBS", "20"))  # Finished jobs kept for lookup by ID
+
+# --- Hardware Backend ---
+# "hardware" drives the real sensor, GPIOs and camera; "simulated" uses simulator.py so the API runs on any machine
+HARDWARE_BACKEND = os.getenv("HARDWARE_BACKEND", "hardware")
+
+# --- Simulated Oven (HARDWARE_BACKEND=simulated) ---
+SIMULATOR_AMBIENT = float(os.getenv("SIMULATOR_AMBIENT", "22.0"))              # °C the oven starts at and cools toward
+SIMULATOR_TIME_CONSTANT = float(os.getenv("SIMULATOR_TIME_CONSTANT", "600.0"))  # Seconds; oven heat loss time constant
+SIMULATOR_ELEMENT_LAG = float(os.getenv("SIMULATOR_ELEMENT_LAG", "30.0"))      # Seconds; element warm-up time constant
+SIMULATOR_BACK_GAIN = float(os.getenv("SIMULATOR_BACK_GAIN", "260.0"))         # °C above ambient with the back element on
+SIMULATOR_FRONT_GAIN = float(os.getenv("SIMULATOR_FRONT_GAIN", "200.0"))       # °C above ambient with the front element on
+SIMULATOR_NOISE = float(os.getenv("SIMULATOR_NOISE", "0.05"))                  # °C standard deviation of each conversion
+SIMULATOR_GLITCH_RATE = float(os.getenv("SIMULATOR_GLITCH_RATE", "0"))         # Probability a conversion is a wild spike
+SIMULATOR_FAULT_RATE = float(os.getenv("SIMULATOR_FAULT_RATE", "0"))           # Probability a conversion latches a random fault
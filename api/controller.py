@@ -0,0 +1,464 @@
+# Import logger first to avoid circular imports
+from logger import logger
+import time
+import threading
+from collections import deque
+from enum import Enum
+from typing import Optional
+from simple_pid import PID
+from hardware import get_sampler
+from heater_output import get_heater_output
+from sessions import get_session_recorder
+from tunings import get_gain_table, gain_table_to_json
+from thermal_model import get_thermal_model
+from metrics import CONTROL_LOOP_JITTER_SECONDS, CONTROL_LOOP_STEP_SECONDS, CONTROL_LOOP_OVERRUNS
+from config import (
+    HEATER_PID_INTEGRAL_LIMITS, HEATER_PID_INTEGRAL_BAND,
+    HEATER_PID_SAMPLE_TIME, HEATER_PID_OUTPUT_LIMITS, HEATER_SETPOINT_RAMP_RATE,
+    BACK_HEATER_GPIO, FRONT_HEATER_GPIO, HEATER_LOOP_MAX_SAMPLE_AGE,
+    PREDICTIVE_BOOST_BAND, PREDICTIVE_OVERSHOOT_MARGIN
+)
+
+class HeaterMode(str, Enum):
+    OFF = "off"
+    BACK = "back"
+    FRONT = "front"
+    BOTH = "both"
+
+class ControlStrategy(str, Enum):
+    PID = "pid"                # PID only
+    PREDICTIVE = "predictive"  # Model-based full-power heat-up, then PID with a feed-forward integral
+
+class ControlPhase(str, Enum):
+    BOOST = "boost"            # Full power with the fastest elements
+    COAST = "coast"            # Power cut; stored heat carries the oven up to the target
+    REGULATE = "regulate"      # PID
+
+# GPIOs energized for each heater mode
+HEATER_MODE_GPIOS = {
+    HeaterMode.OFF: (),
+    HeaterMode.BACK: (BACK_HEATER_GPIO,),
+    HeaterMode.FRONT: (FRONT_HEATER_GPIO,),
+    HeaterMode.BOTH: (BACK_HEATER_GPIO, FRONT_HEATER_GPIO),
+}
+
+# Number of recent loop iterations kept for jitter statistics
+JITTER_WINDOW = 300
+
+class PIDEngine:
+    """simple_pid PID extended with gain scheduling and integral anti-windup
+    
+    The PID object lives as long as the engine, so setpoint and gain changes
+    keep the accumulated integral instead of starting from zero. simple_pid
+    stores the integral in output units (sum of Ki * error * dt), which makes
+    switching gains bumpless for the I term. On top of simple_pid's own clamp
+    to the output limits, the integral:
+    - is held while the error is outside `integral_band`
+    - is held while the output is saturated in the direction of the error
+    - is clamped to `integral_limits`
+    """
+    
+    def __init__(self, gain_table=None, output_limits=HEATER_PID_OUTPUT_LIMITS,
+                 integral_limits=HEATER_PID_INTEGRAL_LIMITS, integral_band: float = HEATER_PID_INTEGRAL_BAND):
+        # Default to the active table: autotuned gains if saved, else HEATER_PID_GAIN_TABLE
+        self.gain_table = tuple(sorted(gain_table if gain_table is not None else get_gain_table()))
+        self.output_limits = output_limits
+        self.integral_limits = integral_limits
+        self.integral_band = integral_band
+        self.band = None
+        self.pid = PID(*self.gain_table[0][1:])
+        # The caller owns the timing, so compute on every call with the measured dt
+        self.pid.sample_time = None
+        self.pid.output_limits = output_limits
+    
+    @property
+    def tunings(self):
+        return self.pid.tunings
+    
+    @property
+    def components(self):
+        return self.pid.components
+    
+    @property
+    def setpoint(self):
+        return self.pid.setpoint
+    
+    def gains_for(self, setpoint: float):
+        """Pick the (band index, gains) row whose upper bound covers the setpoint"""
+        for index, (upper, kp, ki, kd) in enumerate(self.gain_table):
+            if setpoint <= upper:
+                return index, (kp, ki, kd)
+        return len(self.gain_table) - 1, self.gain_table[-1][1:]
+    
+    def update(self, measurement: float, setpoint: float, dt: float) -> float:
+        """Compute the output for one control step"""
+        band, gains = self.gains_for(setpoint)
+        if band != self.band:
+            if self.band is not None:
+                logger.info("PID gains switched to band %d: Kp=%s, Ki=%s, Kd=%s", band, *gains)
+            self.pid.tunings = gains
+            self.band = band
+        
+        self.pid.setpoint = setpoint
+        previous_integral = self.pid._integral
+        self.pid(measurement, dt=dt)
+        
+        error = setpoint - measurement
+        proportional, integral, derivative = self.pid.components
+        low, high = self.output_limits
+        unclamped = proportional + integral + derivative
+        saturated = (unclamped > high and error > 0) or (unclamped < low and error < 0)
+        if abs(error) > self.integral_band or saturated:
+            integral = previous_integral
+        integral = min(self.integral_limits[1], max(self.integral_limits[0], integral))
+        self.pid._integral = integral
+        
+        output = min(high, max(low, proportional + integral + derivative))
+        self.pid._last_output = output
+        return output
+    
+    def reset(self):
+        """Clear the integral and derivative history"""
+        self.pid.reset()
+    
+    def preload(self, integral: float):
+        """Start from a known integral, e.g. the duty a thermal model says holds the setpoint"""
+        self.pid.reset()
+        self.pid._integral = min(self.integral_limits[1], max(self.integral_limits[0], integral))
+
+def ramp_setpoint(current: float, target: float, ramp_rate: Optional[float], dt: float) -> float:
+    """Move a setpoint toward the target by at most ramp_rate °C per minute"""
+    if not ramp_rate or ramp_rate <= 0:
+        return target
+    step = ramp_rate * dt / 60.0
+    if target >= current:
+        return min(target, current + step)
+    return max(target, current - step)
+
+# --- Global controller instance ---
+_controller = None
+_controller_lock = threading.Lock()
+
+class HeaterController:
+    """Closed-loop PID temperature control running on its own thread
+    
+    The loop reads the latest sample from the temperature sampler, updates the
+    PID controller and hands the output to the time-proportioning heater
+    output every `sample_time` seconds, independently of how often clients
+    call the API. New targets are approached by ramping the effective
+    `setpoint` at `ramp_rate` °C per minute.
+    
+    With the predictive strategy, large steps up are handled with the fitted
+    thermal model instead: full power with the fastest elements until the
+    model predicts the heat still in the pipeline (dead time) will carry the
+    oven to the target, then power off until it arrives, then PID with the
+    integral preloaded to the model's steady-state duty.
+    """
+    
+    def __init__(self, sample_time: float = HEATER_PID_SAMPLE_TIME):
+        self.sample_time = sample_time
+        self.target_temperature = None
+        self.setpoint = None
+        self.ramp_rate = None
+        self.mode = HeaterMode.BOTH
+        self.strategy = ControlStrategy.PID
+        self.phase = None
+        self.drive_mode = None
+        self.last_temperature = None
+        self.last_output = None
+        self.started_at = None
+        self.last_update_time = None
+        self.iterations = 0
+        self.overruns = 0
+        self.session_id = None
+        self._pid = None
+        self._model = None
+        self._applied = deque()  # (mode, output) of recent steps, for the model's dead time
+        self._jitter_ms = deque(maxlen=JITTER_WINDOW)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self, target_temperature: float, mode: HeaterMode = HeaterMode.BOTH,
+              ramp_rate: Optional[float] = None, strategy: ControlStrategy = ControlStrategy.PID):
+        """Start regulating to the target temperature
+        
+        Args:
+            target_temperature: Temperature to regulate to
+            mode: Heater elements to drive
+            ramp_rate: Setpoint ramp in °C per minute, starting from the current
+                temperature (default HEATER_SETPOINT_RAMP_RATE; 0 jumps to the target)
+            strategy: PID only, or predictive heat-up using the fitted thermal model
+        
+        Raises:
+            Exception: If the loop or autotune is already running, or the
+                predictive strategy is requested without a fitted model
+        """
+        from autotune import get_autotuner
+        if get_autotuner().is_running:
+            raise Exception("PID autotune is running")
+        
+        with self._lock:
+            if self.is_running:
+                raise Exception("Heater control loop is already running")
+            
+            strategy = ControlStrategy(strategy)
+            self._model = get_thermal_model() if strategy == ControlStrategy.PREDICTIVE else None
+            if strategy == ControlStrategy.PREDICTIVE and self._model is None:
+                raise Exception("No thermal model has been fitted; POST /heater/model/fit first")
+            
+            self._pid = PIDEngine()
+            self.strategy = strategy
+            self.target_temperature = target_temperature
+            self.ramp_rate = HEATER_SETPOINT_RAMP_RATE if ramp_rate is None else ramp_rate
+            snapshot = get_sampler().get_snapshot()
+            if self.ramp_rate > 0 and snapshot is not None and snapshot.ok:
+                self.setpoint = snapshot.temperature
+            else:
+                self.setpoint = target_temperature
+            self.mode = HeaterMode(mode)
+            self.phase = ControlPhase.REGULATE
+            self.drive_mode = self.mode
+            if self._model is not None:
+                self._applied = deque(maxlen=max(1, int(round(self._model.dead_time / self.sample_time))))
+                self._plan_approach(snapshot.temperature if snapshot is not None and snapshot.ok else None)
+            self.last_output = None
+            self.iterations = 0
+            self.overruns = 0
+            self._jitter_ms.clear()
+            self.started_at = time.time()
+            
+            try:
+                self.session_id = get_session_recorder().start({
+                    "target_temperature": target_temperature,
+                    "mode": self.mode.value,
+                    "sample_time": self.sample_time,
+                    "sample_interval": self.sample_time,
+                    "ramp_rate": self.ramp_rate,
+                    "strategy": self.strategy.value,
+                    "gain_table": gain_table_to_json(self._pid.gain_table)
+                })
+            except Exception as e:
+                # Losing the recording must not stop the oven from heating
+                logger.error(f"Failed to start bake session recording: {e}")
+                self.session_id = None
+            
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="heater-control", daemon=True)
+            self._thread.start()
+        
+        logger.info(f"Heater control loop started: target={target_temperature}°C, mode={self.mode.value}, "
+                    f"sample_time={self.sample_time}s, ramp_rate={self.ramp_rate}°C/min, strategy={self.strategy.value}")
+    
+    def stop(self):
+        """Stop regulating and turn both heater elements off"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.sample_time * 2 + 1.0)
+            self._thread = None
+        get_heater_output().release()
+        get_session_recorder().stop()
+        logger.info("Heater control loop stopped")
+    
+    def set_target(self, target_temperature: float, mode: Optional[HeaterMode] = None,
+                   ramp_rate: Optional[float] = None):
+        """Change the target (and optionally the heater elements) of the running loop
+        
+        The PID keeps its integral, and the effective setpoint ramps from where
+        it is now to the new target at `ramp_rate` °C per minute (0 jumps to
+        the target). Like `mode`, a `ramp_rate` of None keeps the current one.
+        """
+        with self._lock:
+            if not self.is_running:
+                raise Exception("Heater control loop is not running")
+            if target_temperature == self.target_temperature and (mode is None or mode == self.mode) \
+                    and (ramp_rate is None or ramp_rate == self.ramp_rate):
+                return
+            self.target_temperature = target_temperature
+            if ramp_rate is not None:
+                self.ramp_rate = ramp_rate
+            if self.ramp_rate <= 0:
+                self.setpoint = target_temperature
+            if mode is not None:
+                self.mode = HeaterMode(mode)
+            if self._model is not None:
+                self._plan_approach(self.last_temperature)
+        logger.info(f"Heater control loop retargeted: target={target_temperature}°C, mode={self.mode.value}, "
+                    f"ramp_rate={self.ramp_rate}°C/min")
+    
+    def _run(self):
+        next_tick = time.monotonic()
+        last_tick = None
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            self._jitter_ms.append((now - next_tick) * 1000.0)
+            CONTROL_LOOP_JITTER_SECONDS.observe(max(0.0, now - next_tick))
+            
+            dt = now - last_tick if last_tick is not None else self.sample_time
+            last_tick = now
+            try:
+                self._step(dt)
+            except Exception as e:
+                logger.error(f"Heater control loop iteration failed: {e}")
+                self._safe_off()
+            CONTROL_LOOP_STEP_SECONDS.observe(time.monotonic() - now)
+            
+            # Fixed-rate schedule on the monotonic clock, skipping missed ticks after an overrun
+            next_tick += self.sample_time
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                self.overruns += 1
+                CONTROL_LOOP_OVERRUNS.inc()
+                next_tick = time.monotonic()
+                delay = 0
+            self._stop_event.wait(delay)
+        
+        self._safe_off()
+    
+    def _step(self, dt: float):
+        snapshot = get_sampler().get_snapshot()
+        if snapshot is None or not snapshot.ok or snapshot.age_ms() > HEATER_LOOP_MAX_SAMPLE_AGE * 1000.0:
+            logger.warning("No fresh temperature sample available, turning heaters off")
+            self._safe_off()
+            if snapshot is None or snapshot.ok:
+                faults = ("stale",)
+            else:
+                faults = snapshot.faults + (("read_error",) if snapshot.error else ())
+            get_session_recorder().record(None, self.setpoint, (0.0, 0.0, 0.0), 0.0,
+                                          self.mode.value, faults)
+            return
+        
+        with self._lock:
+            if self.phase != ControlPhase.REGULATE:
+                self.setpoint = self.target_temperature
+                output = self._predictive_output(snapshot.temperature)
+                components = (0.0, 0.0, 0.0)
+            if self.phase == ControlPhase.REGULATE:
+                self.setpoint = ramp_setpoint(self.setpoint, self.target_temperature, self.ramp_rate, dt)
+                output = self._pid.update(snapshot.temperature, self.setpoint, dt)
+                components = self._pid.components
+                self.drive_mode = self.mode
+            setpoint = self.setpoint
+            mode = self.drive_mode
+            if self._model is not None:
+                self._applied.append((mode.value, output))
+        
+        self.last_temperature = snapshot.temperature
+        self.last_output = output
+        self.last_update_time = time.time()
+        self.iterations += 1
+        
+        self._drive(mode, output)
+        get_session_recorder().record(snapshot.temperature, setpoint, components, output,
+                                      mode.value, snapshot.faults)
+    
+    def _plan_approach(self, temperature: Optional[float]):
+        """Pick the predictive phase for a new target: boost for large steps up, else PID"""
+        if temperature is not None and self.target_temperature - temperature > PREDICTIVE_BOOST_BAND:
+            self.phase = ControlPhase.BOOST
+            reachable = self._model.max_temperature(self.mode.value)
+            if reachable is not None and reachable < self.target_temperature:
+                logger.warning(f"Thermal model says {self.mode.value} elements top out at {reachable:.0f}°C, "
+                               f"below the {self.target_temperature}°C target")
+        else:
+            self.phase = ControlPhase.REGULATE
+    
+    def _predictive_output(self, temperature: float) -> float:
+        """Boost/coast step of the predictive strategy; switches to REGULATE when done"""
+        model = self._model
+        target = self.target_temperature
+        if self.phase == ControlPhase.BOOST:
+            peak = model.predict_peak(temperature, list(self._applied), self.sample_time)
+            if peak < target - PREDICTIVE_OVERSHOOT_MARGIN:
+                self.drive_mode = HeaterMode(model.fastest_mode() or self.mode.value)
+                return 1.0
+            logger.info(f"Predictive heat-up: cutting power at {temperature:.1f}°C, "
+                        f"predicted peak {peak:.1f}°C for target {target}°C")
+            self.phase = ControlPhase.COAST
+        
+        # Coast until the oven arrives or stops rising, then regulate
+        rising = self.last_temperature is None or temperature > self.last_temperature
+        if temperature < target - PREDICTIVE_OVERSHOOT_MARGIN and rising:
+            self.drive_mode = self.mode
+            return 0.0
+        
+        feed_forward = model.steady_state_duty(target, self.mode.value)
+        self._pid.preload(feed_forward if feed_forward is not None else 0.0)
+        self.phase = ControlPhase.REGULATE
+        logger.info(f"Predictive heat-up: regulating from {temperature:.1f}°C with feed-forward duty {feed_forward}")
+        return 0.0
+    
+    def _drive(self, mode: HeaterMode, duty: float):
+        """Apply the duty to the elements selected by the mode and zero the others"""
+        energized = HEATER_MODE_GPIOS[mode]
+        get_heater_output().set_duties({
+            gpio_num: duty if gpio_num in energized else 0.0
+            for gpio_num in (BACK_HEATER_GPIO, FRONT_HEATER_GPIO)
+        })
+    
+    def _safe_off(self):
+        try:
+            get_heater_output().force_off()
+        except Exception as e:
+            logger.error(f"Failed to turn heaters off: {e}")
+    
+    @property
+    def heater_on(self):
+        """Whether any heater element is currently energized"""
+        return any(channel.state for channel in get_heater_output().channels.values())
+    
+    def get_jitter_stats(self):
+        """Summarize loop wake-up jitter over the recent window, in milliseconds"""
+        samples = sorted(self._jitter_ms)
+        if not samples:
+            return None
+        return {
+            "samples": len(samples),
+            "mean_ms": round(sum(samples) / len(samples), 3),
+            "p50_ms": round(samples[len(samples) // 2], 3),
+            "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 3),
+            "max_ms": round(samples[-1], 3),
+            "overruns": self.overruns
+        }
+    
+    def get_status(self):
+        """Get controller state for the API"""
+        status = {
+            "running": self.is_running,
+            "target_temperature": self.target_temperature,
+            "setpoint": self.setpoint,
+            "ramp_rate": self.ramp_rate,
+            "mode": self.mode.value,
+            "strategy": self.strategy.value,
+            "phase": self.phase.value if self.phase is not None else None,
+            "drive_mode": self.drive_mode.value if self.drive_mode is not None else None,
+            "current_temperature": self.last_temperature,
+            "pid_output": self.last_output,
+            "heater_on": self.heater_on,
+            "output": get_heater_output().get_status(),
+            "sample_time": self.sample_time,
+            "iterations": self.iterations,
+            "started_at": self.started_at,
+            "session_id": self.session_id,
+            "last_update_time": self.last_update_time,
+            "jitter": self.get_jitter_stats()
+        }
+        if self._pid is not None:
+            status["pid_tunings"] = self._pid.tunings
+            status["pid_components"] = self._pid.components
+            status["gain_band"] = self._pid.band
+        return status
+
+def get_controller() -> HeaterController:
+    """Get global heater controller instance"""
+    global _controller
+    
+    with _controller_lock:
+        if _controller is None:
+            _controller = HeaterController(sample_time=HEATER_PID_SAMPLE_TIME)
+    
+    return _controller
@@ -0,0 +1,198 @@
+# Import logger first to avoid circular imports
+from logger import logger
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+from config import DIAGNOSTICS_CACHE_TTL, DIAGNOSTICS_MAX_JOBS
+from hardware import diagnose_gpio_access
+from camera import diagnose_camera
+
+# --- Job states ---
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# --- Global diagnostics instance ---
+_diagnostics = None
+_diagnostics_lock = threading.Lock()
+
+class DiagnosticJob:
+    """One run of a diagnostic, with its progress and result"""
+    
+    def __init__(self, kind: str, params: Dict):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.params = params
+        self.state = PENDING
+        self.done = 0
+        self.total = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+    
+    @property
+    def is_active(self) -> bool:
+        return self.state in (PENDING, RUNNING)
+    
+    def set_progress(self, done: int, total: int):
+        self.done = done
+        self.total = total
+    
+    def to_dict(self, include_result: bool = True):
+        """Describe the job, optionally without its (possibly large) result"""
+        job = {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "state": self.state,
+            "progress": {"done": self.done, "total": self.total},
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error
+        }
+        if include_result:
+            job["result"] = self.result
+        return job
+
+class DiagnosticsManager:
+    """Runs diagnostics as background jobs and caches their results
+    
+    GPIO and camera diagnostics take from a fraction of a second up to
+    several seconds of probing and sleeping. Running them inside a request
+    tied up a worker (or the event loop) for that long, so here each run is a
+    job on a small thread pool: a request starts it, or joins the run already
+    in progress, and returns right away with the job ID and the last finished
+    result. Progress and the result are then fetched by ID.
+    """
+    
+    def __init__(self, cache_ttl: float = DIAGNOSTICS_CACHE_TTL, max_jobs: int = DIAGNOSTICS_MAX_JOBS):
+        self.cache_ttl = cache_ttl
+        self.max_jobs = max_jobs
+        self._runners: Dict[str, Callable[..., dict]] = {}
+        self._jobs: "OrderedDict[str, DiagnosticJob]" = OrderedDict()
+        self._last: Dict[str, DiagnosticJob] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="diagnostics")
+    
+    def register(self, kind: str, runner: Callable[..., dict]):
+        """Register a diagnostic
+        
+        Args:
+            kind: Name the diagnostic is started by
+            runner: Blocking callable taking a `progress(done, total)` callback and
+                the job parameters as keyword arguments, returning the result
+        """
+        self._runners[kind] = runner
+    
+    def start(self, kind: str, refresh: bool = False, **params) -> Tuple[Optional[DiagnosticJob], Optional[DiagnosticJob]]:
+        """Start a diagnostic in the background unless a fresh result is cached
+        
+        A run of the same kind already in progress is joined instead of
+        starting a second one next to it.
+        
+        Args:
+            kind: Registered diagnostic name
+            refresh: Run again even if the last result is still fresh
+            **params: Passed to the runner; a cached result only counts if it was run with the same ones
+        
+        Returns:
+            tuple: (running job, or None if the cached result is fresh; last finished job, or None)
+        
+        Raises:
+            ValueError: If the diagnostic kind is unknown
+        """
+        runner = self._runners.get(kind)
+        if runner is None:
+            raise ValueError(f"Unknown diagnostic '{kind}'. Available: {', '.join(self._runners)}")
+        
+        with self._lock:
+            last = self._last.get(kind)
+            active = next((job for job in reversed(self._jobs.values()) if job.kind == kind and job.is_active), None)
+            if active is not None:
+                return active, last
+            
+            fresh = (last is not None and last.params == params and last.state == COMPLETED
+                     and time.time() - last.finished_at < self.cache_ttl)
+            if fresh and not refresh:
+                return None, last
+            
+            job = DiagnosticJob(kind, params)
+            self._jobs[job.id] = job
+            self._trim()
+        
+        logger.info(f"Starting {kind} diagnostics job {job.id}")
+        self._executor.submit(self._run, job, runner)
+        return job, last
+    
+    def _trim(self):
+        # Drop the oldest finished jobs; running ones are always kept
+        finished = [job_id for job_id, job in self._jobs.items() if not job.is_active]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[job_id]
+    
+    def _run(self, job: DiagnosticJob, runner: Callable[..., dict]):
+        job.started_at = time.time()
+        job.state = RUNNING
+        try:
+            job.result = runner(progress=job.set_progress, **job.params)
+        except Exception as e:
+            job.error = str(e)
+            job.state = FAILED
+            logger.error(f"{job.kind} diagnostics job {job.id} failed: {e}")
+        else:
+            if job.total is not None:
+                job.done = job.total
+            job.state = COMPLETED
+            logger.info(f"{job.kind} diagnostics job {job.id} completed in {time.time() - job.started_at:.1f}s")
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._last[job.kind] = job
+    
+    def get_job(self, job_id: str) -> Optional[DiagnosticJob]:
+        """Get a job by ID, or None if it is unknown or was dropped"""
+        return self._jobs.get(job_id)
+    
+    def get_status(self):
+        """Registered diagnostics, recent jobs and the last finished job of each kind"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+            last = dict(self._last)
+        return {
+            "kinds": list(self._runners),
+            "cache_ttl": self.cache_ttl,
+            "jobs": [job.to_dict(include_result=False) for job in reversed(jobs)],
+            "last": {kind: job.to_dict(include_result=False) for kind, job in last.items()}
+        }
+    
+    def shutdown(self):
+        """Stop accepting jobs and drop the queued ones; running ones finish on their own"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+def describe_start(job: Optional[DiagnosticJob], last: Optional[DiagnosticJob]):
+    """Response body for a started diagnostic: the last finished result plus the job now running, if any"""
+    return {
+        "status": "success",
+        "data": last.result if last is not None else None,
+        "finished_at": last.finished_at if last is not None else None,
+        "job": job.to_dict(include_result=False) if job is not None else None
+    }
+
+def get_diagnostics() -> DiagnosticsManager:
+    """Get global diagnostics instance"""
+    global _diagnostics
+    
+    with _diagnostics_lock:
+        if _diagnostics is None:
+            _diagnostics = DiagnosticsManager()
+            _diagnostics.register("gpio", diagnose_gpio_access)
+            _diagnostics.register("camera", diagnose_camera)
+    
+    return _diagnostics
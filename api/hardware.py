@@ -1,27 +1,48 @@
-# --- Hardware imports with error handling ---
-try:
-    import board
-    import busio
-    import digitalio
-    import adafruit_max31865
+import importlib.util
+from config import HARDWARE_BACKEND
+
+# --- Hardware availability ---
+# Importing board/busio probes the platform and takes a noticeable part of startup on the Pi,
+# so only check the libraries are installed here; load_hardware_libraries() imports them on first use
+SIMULATED = HARDWARE_BACKEND == "simulated"
+HARDWARE_LIBRARIES = ("board", "busio", "digitalio", "adafruit_max31865")
+if SIMULATED:
     HARDWARE_AVAILABLE = True
-    CIRCUITPYTHON_AVAILABLE = True
-except ImportError as e:
-    HARDWARE_AVAILABLE = False
-    CIRCUITPYTHON_AVAILABLE = False
-except Exception as e:
-    HARDWARE_AVAILABLE = False
     CIRCUITPYTHON_AVAILABLE = False
+else:
+    try:
+        HARDWARE_AVAILABLE = all(importlib.util.find_spec(name) is not None for name in HARDWARE_LIBRARIES)
+    except Exception as e:
+        HARDWARE_AVAILABLE = False
+    CIRCUITPYTHON_AVAILABLE = HARDWARE_AVAILABLE
+
+# Set by load_hardware_libraries()
+board = None
+busio = None
+digitalio = None
+adafruit_max31865 = None
 
 # Import logger after hardware imports to avoid circular imports
-from logger import logger
+from logger import logger, read_logger
+import math
 import time
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, NamedTuple, Optional, Sequence
+from hardware_actor import Priority, get_hardware_actor
+from metrics import (
+    SENSOR_READ_SECONDS, SENSOR_READ_ERRORS, SENSOR_SAMPLES, SENSOR_REJECTED,
+    GPIO_WRITE_SECONDS, GPIO_READ_SECONDS, GPIO_ERRORS
+)
 
 # Now log the hardware status
-if HARDWARE_AVAILABLE:
-    logger.info("CircuitPython libraries imported successfully")
+if SIMULATED:
+    logger.warning("Using the simulated hardware backend")
+elif HARDWARE_AVAILABLE:
+    logger.info("CircuitPython libraries found, importing them on first use")
 else:
-    logger.error("Failed to import CircuitPython libraries")
+    logger.error("CircuitPython libraries not installed")
 
 if CIRCUITPYTHON_AVAILABLE:
     logger.info("CircuitPython libraries available")
@@ -29,21 +50,76 @@ else:
     logger.info("CircuitPython libraries not available")
 
 # Import config after hardware imports
-from config import RTD_NOMINAL, REF_RESISTOR, WIRES
+from config import (
+    RTD_NOMINAL, REF_RESISTOR, WIRES, SENSOR_SAMPLE_INTERVAL,
+    SENSOR_CONTINUOUS_CONVERSION, SENSOR_CONVERSION_TIME, SENSOR_OVERSAMPLE, SENSOR_SMOOTHING,
+    SENSOR_EMA_ALPHA, SENSOR_KALMAN_PROCESS_NOISE, SENSOR_KALMAN_MEASUREMENT_NOISE,
+    SENSOR_MIN_TEMPERATURE, SENSOR_MAX_TEMPERATURE, SENSOR_MAX_RATE, SENSOR_MAX_REJECTED,
+    BACK_HEATER_GPIO, FRONT_HEATER_GPIO, GPIO_BANK_BACKEND, GPIO_CHIP,
+    DIAGNOSTICS_GPIO_PARALLELISM
+)
 
 # --- Global sensor instance ---
 _sensor = None
+_sensor_lock = threading.Lock()
+
+# --- Lazily imported hardware libraries ---
+_libraries_lock = threading.Lock()
 
 # --- Global GPIO object tracking ---
 _gpio_objects = {}
+
+# --- Global heater GPIO bank ---
+HEATER_GPIOS = (BACK_HEATER_GPIO, FRONT_HEATER_GPIO)
+_gpio_bank = None
+_gpio_bank_lock = threading.Lock()
+
+# --- Global temperature sampler instance ---
+_sampler = None
+_sampler_lock = threading.Lock()
+
+# MAX31865 fault register bits, in the order returned by adafruit_max31865's `fault` property
+MAX31865_FAULT_NAMES = (
+    "high_threshold",
+    "low_threshold",
+    "refin_low",
+    "refin_high",
+    "rtdin_low",
+    "over_under_voltage",
+)
+
+# MAX31865 RTD data register; bit 0 is the fault flag, bits 1-15 the ratio to the reference resistor
+MAX31865_RTD_MSB_REGISTER = 0x01
+# Callendar-Van Dusen coefficients for platinum RTDs (same as adafruit_max31865)
+RTD_A = 3.9083e-3
+RTD_B = -5.775e-7
+
+def rtd_temperature(resistance: float, rtd_nominal: float) -> float:
+    """Convert an RTD resistance to °C, as adafruit_max31865 does"""
+    z1 = -RTD_A
+    z2 = RTD_A * RTD_A - (4 * RTD_B)
+    z3 = (4 * RTD_B) / rtd_nominal
+    z4 = 2 * RTD_B
+    temp = z2 + (z3 * resistance)
+    if temp >= 0:
+        temp = (math.sqrt(temp) + z1) / z4
+        if temp >= 0:
+            return temp
+    
+    # Below 0°C use the polynomial fit
+    ratio = resistance / rtd_nominal * 100
+    return (-242.02 + 2.2228 * ratio + 2.5859e-3 * ratio ** 2 - 4.8260e-6 * ratio ** 3
+            - 2.8183e-8 * ratio ** 4 + 1.5243e-10 * ratio ** 5)
+
 class MAX31865Adafruit:
     """MAX31865 implementation using Adafruit CircuitPython library"""
     
-    def __init__(self, rtd_nominal=100, ref_resistor=430, wires=3):
+    def __init__(self, rtd_nominal=100, ref_resistor=430, wires=3, continuous=SENSOR_CONTINUOUS_CONVERSION):
         # Store configuration parameters
         self.rtd_nominal = rtd_nominal
         self.ref_resistor = ref_resistor
         self.wires = wires
+        self.continuous = False
         
         # Create sensor object, communicating over the board's default SPI bus
         self.spi = busio.SPI(board.SCLK, MOSI=board.MOSI, MISO=board.MISO)
@@ -70,57 +146,434 @@ class MAX31865Adafruit:
             logger.info("Configured for PT1000 sensor")
         else:
             logger.warning(f"Unknown RTD nominal value: {self.rtd_nominal}Ω")
+        
+        if continuous:
+            self.start_continuous()
+    
+    def start_continuous(self):
+        """Switch the MAX31865 to continuous (auto) conversion
+        
+        The bias voltage stays on and the chip converts every SENSOR_CONVERSION_TIME,
+        so a read is a single register access instead of the library's bias/one-shot/wait
+        sequence (~75 ms per read).
+        """
+        if not hasattr(self.sensor, "auto_convert") or not hasattr(self.sensor, "_read_u16"):
+            logger.warning("adafruit_max31865 does not support continuous conversion, using one-shot reads")
+            return
+        try:
+            self.sensor.bias = True
+            self.sensor.auto_convert = True
+            # Let the bias settle and the first conversions complete
+            time.sleep(SENSOR_CONVERSION_TIME * 3)
+            self.continuous = True
+            logger.info("MAX31865 continuous conversion enabled")
+        except Exception as e:
+            logger.warning(f"Failed to enable MAX31865 continuous conversion, using one-shot reads: {e}")
     
     def temperature(self):
-        """Get temperature in Celsius"""
+        """Get temperature in Celsius from a single conversion"""
+        start = time.perf_counter()
         try:
-            # Read temperature
-            temp = self.sensor.temperature
-            logger.info(f"Temperature: {temp:.3f}°C")
-            
-            # Check for invalid readings and log sensor state
-            if temp < -200 or temp > 850:
-                logger.warning(f"Invalid temperature reading: {temp:.3f}°C")
-                try:
-                    # Try to get sensor fault status
-                    fault = self.sensor.fault
-                    if fault:
-                        logger.error(f"MAX31865 fault detected: {fault}")
-                except:
-                    pass
-                logger.warning("Check wiring and sensor configuration")
-            
+            if self.continuous:
+                # Latest conversion straight from the RTD register
+                raw = self.sensor._read_u16(MAX31865_RTD_MSB_REGISTER) >> 1
+                temp = rtd_temperature(raw * self.ref_resistor / 32768, self.rtd_nominal)
+            else:
+                temp = self.sensor.temperature
+            SENSOR_READ_SECONDS.observe(time.perf_counter() - start)
+            read_logger.debug("Temperature: %.3f°C", temp)
             return temp
         except Exception as e:
-            logger.error(f"Error reading temperature: {e}")
+            SENSOR_READ_ERRORS.inc()
+            logger.error("Error reading temperature: %s", e)
             raise
     
+    def read_fault(self):
+        """Get the names of the currently latched MAX31865 fault flags"""
+        fault = self.sensor.fault
+        return tuple(name for name, active in zip(MAX31865_FAULT_NAMES, fault) if active)
+    
+    def clear_faults(self):
+        """Clear latched fault flags; one-shot reads do this themselves, continuous mode doesn't"""
+        self.sensor.clear_faults()
+    
     def close(self):
         """Clean up resources"""
+        if self.continuous:
+            try:
+                self.sensor.auto_convert = False
+                self.sensor.bias = False
+            except Exception as e:
+                logger.warning(f"Failed to stop MAX31865 continuous conversion: {e}")
         if hasattr(self, 'cs'):
             self.cs.deinit()
 
-def get_sensor():
-    global _sensor
+def load_hardware_libraries():
+    """Import the CircuitPython libraries (or their simulated stand-ins) on first use
+    
+    Raises:
+        Exception: If the libraries are not installed or fail to import
+    """
+    global board, busio, digitalio, adafruit_max31865
+    if board is not None:
+        return
     if not HARDWARE_AVAILABLE:
         raise Exception("Hardware libraries not available")
     
-    if _sensor is None:
-        logger.info("Initializing SPI and sensor...")
+    with _libraries_lock:
+        if board is not None:
+            return
+        start = time.monotonic()
         try:
-            # Use Adafruit CircuitPython implementation
-            _sensor = MAX31865Adafruit(
-                rtd_nominal=RTD_NOMINAL, 
-                ref_resistor=REF_RESISTOR, 
-                wires=WIRES
-            )
-            logger.info("Sensor initialized successfully using Adafruit CircuitPython")
+            if SIMULATED:
+                import simulator
+                busio, digitalio, adafruit_max31865 = simulator.busio, simulator.digitalio, simulator.adafruit_max31865
+                board = simulator.board
+            else:
+                # board last: it is the flag the unlocked check above looks at
+                import busio
+                import digitalio
+                import adafruit_max31865
+                import board
         except Exception as e:
-            logger.error(f"Failed to initialize sensor: {e}")
-            raise
+            logger.error(f"Failed to import CircuitPython libraries: {e}")
+            raise Exception(f"Failed to import CircuitPython libraries: {e}")
+        logger.info(f"Hardware libraries imported in {(time.monotonic() - start) * 1000:.0f} ms")
+
+def is_sensor_initialized() -> bool:
+    """Whether get_sensor() has already set up SPI and the MAX31865"""
+    return _sensor is not None
+
+def get_sensor():
+    """Get the MAX31865, setting up SPI on first use; call it on the hardware actor"""
+    global _sensor
+    if _sensor is not None:
+        return _sensor
+    load_hardware_libraries()
+    
+    with _sensor_lock:
+        if _sensor is None:
+            logger.info("Initializing SPI and sensor...")
+            try:
+                # Use Adafruit CircuitPython implementation
+                _sensor = MAX31865Adafruit(
+                    rtd_nominal=RTD_NOMINAL, 
+                    ref_resistor=REF_RESISTOR, 
+                    wires=WIRES
+                )
+                logger.info("Sensor initialized successfully using Adafruit CircuitPython")
+            except Exception as e:
+                logger.error(f"Failed to initialize sensor: {e}")
+                raise
     
     return _sensor
 
+def _read_conversion() -> float:
+    """One conversion from the MAX31865; runs on the hardware actor"""
+    return get_sensor().temperature()
+
+def _read_and_clear_faults():
+    """Latched MAX31865 fault flags, cleared once read; runs on the hardware actor"""
+    sensor = get_sensor()
+    faults = sensor.read_fault()
+    if faults:
+        sensor.clear_faults()
+    return faults
+
+class FilterResult(NamedTuple):
+    """Outcome of feeding one sample's conversions to a TemperatureFilter"""
+    temperature: Optional[float]  # Filtered temperature; the last accepted one if this sample was rejected
+    raw: Optional[float]          # Median of the in-range conversions
+    rejected: Optional[str]       # "fault", "out_of_range" or "rate" if the sample was rejected
+
+class TemperatureFilter:
+    """Turns each burst of raw conversions into one trusted temperature
+    
+    A sample is rejected when the MAX31865 reports a fault, when none of its
+    conversions fall within SENSOR_MIN_TEMPERATURE..SENSOR_MAX_TEMPERATURE, or
+    when its median moves faster than `max_rate` from the last accepted sample.
+    Accepted medians are smoothed with an exponential moving average or a
+    scalar Kalman filter. After `max_rejected` rate rejections in a row the
+    change is taken to be real and the filter restarts from the new value.
+    """
+    
+    def __init__(self, smoothing: str = SENSOR_SMOOTHING, ema_alpha: float = SENSOR_EMA_ALPHA,
+                 process_noise: float = SENSOR_KALMAN_PROCESS_NOISE,
+                 measurement_noise: float = SENSOR_KALMAN_MEASUREMENT_NOISE,
+                 min_temperature: float = SENSOR_MIN_TEMPERATURE, max_temperature: float = SENSOR_MAX_TEMPERATURE,
+                 max_rate: float = SENSOR_MAX_RATE, max_rejected: int = SENSOR_MAX_REJECTED):
+        if smoothing not in ("none", "ema", "kalman"):
+            raise ValueError(f"Unknown sensor smoothing '{smoothing}'; use none, ema or kalman")
+        self.smoothing = smoothing
+        self.ema_alpha = ema_alpha
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.min_temperature = min_temperature
+        self.max_temperature = max_temperature
+        self.max_rate = max_rate
+        self.max_rejected = max_rejected
+        self.consecutive_rejected = 0
+        self.rejected_counts = {"fault": 0, "out_of_range": 0, "rate": 0}
+        self.reset()
+    
+    def reset(self):
+        """Forget the filter state; the next accepted sample is taken as-is"""
+        self._estimate = None
+        self._variance = None
+        self._last_raw = None
+        self._last_time = None
+    
+    def update(self, conversions: Sequence[float], faults: Sequence[str], now: float) -> FilterResult:
+        """Filter one sample
+        
+        Args:
+            conversions: Raw temperatures of the sample's conversions
+            faults: Active MAX31865 fault flags read with the sample
+            now: Monotonic time of the sample
+        """
+        valid = [t for t in conversions if self.min_temperature <= t <= self.max_temperature]
+        raw = statistics.median(valid) if valid else None
+        
+        if faults:
+            return self._reject("fault", raw)
+        if raw is None:
+            return self._reject("out_of_range", raw)
+        if self._last_raw is not None:
+            dt = max(now - self._last_time, 1e-3)
+            if abs(raw - self._last_raw) > self.max_rate * dt:
+                if self.consecutive_rejected + 1 < self.max_rejected:
+                    return self._reject("rate", raw)
+                logger.warning(f"Temperature moved from {self._last_raw:.1f}°C to {raw:.1f}°C over "
+                               f"{self.max_rejected} samples, restarting the sensor filter")
+                self.reset()
+        
+        self._accept(raw, now)
+        return FilterResult(self._estimate, raw, None)
+    
+    def _accept(self, raw: float, now: float):
+        dt = 0.0 if self._last_time is None else now - self._last_time
+        self._last_raw = raw
+        self._last_time = now
+        self.consecutive_rejected = 0
+        
+        if self._estimate is None or self.smoothing == "none":
+            self._estimate = raw
+            self._variance = self.measurement_noise
+        elif self.smoothing == "ema":
+            self._estimate += self.ema_alpha * (raw - self._estimate)
+        else:
+            # Scalar Kalman filter with a constant-temperature process model
+            self._variance += self.process_noise * dt
+            gain = self._variance / (self._variance + self.measurement_noise)
+            self._estimate += gain * (raw - self._estimate)
+            self._variance *= 1.0 - gain
+    
+    def _reject(self, reason: str, raw: Optional[float]) -> FilterResult:
+        self.consecutive_rejected += 1
+        self.rejected_counts[reason] += 1
+        return FilterResult(self._estimate, raw, reason)
+
+class SensorSnapshot(NamedTuple):
+    """Immutable view of the most recent sensor sample"""
+    sequence: int
+    temperature: Optional[float]
+    timestamp: float            # Wall clock time of the sample (time.time())
+    monotonic: float            # Monotonic time of the sample (time.monotonic())
+    faults: tuple               # Names of active MAX31865 fault flags
+    error: Optional[str]        # Read error, if the sample failed
+    raw: Optional[float] = None       # Unfiltered median of the sample's conversions
+    rejected: Optional[str] = None    # Why the filter rejected this sample; `temperature` is then the last accepted value
+    
+    @property
+    def ok(self):
+        return self.error is None and self.temperature is not None
+    
+    def age_ms(self, now: Optional[float] = None):
+        """Age of the sample in milliseconds"""
+        if now is None:
+            now = time.monotonic()
+        return (now - self.monotonic) * 1000.0
+    
+    def to_dict(self):
+        return {
+            "temperature": self.temperature,
+            "timestamp": self.timestamp,
+            "age_ms": round(self.age_ms(), 3),
+            "sequence": self.sequence,
+            "faults": list(self.faults),
+            "error": self.error,
+            "raw": self.raw,
+            "rejected": self.rejected
+        }
+
+class TemperatureSampler:
+    """Reads the MAX31865 at a fixed rate on a background thread
+    
+    The latest reading is published as an immutable SensorSnapshot by swapping a
+    single reference, so readers never take a lock and never touch the SPI bus.
+    Each sample combines `oversample` conversions and passes them through a
+    TemperatureFilter, so a glitched conversion never reaches the controller.
+    """
+    
+    def __init__(self, interval: float = SENSOR_SAMPLE_INTERVAL, oversample: int = SENSOR_OVERSAMPLE):
+        self.interval = interval
+        self.oversample = max(1, oversample)
+        self.filter = TemperatureFilter()
+        self._snapshot = None
+        self._sequence = 0
+        self._read_lock = threading.Lock()  # Serializes SPI access between the thread and forced reads
+        self._listeners = []
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def add_listener(self, callback):
+        """Register a callable invoked with every new SensorSnapshot, on the thread that took the sample"""
+        self._listeners.append(callback)
+    
+    def remove_listener(self, callback):
+        """Unregister a callable added with add_listener"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self):
+        """Start the sampler thread"""
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="temperature-sampler", daemon=True)
+        self._thread.start()
+        logger.info(f"Temperature sampler started at {1.0 / self.interval:.1f} Hz")
+    
+    def stop(self):
+        """Stop the sampler thread"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(1.0, self.interval * 2))
+            self._thread = None
+        logger.info("Temperature sampler stopped")
+    
+    def _run(self):
+        next_sample = time.monotonic()
+        while not self._stop_event.is_set():
+            self.sample()
+            
+            # Schedule against the monotonic clock so slow reads don't accumulate drift
+            next_sample += self.interval
+            delay = next_sample - time.monotonic()
+            if delay < 0:
+                # Fell behind (e.g. slow SPI read), skip missed slots instead of bursting
+                next_sample = time.monotonic()
+                delay = 0
+            self._stop_event.wait(delay)
+    
+    def sample(self):
+        """Read the sensor once and publish the result
+        
+        Returns:
+            SensorSnapshot: The newly published snapshot
+        """
+        with self._read_lock:
+            temperature = None
+            faults = ()
+            error = None
+            result = None
+            try:
+                actor = get_hardware_actor()
+                conversions = []
+                for index in range(self.oversample):
+                    if index and _sensor is not None and _sensor.continuous:
+                        # Wait for a new conversion here, not on the hardware actor
+                        time.sleep(SENSOR_CONVERSION_TIME)
+                    conversions.append(actor.call(Priority.READ, _read_conversion))
+                try:
+                    faults = actor.call(Priority.READ, _read_and_clear_faults)
+                except Exception as e:
+                    logger.warning(f"Failed to read MAX31865 fault register: {e}")
+                
+                result = self.filter.update(conversions, faults, time.monotonic())
+                temperature = result.temperature
+                if result.rejected is not None:
+                    SENSOR_REJECTED.labels(result.rejected).inc()
+                    logger.warning("Rejected temperature sample (%s): raw=%s, faults=%s",
+                                   result.rejected, result.raw, faults)
+                    if self.filter.consecutive_rejected >= self.filter.max_rejected or temperature is None:
+                        error = f"{self.filter.consecutive_rejected} consecutive temperature samples rejected ({result.rejected})"
+            except Exception as e:
+                error = str(e)
+            
+            self._sequence += 1
+            SENSOR_SAMPLES.inc()
+            snapshot = SensorSnapshot(
+                sequence=self._sequence,
+                temperature=temperature,
+                timestamp=time.time(),
+                monotonic=time.monotonic(),
+                faults=faults,
+                error=error,
+                raw=result.raw if result is not None else None,
+                rejected=result.rejected if result is not None else None
+            )
+            self._snapshot = snapshot
+        
+        for listener in list(self._listeners):
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.error(f"Sensor sample listener failed: {e}")
+        return snapshot
+    
+    def get_snapshot(self, max_age_ms: Optional[float] = None):
+        """Get the latest snapshot without touching the sensor
+        
+        Args:
+            max_age_ms: If given and the cached sample is older than this, a fresh
+                sample is read synchronously before returning
+        
+        Returns:
+            SensorSnapshot or None if nothing has been sampled yet and no max age was given
+        """
+        snapshot = self._snapshot
+        if max_age_ms is None:
+            return snapshot
+        if snapshot is None or snapshot.age_ms() > max_age_ms:
+            snapshot = self.sample()
+        return snapshot
+
+def get_sampler():
+    """Get global temperature sampler instance"""
+    global _sampler
+    
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = TemperatureSampler(interval=SENSOR_SAMPLE_INTERVAL, oversample=SENSOR_OVERSAMPLE)
+    
+    return _sampler
+
+def read_temperature(max_age_ms: Optional[float] = None):
+    """Get the latest temperature from the sampler
+    
+    Args:
+        max_age_ms: Maximum acceptable age of the sample in milliseconds
+    
+    Returns:
+        SensorSnapshot: A successful snapshot
+    
+    Raises:
+        Exception: If no sample is available or the latest sample failed
+    """
+    sampler = get_sampler()
+    snapshot = sampler.get_snapshot(max_age_ms=max_age_ms)
+    if snapshot is None:
+        # Sampler not running yet, read synchronously
+        snapshot = sampler.sample()
+    if snapshot.error is not None:
+        raise Exception(snapshot.error)
+    return snapshot
+
 def get_available_gpios():
     """Get list of available GPIO numbers from GPIO_MAP"""
     return list(GPIO_MAP.keys())
@@ -129,8 +582,10 @@ def get_gpio_info():
     """Get detailed information about available GPIOs"""
     return {
         "available_gpios": get_available_gpios(),
-        "gpio_map": GPIO_MAP,
-        "hardware_available": HARDWARE_AVAILABLE
+        "gpio_map": dict(GPIO_MAP),
+        "hardware_available": HARDWARE_AVAILABLE,
+        "backend": HARDWARE_BACKEND,
+        "bank": get_gpio_bank().get_status()
     }
 
 def validate_gpio(gpio_num: int):
@@ -138,35 +593,258 @@ def validate_gpio(gpio_num: int):
     
     Args:
         gpio_num: GPIO number to validate
-        
+    
     Returns:
         board object corresponding to the GPIO number
-        
+    
     Raises:
         ValueError: If GPIO number is not supported
+        Exception: If the hardware libraries can't be imported
     """
     if gpio_num not in GPIO_MAP:
         available_gpios = get_available_gpios()
         raise ValueError(f"Unsupported GPIO number: {gpio_num}. Available GPIOs: {available_gpios}")
     
-    return GPIO_MAP[gpio_num]
+    load_hardware_libraries()
+    return getattr(board, GPIO_MAP[gpio_num])
 
-def set_output(gpio_num: int, state: bool):
+class GpioBank:
+    """Output GPIOs switched together, with an in-memory copy of their state
+    
+    write() applies all the pin states of one call as a single lgpio group
+    write when lgpio is available, so e.g. going from the back to the front
+    element never passes through both on or both off. Without lgpio the pins
+    are written back to back under the bank lock, pins turning off first.
+    
+    The shadow state is only updated once the hardware write succeeded and
+    the bank claims its pins exclusively, so reads are served from memory.
+    """
+    
+    def __init__(self, gpio_nums: Sequence[int], chip: int = GPIO_CHIP, backend: str = GPIO_BANK_BACKEND):
+        if backend not in ("auto", "lgpio", "digitalio"):
+            raise ValueError(f"Unknown GPIO bank backend: {backend}. Use 'auto', 'lgpio' or 'digitalio'")
+        self.gpio_nums = tuple(gpio_nums)
+        self.chip = chip
+        self.requested_backend = backend
+        self.backend = None  # "lgpio" or "digitalio" once open
+        self._lgpio = None
+        self._handle = None
+        self._pins = {}
+        self.inhibited = False  # Set by the over-temperature interlock; only writes turning pins off are accepted
+        # Replaced as a whole on every write, so readers never need the lock
+        self._state = {gpio_num: False for gpio_num in self.gpio_nums}
+        self._lock = threading.Lock()
+    
+    @property
+    def is_open(self) -> bool:
+        return self.backend is not None
+    
+    def open(self):
+        """Claim the pins as outputs, all LOW
+        
+        Raises:
+            Exception: If hardware not available or the pins can't be claimed
+        """
+        get_hardware_actor().call(Priority.CONTROL, self._locked_open)
+    
+    def _locked_open(self):
+        with self._lock:
+            if not self.is_open:
+                self._open()
+    
+    def _open(self):
+        if not HARDWARE_AVAILABLE:
+            raise Exception("Hardware libraries not available")
+        for gpio_num in self.gpio_nums:
+            validate_gpio(gpio_num)
+            # The bank owns its pins; drop any object an earlier set_output created
+            if gpio_num in _gpio_objects:
+                cleanup_gpio(gpio_num)
+        
+        if self.requested_backend != "digitalio" and not SIMULATED:
+            try:
+                self._open_lgpio()
+            except Exception as e:
+                if self.requested_backend == "lgpio":
+                    raise Exception(f"lgpio group writes unavailable: {e}")
+                logger.warning(f"lgpio group writes unavailable ({e}), writing GPIOs {list(self.gpio_nums)} one at a time")
+        
+        if self.backend is None:
+            for gpio_num in self.gpio_nums:
+                pin = digitalio.DigitalInOut(getattr(board, GPIO_MAP[gpio_num]))
+                pin.direction = digitalio.Direction.OUTPUT
+                pin.value = False
+                self._pins[gpio_num] = pin
+            self.backend = "digitalio"
+        
+        self._state = {gpio_num: False for gpio_num in self.gpio_nums}
+        logger.info(f"GPIO bank {list(self.gpio_nums)} claimed as outputs using {self.backend}")
+    
+    def _open_lgpio(self):
+        import lgpio
+        handle = lgpio.gpiochip_open(self.chip)
+        try:
+            lgpio.group_claim_output(handle, list(self.gpio_nums), [0] * len(self.gpio_nums))
+        except Exception:
+            lgpio.gpiochip_close(handle)
+            raise
+        self._lgpio = lgpio
+        self._handle = handle
+        self.backend = "lgpio"
+    
+    def write(self, states: Dict[int, bool], priority: Priority = Priority.CONTROL):
+        """Apply the given pin states in one transaction on the hardware actor
+        
+        Args:
+            states: Desired state per GPIO number; pins not listed keep their state
+            priority: Hardware actor priority, SAFETY for cutoffs
+        
+        Raises:
+            ValueError: If a GPIO is not part of the bank
+            Exception: If the hardware write fails
+        """
+        for gpio_num in states:
+            if gpio_num not in self._state:
+                raise ValueError(f"GPIO {gpio_num} is not in the GPIO bank. Bank GPIOs: {list(self.gpio_nums)}")
+        get_hardware_actor().call(priority, self._write, states)
+    
+    def _write(self, states: Dict[int, bool]):
+        start = time.perf_counter()
+        with self._lock:
+            if not self.is_open:
+                self._open()
+            changes = {gpio_num: bool(state) for gpio_num, state in states.items() if self._state[gpio_num] != bool(state)}
+            if not changes:
+                return
+            if self.inhibited and any(changes.values()):
+                raise Exception("Heater outputs are locked off by the over-temperature interlock")
+            new_state = dict(self._state)
+            new_state.update(changes)
+            try:
+                if self.backend == "lgpio":
+                    bits = sum(1 << i for i, gpio_num in enumerate(self.gpio_nums) if new_state[gpio_num])
+                    mask = sum(1 << i for i, gpio_num in enumerate(self.gpio_nums) if gpio_num in changes)
+                    self._lgpio.group_write(self._handle, self.gpio_nums[0], bits, mask)
+                else:
+                    # Off first, so a failure half way never leaves an extra pin on
+                    for gpio_num, state in sorted(changes.items(), key=lambda item: item[1]):
+                        self._pins[gpio_num].value = state
+                        self._state = {**self._state, gpio_num: state}
+            except Exception as e:
+                GPIO_ERRORS.labels("write").inc()
+                logger.error(f"GPIO bank write {changes} failed: {e}")
+                raise Exception(f"GPIO operation failed: {e}")
+            self._state = new_state
+        GPIO_WRITE_SECONDS.observe(time.perf_counter() - start)
+        logger.info("GPIO bank set %s", changes)
+    
+    def read(self, gpio_num: int) -> bool:
+        """Last state written to a pin, from memory
+        
+        Raises:
+            ValueError: If the GPIO is not part of the bank
+        """
+        try:
+            return self._state[gpio_num]
+        except KeyError:
+            raise ValueError(f"GPIO {gpio_num} is not in the GPIO bank. Bank GPIOs: {list(self.gpio_nums)}")
+    
+    def states(self) -> Dict[int, bool]:
+        """Last state written to every pin, from memory"""
+        return dict(self._state)
+    
+    def close(self):
+        """Drive every pin LOW and release them"""
+        get_hardware_actor().call(Priority.SAFETY, self._close)
+    
+    def _close(self):
+        with self._lock:
+            if not self.is_open:
+                return
+            try:
+                if self.backend == "lgpio":
+                    self._lgpio.group_write(self._handle, self.gpio_nums[0], 0)
+                    self._lgpio.group_free(self._handle, self.gpio_nums[0])
+                    self._lgpio.gpiochip_close(self._handle)
+                else:
+                    for pin in self._pins.values():
+                        pin.value = False
+                        pin.deinit()
+            except Exception as e:
+                logger.error(f"Failed to release GPIO bank: {e}")
+            self._pins = {}
+            self._handle = None
+            self.backend = None
+            self._state = {gpio_num: False for gpio_num in self.gpio_nums}
+            logger.info(f"GPIO bank {list(self.gpio_nums)} released")
+    
+    def get_status(self):
+        return {
+            "gpios": list(self.gpio_nums),
+            "backend": self.backend,
+            "requested_backend": self.requested_backend,
+            "chip": self.chip,
+            "inhibited": self.inhibited,
+            "states": self.states()
+        }
+
+def get_gpio_bank() -> GpioBank:
+    """Get global heater GPIO bank instance"""
+    global _gpio_bank
+    if _gpio_bank is not None:
+        # Status reads go through here, skip the lock once the bank exists
+        return _gpio_bank
+    
+    with _gpio_bank_lock:
+        if _gpio_bank is None:
+            _gpio_bank = GpioBank(HEATER_GPIOS)
+    
+    return _gpio_bank
+
+def set_outputs(states: Dict[int, bool], priority: Priority = Priority.CONTROL):
+    """Set several GPIO outputs, heater GPIOs in one GPIO bank transaction
+    
+    Args:
+        states: Desired state per GPIO number
+        priority: Hardware actor priority, SAFETY for cutoffs
+    
+    Raises:
+        Exception: If hardware not available or GPIO operation fails
+    """
+    get_hardware_actor().call(priority, _set_outputs, states)
+
+def _set_outputs(states: Dict[int, bool]):
+    bank_states = {gpio_num: state for gpio_num, state in states.items() if gpio_num in HEATER_GPIOS}
+    if bank_states:
+        get_gpio_bank().write(bank_states)
+    for gpio_num, state in states.items():
+        if gpio_num not in bank_states:
+            _set_output(gpio_num, state)
+
+def set_output(gpio_num: int, state: bool, priority: Priority = Priority.CONTROL):
     """Set GPIO output to specified state using persistent GPIO object
     
     Args:
         gpio_num: GPIO number to control
         state: True for HIGH, False for LOW
-        
+        priority: Hardware actor priority, SAFETY for cutoffs
+    
     Returns:
         bool: True if successful
-        
+    
     Raises:
         Exception: If hardware not available or GPIO operation fails
     """
     if not HARDWARE_AVAILABLE:
         raise Exception("Hardware libraries not available")
+    return get_hardware_actor().call(priority, _set_output, gpio_num, state)
+
+def _set_output(gpio_num: int, state: bool):
+    if gpio_num in HEATER_GPIOS:
+        get_gpio_bank().write({gpio_num: state})
+        return True
     
+    start = time.perf_counter()
     try:
         # Validate GPIO number and get board object
         board_gpio = validate_gpio(gpio_num)
@@ -186,19 +864,23 @@ def set_output(gpio_num: int, state: bool):
         
         # Set the value
         gpio_obj.value = state
+        GPIO_WRITE_SECONDS.observe(time.perf_counter() - start)
         
-        logger.info(f"GPIO {gpio_num} output set to {state}")
+        logger.info("GPIO %s output set to %s", gpio_num, state)
         return True
-        
+    
     except ValueError as e:
         # GPIO validation error - already has proper message
+        GPIO_ERRORS.labels("write").inc()
         logger.error(str(e))
         raise Exception(str(e))
     except PermissionError as e:
+        GPIO_ERRORS.labels("write").inc()
         error_msg = f"Permission denied accessing GPIO {gpio_num}. Check if running with proper privileges or if GPIO device is accessible."
         logger.error(error_msg)
         raise Exception(error_msg)
     except OSError as e:
+        GPIO_ERRORS.labels("write").inc()
         if "busy" in str(e).lower():
             available_gpios = get_available_gpios()
             error_msg = f"GPIO {gpio_num} is busy or already in use. Try a different GPIO from available options: {available_gpios}"
@@ -209,6 +891,7 @@ def set_output(gpio_num: int, state: bool):
         logger.error(error_msg)
         raise Exception(error_msg)
     except Exception as e:
+        GPIO_ERRORS.labels("write").inc()
         logger.error(f"Failed to set GPIO {gpio_num} output: {e}")
         raise Exception(f"GPIO operation failed: {e}")
 
@@ -217,13 +900,20 @@ def get_output(gpio_num: int):
     
     Args:
         gpio_num: GPIO number to check
-        
+    
     Returns:
         bool: The current output value, or False if GPIO not configured as output
-        
+    
     Raises:
         Exception: If GPIO number is not supported or not configured
     """
+    if gpio_num in HEATER_GPIOS:
+        # Served from the bank's shadow state, without touching the hardware
+        return get_gpio_bank().read(gpio_num)
+    return get_hardware_actor().call(Priority.READ, _get_output, gpio_num)
+
+def _get_output(gpio_num: int):
+    start = time.perf_counter()
     try:
         # Validate GPIO number
         validate_gpio(gpio_num)
@@ -242,14 +932,17 @@ def get_output(gpio_num: int):
             return False
         
         output_state = gpio_obj.value
-        logger.info(f"GPIO {gpio_num} current output value: {output_state}")
+        GPIO_READ_SECONDS.observe(time.perf_counter() - start)
+        read_logger.info("GPIO %s current output value: %s", gpio_num, output_state)
         return output_state
-        
+    
     except ValueError as e:
         # GPIO validation error - already has proper message
+        GPIO_ERRORS.labels("read").inc()
         logger.error(str(e))
         raise Exception(str(e))
     except Exception as e:
+        GPIO_ERRORS.labels("read").inc()
         logger.error(f"Failed to get GPIO {gpio_num} output state: {e}")
         raise Exception(f"GPIO operation failed: {e}")
 
@@ -258,16 +951,18 @@ def read_input(gpio_num: int):
     
     Args:
         gpio_num: GPIO number to read
-        
+    
     Returns:
         bool: True for HIGH, False for LOW
-        
+    
     Raises:
         Exception: If hardware not available or GPIO operation fails
     """
     if not HARDWARE_AVAILABLE:
         raise Exception("Hardware libraries not available")
-    
+    return get_hardware_actor().call(Priority.READ, _read_input, gpio_num)
+
+def _read_input(gpio_num: int):
     try:
         # Validate GPIO number and get board object
         board_gpio = validate_gpio(gpio_num)
@@ -288,9 +983,9 @@ def read_input(gpio_num: int):
         # Read the current state
         state = gpio_obj.value
         
-        logger.info(f"GPIO {gpio_num} input read as {state}")
+        read_logger.info("GPIO %s input read as %s", gpio_num, state)
         return state
-        
+    
     except ValueError as e:
         # GPIO validation error - already has proper message
         logger.error(str(e))
@@ -313,22 +1008,24 @@ def read_input(gpio_num: int):
         logger.error(f"Failed to read GPIO {gpio_num} input: {e}")
         raise Exception(f"GPIO operation failed: {e}")
 
-def get_gpio_object(gpio_num: int, direction=digitalio.Direction.OUTPUT):
+def get_gpio_object(gpio_num: int, direction=None):
     """Get or create a persistent GPIO object for direct manipulation
     
     Args:
         gpio_num: GPIO number to get/create
         direction: Direction for the GPIO (OUTPUT or INPUT)
-        
+    
     Returns:
-        digitalio.DigitalInOut: The GPIO object for direct manipulation
-        
+        digitalio.DigitalInOut: The GPIO object; access it through the hardware actor
+    
     Raises:
         Exception: If hardware not available or GPIO operation fails
     """
     if not HARDWARE_AVAILABLE:
         raise Exception("Hardware libraries not available")
-    
+    return get_hardware_actor().call(Priority.CONTROL, _get_gpio_object, gpio_num, direction)
+
+def _get_gpio_object(gpio_num: int, direction=None):
     try:
         # Validate GPIO number and get board object
         board_gpio = validate_gpio(gpio_num)
@@ -349,7 +1046,7 @@ def get_gpio_object(gpio_num: int, direction=digitalio.Direction.OUTPUT):
                 logger.info(f"Updated GPIO {gpio_num} direction to {direction}")
         
         return gpio_obj
-        
+    
     except ValueError as e:
         # GPIO validation error - already has proper message
         logger.error(str(e))
@@ -377,10 +1074,13 @@ def cleanup_gpio(gpio_num: int):
     
     Args:
         gpio_num: GPIO number to clean up
-        
+    
     Returns:
         bool: True if successful
     """
+    return get_hardware_actor().call(Priority.CONTROL, _cleanup_gpio, gpio_num)
+
+def _cleanup_gpio(gpio_num: int):
     global _gpio_objects
     
     if gpio_num in _gpio_objects:
@@ -406,11 +1106,74 @@ def cleanup_all_gpios():
     
     logger.info("Cleaned up all GPIO objects")
 
-def diagnose_gpio_access():
-    """Diagnose GPIO access issues and return detailed information"""
+def _probe_gpio_access(gpio_num: int):
+    """Create and release a GPIO object without setting values; runs on the hardware actor"""
+    gpio_obj = digitalio.DigitalInOut(validate_gpio(gpio_num))
+    gpio_obj.deinit()  # Clean up immediately
+
+def _probe_gpio_output(gpio_num: int):
+    """Create a throwaway output GPIO object for a toggle test; runs on the hardware actor"""
+    gpio_obj = digitalio.DigitalInOut(validate_gpio(gpio_num))
+    gpio_obj.direction = digitalio.Direction.OUTPUT
+    return gpio_obj
+
+def _set_probe_value(gpio_obj, value: bool):
+    gpio_obj.value = value
+
+def _diagnose_gpio_pin(gpio_num: int):
+    """Probe access to one GPIO, then toggle it on and off
+    
+    Returns:
+        tuple: (access result, toggle result)
+    """
+    # Each probe step is its own low-priority command, so heater writes and sensor reads run in between
+    actor = get_hardware_actor()
+    try:
+        actor.call(Priority.DIAGNOSTIC, _probe_gpio_access, gpio_num)
+        access = "SUCCESS"
+    except Exception as e:
+        access = f"FAILED: {e}"
+    
+    try:
+        # Create GPIO object and set as output
+        gpio_obj = actor.call(Priority.DIAGNOSTIC, _probe_gpio_output, gpio_num)
+        
+        # Toggle ON
+        actor.call(Priority.DIAGNOSTIC, _set_probe_value, gpio_obj, True)
+        logger.info(f"GPIO {gpio_num} toggled ON")
+        time.sleep(0.2)  # 200ms wait
+        
+        # Toggle OFF
+        actor.call(Priority.DIAGNOSTIC, _set_probe_value, gpio_obj, False)
+        logger.info(f"GPIO {gpio_num} toggled OFF")
+        time.sleep(0.2)  # 200ms wait
+        
+        # Clean up
+        actor.call(Priority.DIAGNOSTIC, gpio_obj.deinit)
+        toggle = "SUCCESS"
+    
+    except Exception as e:
+        toggle = f"FAILED: {e}"
+        logger.error(f"GPIO {gpio_num} toggle test failed: {e}")
+    
+    return access, toggle
+
+def diagnose_gpio_access(progress: Optional[Callable[[int, int], None]] = None,
+                         parallelism: int = DIAGNOSTICS_GPIO_PARALLELISM):
+    """Diagnose GPIO access issues and return detailed information
+    
+    The pins are independent, so up to `parallelism` of them are probed at
+    once: their toggle waits overlap while the probe commands themselves
+    still run one at a time on the hardware actor.
+    
+    Args:
+        progress: Called with (pins done, total pins) as each pin finishes
+        parallelism: Number of pins probed at the same time
+    """
     diagnostics = {
         "hardware_available": HARDWARE_AVAILABLE,
         "circuitpython_available": CIRCUITPYTHON_AVAILABLE,
+        "backend": HARDWARE_BACKEND,
         "tests": {}
     }
     
@@ -420,7 +1183,7 @@ def diagnose_gpio_access():
     
     # Test basic imports
     try:
-        import board, digitalio
+        load_hardware_libraries()
         diagnostics["tests"]["imports"] = "SUCCESS"
     except Exception as e:
         diagnostics["tests"]["imports"] = f"FAILED: {e}"
@@ -435,50 +1198,34 @@ def diagnose_gpio_access():
     except Exception as e:
         diagnostics["tests"]["board_access"] = f"FAILED: {e}"
     
-    # Test GPIO creation (without setting values) for all available GPIOs
+    # Test GPIO creation and toggling for all available GPIOs
     available_gpios = get_available_gpios()
+    bank = get_gpio_bank()
+    results = {}
     for gpio_num in available_gpios:
-        try:
-            board_gpio = validate_gpio(gpio_num)
-            
-            gpio_obj = digitalio.DigitalInOut(board_gpio)
-            gpio_obj.deinit()  # Clean up immediately
-            diagnostics["tests"][f"gpio_{gpio_num}_access"] = "SUCCESS"
-        except Exception as e:
-            diagnostics["tests"][f"gpio_{gpio_num}_access"] = f"FAILED: {e}"
+        if bank.is_open and gpio_num in bank.gpio_nums:
+            results[gpio_num] = (f"SKIPPED: claimed by the GPIO bank ({bank.backend})", "SKIPPED: claimed by the GPIO bank")
+    probed = [gpio_num for gpio_num in available_gpios if gpio_num not in results]
+    
+    total = len(available_gpios)
+    if progress is not None:
+        progress(len(results), total)
+    with ThreadPoolExecutor(max_workers=max(1, parallelism), thread_name_prefix="gpio-diagnose") as executor:
+        futures = {executor.submit(_diagnose_gpio_pin, gpio_num): gpio_num for gpio_num in probed}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            if progress is not None:
+                progress(len(results), total)
     
-    # Test GPIO toggle functionality for all available GPIOs
     diagnostics["tests"]["gpio_toggle"] = {}
     for gpio_num in available_gpios:
-        try:
-            board_gpio = validate_gpio(gpio_num)
-            
-            # Create GPIO object and set as output
-            gpio_obj = digitalio.DigitalInOut(board_gpio)
-            gpio_obj.direction = digitalio.Direction.OUTPUT
-            
-            # Toggle ON
-            gpio_obj.value = True
-            logger.info(f"GPIO {gpio_num} toggled ON")
-            time.sleep(0.2)  # 200ms wait
-            
-            # Toggle OFF
-            gpio_obj.value = False
-            logger.info(f"GPIO {gpio_num} toggled OFF")
-            time.sleep(0.2)  # 200ms wait
-            
-            # Clean up
-            gpio_obj.deinit()
-            
-            diagnostics["tests"]["gpio_toggle"][f"gpio_{gpio_num}"] = "SUCCESS"
-            
-        except Exception as e:
-            diagnostics["tests"]["gpio_toggle"][f"gpio_{gpio_num}"] = f"FAILED: {e}"
-            logger.error(f"GPIO {gpio_num} toggle test failed: {e}")
+        access, toggle = results[gpio_num]
+        diagnostics["tests"][f"gpio_{gpio_num}_access"] = access
+        diagnostics["tests"]["gpio_toggle"][f"gpio_{gpio_num}"] = toggle
     
     return diagnostics
 
-    
+
 
 
 # GPIO_MAP = {
@@ -487,32 +1234,34 @@ def diagnose_gpio_access():
 #     25: board.D22 # Pin 22 - GPIO 25
 # }
 
-GPIO_MAP = {
-    1: board.D1,
-    2: board.D2,
-    3: board.D3,
-    4: board.D4,
-    5: board.D5,
-    6: board.D6,
-    7: board.D7,
-    # 8: board.D8,   # RESERVED for SPI0_CE0 - Standard SPI Chip Enable
-    # 9: board.D9,   # RESERVED for SPI0_MISO - Standard SPI MISO
-    # 10: board.D10, # RESERVED for SPI0_MOSI - Standard SPI MOSI  
-    # 11: board.D11, # RESERVED for SPI0_SCLK - Standard SPI Clock
-    12: board.D12,
-    13: board.D13,
-    14: board.D14,
-    15: board.D15,
-    # 16: board.D16,  # RESERVED for MAX31865 CS pin - DO NOT USE for GPIO operations
-    17: board.D17,
-    18: board.D18,
-    19: board.D19,
-    20: board.D20,
-    21: board.D21,
-    22: board.D22,
-    23: board.D23,
-    24: board.D24,
-    25: board.D25,
-    26: board.D26,
-    27: board.D27,
-}
\ No newline at end of file
+# Board pin names by GPIO number, resolved by validate_gpio() once the libraries are loaded;
+# empty when the hardware libraries are missing so the API still imports
+GPIO_MAP = {} if not HARDWARE_AVAILABLE else {
+    1: "D1",
+    2: "D2",
+    3: "D3",
+    4: "D4",
+    5: "D5",
+    6: "D6",
+    7: "D7",
+    # 8: "D8",   # RESERVED for SPI0_CE0 - Standard SPI Chip Enable
+    # 9: "D9",   # RESERVED for SPI0_MISO - Standard SPI MISO
+    # 10: "D10", # RESERVED for SPI0_MOSI - Standard SPI MOSI  
+    # 11: "D11", # RESERVED for SPI0_SCLK - Standard SPI Clock
+    12: "D12",
+    13: "D13",
+    14: "D14",
+    15: "D15",
+    # 16: "D16",  # RESERVED for MAX31865 CS pin - DO NOT USE for GPIO operations
+    17: "D17",
+    18: "D18",
+    19: "D19",
+    20: "D20",
+    21: "D21",
+    22: "D22",
+    23: "D23",
+    24: "D24",
+    25: "D25",
+    26: "D26",
+    27: "D27",
+}
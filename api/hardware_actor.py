@@ -0,0 +1,139 @@
+# Import logger first to avoid circular imports
+from logger import logger
+import asyncio
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from enum import IntEnum
+from typing import Callable
+from metrics import HARDWARE_QUEUE_WAIT_SECONDS, HARDWARE_COMMAND_SECONDS, HARDWARE_QUEUE_DEPTH, HARDWARE_COMMAND_ERRORS
+from config import HARDWARE_COMMAND_TIMEOUT
+
+# --- Global actor instance ---
+_actor = None
+_actor_lock = threading.Lock()
+
+class Priority(IntEnum):
+    """Order in which queued hardware commands run; lower runs first"""
+    SAFETY = 0      # Heater cutoffs
+    CONTROL = 1     # Heater and GPIO writes
+    READ = 2        # Sensor conversions and GPIO reads
+    DIAGNOSTIC = 3  # Diagnostic probes
+
+class HardwareActor:
+    """Single thread that owns the SPI bus and the GPIOs
+    
+    Every sensor and GPIO access in hardware.py is submitted here as a short
+    command and runs on this thread, so bus transactions and lazy init never
+    race. Commands wait in a priority queue: a heater cutoff queued behind any
+    amount of read traffic runs as soon as the current command finishes.
+    Commands should not sleep; callers wait between commands instead, which
+    keeps the latency of critical commands bounded by the slowest single one.
+    """
+    
+    def __init__(self, timeout: float = HARDWARE_COMMAND_TIMEOUT):
+        self.timeout = timeout
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()  # FIFO within a priority, and never compares the payloads
+        self._thread = None
+        self._start_lock = threading.Lock()
+        HARDWARE_QUEUE_DEPTH.set_function(self._queue.qsize)
+    
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self):
+        """Start the actor thread"""
+        with self._start_lock:
+            if self.is_running:
+                return
+            self._thread = threading.Thread(target=self._run, name="hardware-actor", daemon=True)
+            self._thread.start()
+        logger.info("Hardware actor started")
+    
+    def stop(self, timeout: float = 2.0):
+        """Stop the actor thread once the commands already queued have run"""
+        thread = self._thread
+        if thread is None:
+            return
+        # Sorts after every real command
+        self._queue.put((len(Priority), next(self._sequence), 0.0, None, (), {}, None))
+        thread.join(timeout=timeout)
+        self._thread = None
+        logger.info("Hardware actor stopped")
+    
+    def submit(self, priority: Priority, func: Callable, *args, **kwargs) -> Future:
+        """Queue `func(*args, **kwargs)` to run on the actor thread
+        
+        Commands submitted from the actor thread itself (a command calling
+        another hardware function) run inline, since queueing them would deadlock.
+        
+        Returns:
+            Future: Resolves to the command's return value or exception
+        """
+        future = Future()
+        if threading.current_thread() is self._thread:
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            return future
+        
+        if not self.is_running:
+            self.start()
+        self._queue.put((int(priority), next(self._sequence), time.perf_counter(), func, args, kwargs, future))
+        return future
+    
+    def call(self, priority: Priority, func: Callable, *args, **kwargs):
+        """Run a command on the actor thread and wait for its result
+        
+        Raises:
+            Exception: Whatever the command raised, or if it did not complete within the timeout
+        """
+        future = self.submit(priority, func, *args, **kwargs)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise Exception(f"Hardware command {getattr(func, '__name__', func)} timed out after {self.timeout}s")
+    
+    async def run(self, priority: Priority, func: Callable, *args, **kwargs):
+        """Run a command on the actor thread without blocking the event loop"""
+        return await asyncio.wait_for(asyncio.wrap_future(self.submit(priority, func, *args, **kwargs)), self.timeout)
+    
+    def _run(self):
+        while True:
+            priority, _, queued_at, func, args, kwargs, future = self._queue.get()
+            if func is None:
+                break
+            if not future.set_running_or_notify_cancel():
+                # The caller gave up waiting
+                continue
+            
+            label = Priority(priority).name.lower()
+            start = time.perf_counter()
+            HARDWARE_QUEUE_WAIT_SECONDS.labels(label).observe(start - queued_at)
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                HARDWARE_COMMAND_ERRORS.labels(label).inc()
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            HARDWARE_COMMAND_SECONDS.labels(label).observe(time.perf_counter() - start)
+
+def get_hardware_actor() -> HardwareActor:
+    """Get global hardware actor instance"""
+    global _actor
+    if _actor is not None:
+        return _actor
+    
+    with _actor_lock:
+        if _actor is None:
+            _actor = HardwareActor()
+    
+    return _actor
@@ -0,0 +1,222 @@
+# Import logger first to avoid circular imports
+from logger import logger
+import time
+import threading
+from typing import Dict, Optional
+from hardware import set_outputs, get_gpio_bank
+from hardware_actor import Priority
+from config import (
+    HEATER_PWM_WINDOW, HEATER_PWM_MIN_ON, HEATER_PWM_MIN_OFF, HEATER_PWM_RESOLUTION,
+    BACK_HEATER_GPIO, FRONT_HEATER_GPIO
+)
+
+# --- Global output driver instance ---
+_heater_output = None
+_heater_output_lock = threading.Lock()
+
+class ProportioningChannel:
+    """Time-proportioning state for a single heater GPIO"""
+    
+    def __init__(self, gpio_num: int):
+        self.gpio_num = gpio_num
+        self.duty = None            # None = released, the driver does not touch the pin
+        self.state = False
+        self.window_start = None
+        self.on_time = 0.0
+        self.carry = 0.0            # On-time owed (or overpaid) from earlier windows
+        self.last_switch = None
+        self.switch_count = 0
+    
+    def plan_window(self, window: float, min_on: float, min_off: float):
+        """Decide how long the pin stays on during the window that starts now
+        
+        Pulses shorter than min_on and gaps shorter than min_off are not emitted;
+        the difference is carried into later windows so the average duty is kept.
+        """
+        wanted = self.duty * window + self.carry
+        if wanted < min_on:
+            on_time = 0.0
+        elif window - wanted < min_off:
+            on_time = window
+        else:
+            on_time = wanted
+        # Bound the carry so a long saturated stretch can't build up a backlog
+        self.carry = max(-window, min(window, wanted - on_time))
+        self.on_time = on_time
+
+class TimeProportioningOutput:
+    """Slow PWM output stage driving heater relays from a continuous 0-1 duty
+    
+    Each channel is switched at most twice per window, which keeps relay wear
+    low while still resolving the controller output far better than a fixed
+    on/off threshold.
+    """
+    
+    def __init__(self, gpios=(BACK_HEATER_GPIO, FRONT_HEATER_GPIO), window: float = HEATER_PWM_WINDOW,
+                 min_on: float = HEATER_PWM_MIN_ON, min_off: float = HEATER_PWM_MIN_OFF,
+                 resolution: float = HEATER_PWM_RESOLUTION):
+        if min_on + min_off >= window:
+            raise ValueError(f"Minimum on/off times ({min_on}s + {min_off}s) must be shorter than the window ({window}s)")
+        self.window = window
+        self.min_on = min_on
+        self.min_off = min_off
+        self.resolution = resolution
+        self.channels = {gpio_num: ProportioningChannel(gpio_num) for gpio_num in gpios}
+        self.started_at = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self):
+        """Start the output thread"""
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="heater-output", daemon=True)
+        self._thread.start()
+        logger.info(f"Heater output started: window={self.window}s, min_on={self.min_on}s, min_off={self.min_off}s")
+    
+    def stop(self):
+        """Stop the output thread and turn every driven channel off"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.force_off()
+        logger.info("Heater output stopped")
+    
+    def set_duty(self, gpio_num: int, duty: float):
+        """Set the duty of a single channel"""
+        self.set_duties({gpio_num: duty})
+    
+    def set_duties(self, duties: Dict[int, float]):
+        """Set the duty (0-1) of one or more channels
+        
+        A duty change takes effect at the start of the channel's next window.
+        
+        Raises:
+            Exception: If a channel is turned on while the over-temperature interlock is tripped
+        """
+        if get_gpio_bank().inhibited and any(duty > 0 for duty in duties.values()):
+            raise Exception("Heater outputs are locked off by the over-temperature interlock")
+        with self._lock:
+            for gpio_num, duty in duties.items():
+                if gpio_num not in self.channels:
+                    raise ValueError(f"GPIO {gpio_num} is not a heater output. Heater outputs: {list(self.channels)}")
+                channel = self.channels[gpio_num]
+                if channel.duty is None:
+                    # Newly engaged channel starts a fresh window on the next tick
+                    channel.window_start = None
+                    channel.carry = 0.0
+                channel.duty = min(1.0, max(0.0, float(duty)))
+        self.start()
+    
+    def force_off(self):
+        """Turn every driven channel off immediately, ignoring the minimum on time"""
+        with self._lock:
+            now = time.monotonic()
+            switches = {}
+            for channel in self.channels.values():
+                if channel.duty is None:
+                    continue
+                channel.duty = 0.0
+                channel.carry = 0.0
+                channel.window_start = None
+                if self._may_switch(channel, False, now, force=True):
+                    switches[channel.gpio_num] = False
+            # Jumps the hardware actor queue ahead of reads and regular writes
+            self._apply(switches, now, Priority.SAFETY)
+    
+    def release(self):
+        """Turn driven channels off and stop touching their pins, e.g. for manual control"""
+        self.force_off()
+        with self._lock:
+            for channel in self.channels.values():
+                channel.duty = None
+    
+    def _run(self):
+        next_tick = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                self._update(time.monotonic())
+            except Exception as e:
+                logger.error(f"Heater output update failed: {e}")
+            next_tick += self.resolution
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                next_tick = time.monotonic()
+                delay = 0
+            self._stop_event.wait(delay)
+    
+    def _update(self, now: float):
+        with self._lock:
+            switches = {}
+            for channel in self.channels.values():
+                if channel.duty is None:
+                    continue
+                if channel.window_start is None or now - channel.window_start >= self.window:
+                    channel.window_start = now
+                    channel.plan_window(self.window, self.min_on, self.min_off)
+                
+                desired = (now - channel.window_start) < channel.on_time
+                if desired != channel.state and self._may_switch(channel, desired, now):
+                    switches[channel.gpio_num] = desired
+            self._apply(switches, now)
+    
+    def _may_switch(self, channel: ProportioningChannel, state: bool, now: float, force: bool = False) -> bool:
+        if not force and channel.last_switch is not None:
+            # Never cut a pulse or a gap shorter than the relay minimums
+            elapsed = now - channel.last_switch
+            if channel.state and elapsed < self.min_on:
+                return False
+            if not channel.state and elapsed < self.min_off:
+                return False
+        if force and channel.state == state and channel.last_switch is not None:
+            return False
+        return True
+    
+    def _apply(self, switches: Dict[int, bool], now: float, priority: Priority = Priority.CONTROL):
+        """Write all pin changes of one update together, as one GPIO bank transaction"""
+        if not switches:
+            return
+        set_outputs(switches, priority)
+        for gpio_num, state in switches.items():
+            channel = self.channels[gpio_num]
+            if channel.state != state:
+                channel.switch_count += 1
+            channel.state = state
+            channel.last_switch = now
+    
+    def get_status(self):
+        """Get per-channel duty, pin state and switching statistics"""
+        hours = (time.monotonic() - self.started_at) / 3600.0 if self.started_at is not None else 0.0
+        return {
+            "running": self.is_running,
+            "window": self.window,
+            "min_on": self.min_on,
+            "min_off": self.min_off,
+            "channels": {
+                gpio_num: {
+                    "duty": channel.duty,
+                    "state": channel.state,
+                    "switch_count": channel.switch_count,
+                    "switches_per_hour": round(channel.switch_count / hours, 1) if hours > 0 else None
+                }
+                for gpio_num, channel in self.channels.items()
+            }
+        }
+
+def get_heater_output() -> TimeProportioningOutput:
+    """Get global heater output driver instance"""
+    global _heater_output
+    
+    with _heater_output_lock:
+        if _heater_output is None:
+            _heater_output = TimeProportioningOutput()
+    
+    return _heater_output
@@ -0,0 +1,179 @@
+# Import logger first to avoid circular imports
+from logger import logger
+import time
+import threading
+from typing import Optional
+import numpy as np
+from config import HISTORY_CAPACITY, HISTORY_MAX_BUCKETS, HISTORY_DEFAULT_BUCKETS
+
+# Temperatures are stored as int16 tenths of a degree; this value marks a missing reading
+MISSING = np.iinfo(np.int16).min
+# Duty is stored as uint8 in steps of 1/DUTY_SCALE
+DUTY_SCALE = 250
+# Timestamps are uint32 milliseconds since the buffer's base time
+MAX_OFFSET_MS = np.iinfo(np.uint32).max
+
+# --- Global history instance ---
+_history = None
+_history_lock = threading.Lock()
+
+class TemperatureHistory:
+    """Fixed-memory ring buffer of (time, temperature, duty, setpoint) samples
+    
+    Columns are preallocated NumPy arrays using compact types, so memory use is
+    fixed at 9 bytes per sample regardless of uptime. Queries slice the ring
+    with a binary search and aggregate buckets with vectorized reductions.
+    """
+    
+    def __init__(self, capacity: int = HISTORY_CAPACITY):
+        self.capacity = capacity
+        self._t = np.zeros(capacity, dtype=np.uint32)
+        self._temperature = np.full(capacity, MISSING, dtype=np.int16)
+        self._duty = np.zeros(capacity, dtype=np.uint8)
+        self._setpoint = np.full(capacity, MISSING, dtype=np.int16)
+        self._head = 0
+        self._count = 0
+        self._lock = threading.Lock()
+        self._reset_base()
+    
+    def _reset_base(self):
+        self._base_monotonic = time.monotonic()
+        self._base_wall = time.time()
+    
+    @property
+    def nbytes(self):
+        return self._t.nbytes + self._temperature.nbytes + self._duty.nbytes + self._setpoint.nbytes
+    
+    def __len__(self):
+        return self._count
+    
+    def append(self, monotonic: float, temperature: Optional[float], duty: float = 0.0,
+               setpoint: Optional[float] = None):
+        """Append one sample, overwriting the oldest once the buffer is full"""
+        offset_ms = int((monotonic - self._base_monotonic) * 1000.0)
+        with self._lock:
+            if offset_ms > MAX_OFFSET_MS:
+                # ~49 days of uptime: start over rather than wrap the time column
+                logger.info("Temperature history time base exhausted, clearing history")
+                self._head = 0
+                self._count = 0
+                self._reset_base()
+                offset_ms = int((monotonic - self._base_monotonic) * 1000.0)
+            
+            i = self._head
+            self._t[i] = max(0, offset_ms)
+            self._temperature[i] = _encode_temperature(temperature)
+            self._duty[i] = int(round(min(1.0, max(0.0, duty)) * DUTY_SCALE))
+            self._setpoint[i] = _encode_temperature(setpoint)
+            self._head = (i + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+    
+    def record_snapshot(self, snapshot):
+        """Sampler listener: append a SensorSnapshot with the controller's current duty and setpoint"""
+        from controller import get_controller
+        controller = get_controller()
+        if controller.is_running:
+            duty = controller.last_output or 0.0
+            setpoint = controller.setpoint
+        else:
+            duty = 0.0
+            setpoint = None
+        self.append(snapshot.monotonic, snapshot.temperature if snapshot.ok else None, duty, setpoint)
+    
+    def _slice(self, since_ms: int):
+        """Copy out the samples at or after since_ms, oldest first"""
+        with self._lock:
+            if self._count < self.capacity:
+                segments = [slice(0, self._count)]
+            else:
+                # Oldest samples run from head to the end, then wrap to the start
+                segments = [slice(self._head, self.capacity), slice(0, self._head)]
+            
+            columns = ([], [], [], [])
+            for segment in segments:
+                t = self._t[segment]
+                start = int(np.searchsorted(t, since_ms, side="left"))
+                for column, source in zip(columns, (self._t, self._temperature, self._duty, self._setpoint)):
+                    column.append(source[segment][start:])
+            return tuple(np.concatenate(column) for column in columns)
+    
+    def query(self, since: Optional[float] = None, resolution: Optional[float] = None):
+        """Aggregate samples into min/max/mean buckets
+        
+        Args:
+            since: Unix timestamp of the oldest sample to include (default: everything buffered)
+            resolution: Bucket width in seconds (default: the window split into HISTORY_DEFAULT_BUCKETS)
+            
+        Returns:
+            dict with the effective resolution and parallel bucket arrays
+        """
+        since_ms = 0 if since is None else max(0, int((since - self._base_wall) * 1000.0))
+        t, temperature, duty, setpoint = self._slice(since_ms)
+        
+        valid = temperature != MISSING
+        t, temperature, duty, setpoint = t[valid], temperature[valid], duty[valid], setpoint[valid]
+        
+        result = {
+            "since": since,
+            "resolution": resolution,
+            "sample_count": int(t.size),
+            "buckets": {"time": [], "min": [], "max": [], "mean": [], "count": [], "duty": [], "setpoint": []}
+        }
+        if t.size == 0:
+            return result
+        
+        start_ms = int(t[0])
+        span_ms = int(t[-1]) - start_ms + 1
+        if resolution is None:
+            resolution_ms = max(1, -(-span_ms // HISTORY_DEFAULT_BUCKETS))
+        else:
+            # Never produce more than HISTORY_MAX_BUCKETS, widen the buckets instead
+            resolution_ms = max(int(resolution * 1000.0), -(-span_ms // HISTORY_MAX_BUCKETS), 1)
+        result["resolution"] = resolution_ms / 1000.0
+        
+        bucket = (t - start_ms) // resolution_ms
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(bucket)) + 1))
+        counts = np.diff(np.append(starts, t.size))
+        ends = starts + counts - 1
+        
+        values = temperature.astype(np.float32) / 10.0
+        mean = np.add.reduceat(values, starts, dtype=np.float64) / counts
+        duty_mean = np.add.reduceat(duty, starts, dtype=np.float64) / (counts * DUTY_SCALE)
+        # Setpoint changes are steps, so report the last value in each bucket
+        last_setpoint = setpoint[ends]
+        
+        bucket_times = self._base_wall + (start_ms + bucket[starts].astype(np.float64) * resolution_ms) / 1000.0
+        result["buckets"] = {
+            "time": np.round(bucket_times, 3).tolist(),
+            "min": np.round(np.minimum.reduceat(values, starts), 1).tolist(),
+            "max": np.round(np.maximum.reduceat(values, starts), 1).tolist(),
+            "mean": np.round(mean, 2).tolist(),
+            "count": counts.tolist(),
+            "duty": np.round(duty_mean, 3).tolist(),
+            "setpoint": [None if value == MISSING else value / 10.0 for value in last_setpoint.tolist()]
+        }
+        return result
+    
+    def get_info(self):
+        """Get buffer capacity and fill level"""
+        return {
+            "capacity": self.capacity,
+            "samples": self._count,
+            "memory_bytes": self.nbytes
+        }
+
+def _encode_temperature(value: Optional[float]):
+    if value is None:
+        return MISSING
+    return int(round(min(3276.7, max(-3276.7, value)) * 10.0))
+
+def get_history() -> TemperatureHistory:
+    """Get global temperature history instance"""
+    global _history
+    
+    with _history_lock:
+        if _history is None:
+            _history = TemperatureHistory(capacity=HISTORY_CAPACITY)
+            logger.info(f"Temperature history allocated: {_history.capacity} samples, {_history.nbytes / 1e6:.1f} MB")
+    
+    return _history
@@ -0,0 +1,339 @@
+# Import logger first to avoid circular imports
+from logger import logger
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional
+from hardware import SensorSnapshot, get_sampler, get_gpio_bank
+from hardware_actor import Priority
+from heater_output import get_heater_output
+from controller import get_controller
+from autotune import get_autotuner
+from recipes import get_recipe_executor
+from metrics import INTERLOCK_REACTION_SECONDS, INTERLOCK_TRIPS, INTERLOCK_DEADLINE_MISSES
+from config import (
+    INTERLOCK_MAX_TEMPERATURE, INTERLOCK_RESET_HYSTERESIS, INTERLOCK_MAX_SAMPLE_AGE, INTERLOCK_MAX_SENSOR_ERRORS,
+    INTERLOCK_STARTUP_GRACE, INTERLOCK_CHECK_INTERVAL, INTERLOCK_DEADLINE, INTERLOCK_REALTIME_PRIORITY
+)
+
+# --- Global interlock instance ---
+_interlock = None
+_interlock_lock = threading.Lock()
+
+# Number of recent reaction times kept for the status summary
+REACTION_WINDOW = 100
+
+class OverTemperatureInterlock:
+    """Latching heater cutoff on its own high-priority thread
+    
+    The thread wakes on every sensor sample, and at least every check
+    interval, and trips when the temperature is over the limit, the MAX31865
+    reports a fault, the sensor keeps erroring, or no valid sample arrived
+    within the maximum age. Samples are judged on their own rather than on the
+    filtered temperature, which holds the last good value over several
+    rejected samples and would hide an open or shorted RTD. A trip
+    locks the heater GPIO bank off and writes both heaters off at safety
+    priority on the hardware actor, so it neither waits for the event loop or
+    the request thread pool nor queues behind sensor reads. The time from the
+    breach to the heaters being off is checked against the deadline and
+    recorded. The latch stays set until reset() while the oven is back in
+    range.
+    """
+    
+    def __init__(self, max_temperature: float = INTERLOCK_MAX_TEMPERATURE,
+                 reset_hysteresis: float = INTERLOCK_RESET_HYSTERESIS,
+                 max_sample_age: float = INTERLOCK_MAX_SAMPLE_AGE,
+                 max_sensor_errors: int = INTERLOCK_MAX_SENSOR_ERRORS,
+                 startup_grace: float = INTERLOCK_STARTUP_GRACE,
+                 check_interval: float = INTERLOCK_CHECK_INTERVAL,
+                 deadline: float = INTERLOCK_DEADLINE,
+                 realtime_priority: int = INTERLOCK_REALTIME_PRIORITY):
+        self.max_temperature = max_temperature
+        self.reset_hysteresis = reset_hysteresis
+        self.max_sample_age = max_sample_age
+        self.max_sensor_errors = max_sensor_errors
+        self.startup_grace = startup_grace
+        self.check_interval = check_interval
+        self.deadline = deadline
+        self.realtime_priority = realtime_priority
+        self.realtime = False
+        
+        self.tripped = False
+        self.reason = None
+        self.detail = None
+        self.tripped_at = None
+        self.trip_count = 0
+        self.deadline_misses = 0
+        self._reaction_ms = deque(maxlen=REACTION_WINDOW)
+        
+        self._last_valid: Optional[SensorSnapshot] = None
+        self._consecutive_errors = 0
+        self._error_threshold_at = None
+        self._fault: Optional[SensorSnapshot] = None
+        self._armed_at = None
+        self._test_requested_at = None
+        self._trip_lock = threading.Lock()
+        self._tripped_event = threading.Event()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self):
+        """Start watching the sensor samples"""
+        if self.is_running:
+            return
+        self._armed_at = time.monotonic()
+        self._stop_event.clear()
+        get_sampler().add_listener(self._on_sample)
+        self._thread = threading.Thread(target=self._run, name="over-temperature-interlock", daemon=True)
+        self._thread.start()
+        logger.info(f"Over-temperature interlock armed: max {self.max_temperature}°C, "
+                    f"max sample age {self.max_sample_age}s, deadline {self.deadline * 1000:.0f} ms")
+    
+    def stop(self):
+        """Stop watching; the heaters are left as they are"""
+        self._stop_event.set()
+        self._wake.set()
+        get_sampler().remove_listener(self._on_sample)
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        logger.info("Over-temperature interlock stopped")
+    
+    def _on_sample(self, snapshot: SensorSnapshot):
+        # Runs on the sampler thread: only record the sample and wake the interlock.
+        # A faulted or out-of-range sample carries the filter's held temperature, so it is an error here
+        if snapshot.ok and not snapshot.faults and snapshot.rejected not in ("fault", "out_of_range"):
+            self._last_valid = snapshot
+            self._consecutive_errors = 0
+            self._error_threshold_at = None
+            self._fault = None
+        else:
+            self._consecutive_errors += 1
+            if self._consecutive_errors == self.max_sensor_errors:
+                # Errors only become a breach once enough are confirmed, so the reaction is timed from here
+                self._error_threshold_at = snapshot.monotonic
+            if (snapshot.faults or snapshot.rejected == "fault") and self._fault is None:
+                # A fault trips at once; keep the first faulted sample as the breach
+                self._fault = snapshot
+        self._wake.set()
+    
+    def _set_realtime_priority(self):
+        if self.realtime_priority <= 0 or not hasattr(os, "sched_setscheduler"):
+            return
+        try:
+            os.sched_setscheduler(threading.get_native_id(), os.SCHED_FIFO, os.sched_param(self.realtime_priority))
+            self.realtime = True
+            logger.info(f"Over-temperature interlock running with SCHED_FIFO priority {self.realtime_priority}")
+        except OSError as e:
+            logger.warning(f"Could not give the over-temperature interlock real-time priority, "
+                           f"running at normal priority: {e}")
+    
+    def _run(self):
+        self._set_realtime_priority()
+        while not self._stop_event.is_set():
+            self._wake.wait(self.check_interval)
+            self._wake.clear()
+            if self._stop_event.is_set():
+                break
+            if self.tripped:
+                continue
+            try:
+                self._check(time.monotonic())
+            except Exception as e:
+                logger.error(f"Over-temperature interlock check failed: {e}")
+                self.trip("interlock_error", str(e), time.monotonic())
+    
+    def _check(self, now: float):
+        if self._test_requested_at is not None:
+            self.trip("test", "Test trip requested", self._test_requested_at)
+            return
+        
+        fault = self._fault
+        if fault is not None:
+            self.trip("sensor_fault", f"MAX31865 fault: {', '.join(fault.faults)}", fault.monotonic)
+            return
+        
+        last_valid = self._last_valid
+        if last_valid is not None and last_valid.temperature > self.max_temperature:
+            self.trip("over_temperature",
+                      f"{last_valid.temperature:.1f}°C is above the {self.max_temperature:.1f}°C limit",
+                      last_valid.monotonic)
+            return
+        
+        error_threshold_at = self._error_threshold_at
+        if self._consecutive_errors >= self.max_sensor_errors:
+            self.trip("sensor_error", f"{self._consecutive_errors} consecutive sensor samples failed",
+                      error_threshold_at if error_threshold_at is not None else now)
+            return
+        
+        if last_valid is not None:
+            stale_at = last_valid.monotonic + self.max_sample_age
+        else:
+            # Give the sensor warm-up time to deliver the first sample
+            stale_at = self._armed_at + self.startup_grace
+        if now > stale_at:
+            age = f"{now - last_valid.monotonic:.2f}s old" if last_valid is not None else "never received"
+            self.trip("stale_reading", f"Last valid sample {age}", stale_at)
+    
+    def trip(self, reason: str, detail: str, breach_at: float):
+        """Latch the interlock and turn both heaters off
+        
+        Args:
+            reason: Short reason code, e.g. "over_temperature"
+            detail: Human readable description
+            breach_at: Monotonic time the limit was breached, for the reaction time
+        """
+        with self._trip_lock:
+            if self.tripped:
+                return
+            self.tripped = True
+            self.reason = reason
+            self.detail = detail
+            self.tripped_at = time.time()
+            self.trip_count += 1
+        self._test_requested_at = None
+        
+        bank = get_gpio_bank()
+        bank.inhibited = True
+        try:
+            bank.write({gpio_num: False for gpio_num in bank.gpio_nums}, Priority.SAFETY)
+        except Exception as e:
+            logger.critical(f"Over-temperature interlock FAILED to turn the heaters off: {e}")
+        else:
+            reaction = time.monotonic() - breach_at
+            INTERLOCK_REACTION_SECONDS.observe(reaction)
+            self._reaction_ms.append(reaction * 1000)
+            if reaction > self.deadline:
+                self.deadline_misses += 1
+                INTERLOCK_DEADLINE_MISSES.inc()
+                logger.error(f"Over-temperature interlock missed its deadline: {reaction * 1000:.1f} ms "
+                             f"> {self.deadline * 1000:.0f} ms")
+        INTERLOCK_TRIPS.labels(reason).inc()
+        logger.critical(f"Over-temperature interlock TRIPPED ({reason}): {detail}. Heaters off")
+        self._tripped_event.set()
+        
+        # Stopping the loops joins their threads, so do it off the interlock thread
+        threading.Thread(target=self._stop_heating, name="interlock-shutdown", daemon=True).start()
+    
+    def _stop_heating(self):
+        for name, stop in (("recipe", self._stop_recipe), ("autotune", self._stop_autotune),
+                           ("control loop", self._stop_controller), ("heater output", get_heater_output().release)):
+            try:
+                stop()
+            except Exception as e:
+                logger.error(f"Interlock failed to stop the {name}: {e}")
+    
+    def _stop_recipe(self):
+        executor = get_recipe_executor()
+        if executor.is_running:
+            executor.stop()
+    
+    def _stop_autotune(self):
+        autotuner = get_autotuner()
+        if autotuner.is_running:
+            autotuner.stop()
+    
+    def _stop_controller(self):
+        controller = get_controller()
+        if controller.is_running:
+            controller.stop()
+    
+    def test(self, timeout: float = 2.0) -> Optional[float]:
+        """Trip through the interlock thread as if a limit had been breached now
+        
+        Returns:
+            float: Reaction time in milliseconds, or None if it did not trip within the timeout
+        
+        Raises:
+            ValueError: If the interlock is not running or already tripped
+        """
+        if not self.is_running:
+            raise ValueError("Over-temperature interlock is not running")
+        if self.tripped:
+            raise ValueError("Over-temperature interlock is already tripped")
+        self._tripped_event.clear()
+        self._test_requested_at = time.monotonic()
+        self._wake.set()
+        if not self._tripped_event.wait(timeout):
+            return None
+        return self._reaction_ms[-1] if self._reaction_ms else None
+    
+    def reset(self):
+        """Clear the latch once the oven is back in a safe state
+        
+        Raises:
+            ValueError: If the temperature is still too high or the sensor is not delivering valid samples
+        """
+        if not self.tripped:
+            return
+        last_valid = self._last_valid
+        if last_valid is None or last_valid.age_ms() > self.max_sample_age * 1000:
+            raise ValueError("No recent valid temperature sample; check the sensor before resetting")
+        if self._consecutive_errors:
+            raise ValueError(f"Sensor is still failing ({self._consecutive_errors} consecutive errors)")
+        reset_below = self.max_temperature - self.reset_hysteresis
+        if last_valid.temperature > reset_below:
+            raise ValueError(f"Temperature {last_valid.temperature:.1f}°C must drop below {reset_below:.1f}°C before resetting")
+        
+        with self._trip_lock:
+            self.tripped = False
+            self.reason = None
+            self.detail = None
+            self.tripped_at = None
+        get_gpio_bank().inhibited = False
+        logger.warning("Over-temperature interlock reset, heaters may be turned on again")
+    
+    @property
+    def trip_message(self) -> Optional[str]:
+        """Why heating is refused, or None if the interlock is not tripped"""
+        if not self.tripped:
+            return None
+        return f"Over-temperature interlock tripped ({self.reason}): {self.detail}. Reset it with POST /safety/interlock/reset"
+    
+    def get_status(self):
+        """Get the latch state, limits and reaction time statistics"""
+        reactions = sorted(self._reaction_ms)
+        last_valid = self._last_valid
+        return {
+            "running": self.is_running,
+            "state": "tripped" if self.tripped else ("armed" if self.is_running else "disarmed"),
+            "reason": self.reason,
+            "detail": self.detail,
+            "tripped_at": self.tripped_at,
+            "trip_count": self.trip_count,
+            "realtime": self.realtime,
+            "limits": {
+                "max_temperature": self.max_temperature,
+                "reset_below": self.max_temperature - self.reset_hysteresis,
+                "max_sample_age": self.max_sample_age,
+                "max_sensor_errors": self.max_sensor_errors,
+                "deadline_ms": self.deadline * 1000
+            },
+            "last_valid_temperature": last_valid.temperature if last_valid is not None else None,
+            "last_valid_age_ms": last_valid.age_ms() if last_valid is not None else None,
+            "consecutive_sensor_errors": self._consecutive_errors,
+            "reaction_ms": {
+                "count": len(reactions),
+                "last": self._reaction_ms[-1] if reactions else None,
+                "p50": reactions[len(reactions) // 2] if reactions else None,
+                "p99": reactions[min(len(reactions) - 1, int(len(reactions) * 0.99))] if reactions else None,
+                "max": reactions[-1] if reactions else None
+            },
+            "deadline_misses": self.deadline_misses
+        }
+
+def get_interlock() -> OverTemperatureInterlock:
+    """Get global over-temperature interlock instance"""
+    global _interlock
+    
+    with _interlock_lock:
+        if _interlock is None:
+            _interlock = OverTemperatureInterlock()
+    
+    return _interlock
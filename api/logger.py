@@ -1,34 +1,393 @@
+import atexit
 import logging
-import io
-
-# Set up logging with memory handler and timestamp format
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from bisect import bisect_left
+from datetime import datetime
+
+# Number of log records kept in memory for /logs
+LOG_BUFFER_CAPACITY = int(os.getenv("LOG_BUFFER_CAPACITY", "5000"))
+# Rotating log file, set LOG_FILE="" to disable
+LOG_FILE = os.getenv("LOG_FILE", "logs/smart-oven.log")
+LOG_FILE_MAX_BYTES = int(os.getenv("LOG_FILE_MAX_BYTES", str(5 * 1024 * 1024)))
+LOG_FILE_BACKUP_COUNT = int(os.getenv("LOG_FILE_BACKUP_COUNT", "3"))
+# Records waiting for the writer thread; further records are dropped rather than blocking callers
+LOG_QUEUE_SIZE = 10000
+# Maximum records written per batch
+LOG_BATCH_SIZE = 256
+# Repeated INFO/DEBUG messages with the same template are let through once per interval
+LOG_RATE_LIMIT_INTERVAL = float(os.getenv("LOG_RATE_LIMIT_INTERVAL", "10"))
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
 logger = logging.getLogger(__name__)
 
-# Create a memory handler to capture logs
-log_buffer = io.StringIO()
-memory_handler = logging.StreamHandler(log_buffer)
+class _SeqRing:
+    """Fixed-capacity ring of increasing integers with O(1) indexing and O(log n) search"""
+    
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._items = [0] * capacity
+        self._head = 0
+        self._count = 0
+    
+    def __len__(self):
+        return self._count
+    
+    def __getitem__(self, index: int):
+        # Logical index 0 is the oldest item
+        return self._items[(self._head - self._count + index) % self.capacity]
+    
+    def append(self, value: int):
+        self._items[self._head] = value
+        self._head = (self._head + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+class LogRing:
+    """Fixed-capacity ring of structured log records
+    
+    Each record gets an increasing sequence number that doubles as the paging
+    cursor. Per-level index rings hold the sequence numbers of WARNING and
+    above, so filtered queries jump straight to matching records and cost time
+    proportional to the result size rather than to the buffered history.
+    """
+    
+    INDEXED_LEVELS = (logging.WARNING, logging.ERROR, logging.CRITICAL)
+    
+    def __init__(self, capacity: int = LOG_BUFFER_CAPACITY):
+        self.capacity = capacity
+        self._records = [None] * capacity
+        self._next_seq = 1
+        self._all = _SeqRing(capacity)
+        self._by_level = {level: _SeqRing(capacity) for level in self.INDEXED_LEVELS}
+        self._lock = threading.Lock()
+    
+    @property
+    def oldest_seq(self):
+        return max(1, self._next_seq - self.capacity)
+    
+    def append(self, record: logging.LogRecord):
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "levelno": record.levelno,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            entry["seq"] = seq
+            self._records[seq % self.capacity] = entry
+            self._all.append(seq)
+            for level, ring in self._by_level.items():
+                if record.levelno >= level:
+                    ring.append(seq)
+    
+    def _first_seq_since(self, since: float):
+        """Binary search the buffered records for the first one logged at or after `since`"""
+        lo, hi = 0, len(self._all)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._records[self._all[mid] % self.capacity]["time"] < since:
+                lo = mid + 1
+            else:
+                hi = mid
+        return self._all[lo] if lo < len(self._all) else self._next_seq
+    
+    def query(self, level: int = None, since: float = None, limit: int = 500, cursor: int = None):
+        """Get buffered records, oldest first
+        
+        Args:
+            level: Minimum level (logging.WARNING etc.)
+            since: Only records logged at or after this Unix timestamp
+            limit: Maximum number of records returned
+            cursor: Only records after this sequence number (the previous response's next_cursor)
+            
+        Without since or cursor the most recent `limit` matching records are returned.
+        """
+        with self._lock:
+            ring = self._all
+            if level is not None and level > logging.INFO:
+                # Use the index for the highest indexed level at or below the requested one
+                indexed = [indexed_level for indexed_level in self.INDEXED_LEVELS if indexed_level <= level]
+                ring = self._by_level[indexed[-1]] if indexed else self._all
+            
+            start_seq = self.oldest_seq
+            if cursor is not None:
+                start_seq = max(start_seq, cursor + 1)
+            if since is not None:
+                start_seq = max(start_seq, self._first_seq_since(since))
+            
+            seqs = _IndexView(ring)
+            if cursor is None and since is None:
+                end = len(ring)
+                start = max(bisect_left(seqs, start_seq), end - limit)
+            else:
+                start = bisect_left(seqs, start_seq)
+            
+            entries = []
+            i = start
+            while i < len(ring) and len(entries) < limit:
+                entry = self._records[ring[i] % self.capacity]
+                # Index rings can name levels between indexed ones (e.g. 35), filter those exactly
+                if level is None or entry["levelno"] >= level:
+                    entries.append(entry)
+                i += 1
+            
+            return entries, self._next_seq - 1
+
+class _IndexView:
+    """Sequence adapter so bisect can search a _SeqRing"""
+    
+    def __init__(self, ring: _SeqRing):
+        self._ring = ring
+    
+    def __len__(self):
+        return len(self._ring)
+    
+    def __getitem__(self, index: int):
+        return self._ring[index]
+
+class RingBufferHandler(logging.Handler):
+    """Logging handler appending records to a LogRing"""
+    
+    def __init__(self, ring: LogRing, level=logging.NOTSET):
+        super().__init__(level)
+        self.ring = ring
+    
+    def emit(self, record):
+        try:
+            self.ring.append(record)
+        except Exception:
+            self.handleError(record)
+
+class RateLimitFilter(logging.Filter):
+    """Lets a repeated INFO/DEBUG message through once per interval
+    
+    Only attached to `read_logger`, so it applies to the per-read messages
+    logged there and never to state changes such as GPIO writes. Messages are
+    keyed by logger and unformatted template, so they should be logged with
+    %-style arguments (`read_logger.info("Temperature: %.3f°C", temp)`) rather
+    than f-strings. The next message let through reports how many were
+    suppressed. Warnings and errors are never rate limited.
+    """
+    
+    # Forget all keys once this many distinct templates have been seen
+    MAX_KEYS = 1000
+    
+    def __init__(self, interval: float = LOG_RATE_LIMIT_INTERVAL):
+        super().__init__()
+        self.interval = interval
+        self._last_emit = {}
+        self._suppressed = {}
+    
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        
+        key = (record.name, record.levelno, record.msg if isinstance(record.msg, str) else type(record.msg))
+        now = record.created
+        last = self._last_emit.get(key)
+        if last is not None and now - last < self.interval:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return False
+        
+        if len(self._last_emit) >= self.MAX_KEYS:
+            self._last_emit.clear()
+            self._suppressed.clear()
+        self._last_emit[key] = now
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            if record.args:
+                if isinstance(record.args, tuple):
+                    record.msg = f"{record.msg} (%d similar messages suppressed)"
+                    record.args = record.args + (suppressed,)
+            else:
+                record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that only enqueues on the calling thread
+    
+    Unlike the stock QueueHandler it doesn't format the message in prepare(),
+    leaving all formatting to the writer thread, and it drops records when the
+    queue is full instead of raising.
+    """
+    
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def prepare(self, record):
+        return record
+    
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class BatchingStreamHandler(logging.StreamHandler):
+    """StreamHandler that writes a batch of records with a single write and flush"""
+    
+    def handle_batch(self, records):
+        lines = [self.format(record) + self.terminator for record in records if self.filter(record)]
+        if not lines:
+            return
+        with self.lock:
+            try:
+                self.stream.write("".join(lines))
+                self.flush()
+            except Exception:
+                self.handleError(records[-1])
+
+class BatchingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler that flushes once per batch instead of once per record"""
+    
+    def handle_batch(self, records):
+        with self.lock:
+            try:
+                for record in records:
+                    if not self.filter(record):
+                        continue
+                    if self.shouldRollover(record):
+                        self.doRollover()
+                    if self.stream is None:
+                        self.stream = self._open()
+                    self.stream.write(self.format(record) + self.terminator)
+                if self.stream is not None:
+                    self.stream.flush()
+            except Exception:
+                self.handleError(records[-1])
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """QueueListener that drains the queue in batches and hands each batch to its handlers"""
+    
+    def _monitor(self):
+        stop = False
+        while not stop:
+            record = self.dequeue(True)
+            batch = []
+            while True:
+                if record is self._sentinel:
+                    stop = True
+                    break
+                batch.append(record)
+                if len(batch) >= LOG_BATCH_SIZE:
+                    break
+                try:
+                    record = self.dequeue(False)
+                except queue.Empty:
+                    break
+            if batch:
+                self.handle_batch(batch)
+    
+    def handle_batch(self, records):
+        for handler in self.handlers:
+            accepted = [record for record in records if record.levelno >= handler.level]
+            if not accepted:
+                continue
+            if hasattr(handler, "handle_batch"):
+                handler.handle_batch(accepted)
+            else:
+                for record in accepted:
+                    handler.handle(record)
+
+def _create_file_handler(formatter):
+    if not LOG_FILE:
+        return None
+    try:
+        log_dir = os.path.dirname(LOG_FILE)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        handler = BatchingRotatingFileHandler(
+            LOG_FILE, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUP_COUNT,
+            encoding="utf-8", delay=True
+        )
+        handler.setFormatter(formatter)
+        return handler
+    except Exception as e:
+        sys.stderr.write(f"Log file {LOG_FILE} unavailable, logging to stdout only: {e}\n")
+        return None
+
+# Keep recent logs in a bounded in-memory ring for /logs
+log_ring = LogRing(LOG_BUFFER_CAPACITY)
+memory_handler = RingBufferHandler(log_ring)
 memory_handler.setLevel(logging.INFO)
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-memory_handler.setFormatter(formatter)
-logger.addHandler(memory_handler)
-
-def get_logs():
-    """Get recent application logs for debugging"""
-    log_buffer.seek(0)
-    logs = log_buffer.read()
-    log_lines = logs.strip().split('\n')
-    formatted_logs = []
-    for line in log_lines:
-        if line.strip():
-            formatted_logs.append(line)
 
+# Callers only enqueue; a background listener formats and writes in batches
+_formatter = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+_stdout_handler = BatchingStreamHandler(sys.stdout)
+_stdout_handler.setFormatter(_formatter)
+_output_handlers = [_stdout_handler, memory_handler]
+_file_handler = _create_file_handler(_formatter)
+if _file_handler is not None:
+    _output_handlers.append(_file_handler)
+
+_log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+queue_handler = NonBlockingQueueHandler(_log_queue)
+_listener = BatchingQueueListener(_log_queue, *_output_handlers, respect_handler_level=True)
+
+logging.root.setLevel(logging.INFO)
+logging.root.addHandler(queue_handler)
+_listener.start()
+
+# High-frequency per-read messages (temperature, GPIO reads) go here and are rate limited;
+# everything else, including every actuator change, is logged in full through `logger`
+read_logger = logging.getLogger(f"{__name__}.reads")
+read_logger.addFilter(RateLimitFilter(LOG_RATE_LIMIT_INTERVAL))
+
+def stop_logging():
+    """Flush queued records and stop the background writer"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        for handler in _output_handlers:
+            handler.flush()
+
+atexit.register(stop_logging)
+
+def _format_entry(entry):
+    asctime = datetime.fromtimestamp(entry["time"]).strftime('%Y-%m-%d %H:%M:%S')
+    return f"{asctime} - {entry['level']} - {entry['message']}"
+
+def get_logs(level: str = None, since: float = None, limit: int = 500, cursor: int = None):
+    """Get recent application logs for debugging
+    
+    Args:
+        level: Minimum level name (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+        since: Only records logged at or after this Unix timestamp
+        limit: Maximum number of records returned
+        cursor: Only records after this cursor (the previous response's next_cursor)
+        
+    Raises:
+        ValueError: If the level name is unknown
+    """
+    levelno = None
+    if level is not None:
+        levelno = logging.getLevelName(level.upper())
+        if not isinstance(levelno, int):
+            raise ValueError(f"Unknown log level: {level}")
+    
+    entries, latest_seq = log_ring.query(level=levelno, since=since, limit=limit, cursor=cursor)
+    formatted_logs = [_format_entry(entry) for entry in entries]
+    next_cursor = entries[-1]["seq"] if entries else (cursor if cursor is not None else latest_seq)
+    
     return {
         "logs": formatted_logs,
-        "raw_logs": logs,
-        "log_count": len(formatted_logs)
+        "raw_logs": "\n".join(formatted_logs),
+        "log_count": len(formatted_logs),
+        "records": [
+            {key: entry[key] for key in ("seq", "time", "level", "logger", "message")}
+            for entry in entries
+        ],
+        "next_cursor": next_cursor,
+        "capacity": log_ring.capacity,
+        "dropped": queue_handler.dropped
     }
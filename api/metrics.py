@@ -0,0 +1,313 @@
+# Import logger first to avoid circular imports
+from logger import logger, queue_handler
+import bisect
+import math
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Sequence
+
+# Latency buckets in seconds, from SPI register reads up to slow HTTP requests
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# --- Registry ---
+_metrics = []
+_metrics_lock = threading.Lock()
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+class _Value:
+    """One labelled time series of a counter or gauge"""
+    
+    __slots__ = ("value", "function", "_lock")
+    
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+    
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+    
+    def set(self, value: float):
+        self.value = value
+    
+    def set_function(self, function: Callable[[], float]):
+        """Read the value from `function` at scrape time instead of storing it"""
+        self.function = function
+    
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception:
+                return math.nan
+        return self.value
+
+class _HistogramValue:
+    """One labelled time series of a histogram"""
+    
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+    
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+    
+    @contextmanager
+    def time(self):
+        """Observe the duration of the `with` block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+class _Metric:
+    """Named metric with optional labels, rendered in the Prometheus text format
+    
+    Unlabelled metrics are used directly (`metric.inc()`); labelled ones
+    through `metric.labels(...)`, whose result can be kept and reused on hot
+    paths to skip the lookup.
+    """
+    
+    kind = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        self._default = None if self.labelnames else self._new_child()
+        if self._default is not None:
+            self._children[()] = self._default
+        with _metrics_lock:
+            _metrics.append(self)
+    
+    def _new_child(self):
+        return _Value()
+    
+    def labels(self, *values):
+        """Get the time series for the given label values, in labelnames order"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+    
+    def _samples(self, key, child):
+        yield self.name, _format_labels(self.labelnames, key), child.get()
+    
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._children.items()):
+            for name, labels, value in self._samples(key, child):
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    kind = "counter"
+    
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+    
+    def set_function(self, function: Callable[[], float]):
+        self._default.set_function(function)
+
+class Gauge(_Metric):
+    kind = "gauge"
+    
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+    
+    def dec(self, amount: float = 1.0):
+        self._default.dec(amount)
+    
+    def set(self, value: float):
+        self._default.set(value)
+    
+    def set_function(self, function: Callable[[], float]):
+        self._default.set_function(function)
+
+class Histogram(_Metric):
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+    
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+    
+    def observe(self, value: float):
+        self._default.observe(value)
+    
+    def time(self):
+        return self._default.time()
+    
+    def _samples(self, key, child):
+        with child._lock:
+            counts = list(child.counts)
+            total, count = child.sum, child.count
+        names = self.labelnames + ("le",)
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+            cumulative += bucket_count
+            yield f"{self.name}_bucket", _format_labels(names, key + (_format_value(bound),)), cumulative
+        labels = _format_labels(self.labelnames, key)
+        yield f"{self.name}_sum", labels, total
+        yield f"{self.name}_count", labels, count
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format (version 0.0.4)"""
+    with _metrics_lock:
+        metrics = list(_metrics)
+    return "\n".join(metric.render() for metric in metrics) + "\n"
+
+# --- HTTP ---
+HTTP_REQUESTS = Counter("oven_http_requests_total", "HTTP requests by route and status",
+                        ("method", "route", "status"))
+HTTP_REQUEST_SECONDS = Histogram("oven_http_request_duration_seconds",
+                                 "Time until the response headers are sent; streams are timed to their first byte",
+                                 ("method", "route"))
+HTTP_IN_FLIGHT = Gauge("oven_http_requests_in_flight", "HTTP requests being handled, including open streams")
+
+# --- Temperature sensor ---
+SENSOR_READ_SECONDS = Histogram("oven_sensor_read_seconds", "Duration of one MAX31865 conversion read over SPI")
+SENSOR_READ_ERRORS = Counter("oven_sensor_read_errors_total", "Failed MAX31865 reads")
+SENSOR_SAMPLES = Counter("oven_sensor_samples_total", "Filtered temperature samples published by the sampler")
+SENSOR_REJECTED = Counter("oven_sensor_rejected_samples_total", "Samples rejected by the temperature filter",
+                          ("reason",))
+
+# --- Control loop ---
+CONTROL_LOOP_JITTER_SECONDS = Histogram("oven_control_loop_jitter_seconds",
+                                        "How late each control loop iteration woke up")
+CONTROL_LOOP_STEP_SECONDS = Histogram("oven_control_loop_step_seconds", "Duration of one control loop iteration")
+CONTROL_LOOP_OVERRUNS = Counter("oven_control_loop_overruns_total",
+                                "Control loop iterations that took longer than the sample time")
+
+# --- Over-temperature interlock ---
+INTERLOCK_REACTION_SECONDS = Histogram("oven_interlock_reaction_seconds",
+                                       "Time from a limit breach to both heaters confirmed off")
+INTERLOCK_TRIPS = Counter("oven_interlock_trips_total", "Over-temperature interlock trips", ("reason",))
+INTERLOCK_DEADLINE_MISSES = Counter("oven_interlock_deadline_misses_total",
+                                    "Interlock trips that turned the heaters off later than the deadline")
+
+# --- GPIO ---
+GPIO_WRITE_SECONDS = Histogram("oven_gpio_write_seconds", "Duration of a GPIO write or GPIO bank transaction")
+GPIO_READ_SECONDS = Histogram("oven_gpio_read_seconds", "Duration of get_output for GPIOs outside the GPIO bank")
+GPIO_ERRORS = Counter("oven_gpio_errors_total", "Failed GPIO operations", ("operation",))
+
+# --- Hardware actor ---
+HARDWARE_QUEUE_WAIT_SECONDS = Histogram("oven_hardware_queue_wait_seconds",
+                                        "Time a hardware command waited for the hardware actor", ("priority",))
+HARDWARE_COMMAND_SECONDS = Histogram("oven_hardware_command_seconds",
+                                     "Duration of one hardware command on the hardware actor", ("priority",))
+HARDWARE_COMMAND_ERRORS = Counter("oven_hardware_command_errors_total", "Hardware commands that raised",
+                                  ("priority",))
+HARDWARE_QUEUE_DEPTH = Gauge("oven_hardware_queue_depth", "Hardware commands waiting for the hardware actor")
+
+# --- Camera ---
+CAMERA_ENCODE_SECONDS = Histogram("oven_camera_encode_seconds",
+                                  "Capture and JPEG encode time of one frame for all requested keys", ("encoder",))
+CAMERA_CAPTURE_ERRORS = Counter("oven_camera_capture_errors_total", "Frames that failed to capture or encode")
+CAMERA_ACTIVE_STREAMS = Gauge("oven_camera_active_streams", "Open MJPEG streams")
+CAMERA_FRAMES_SENT = Counter("oven_camera_stream_frames_sent_total", "Frames written to MJPEG streams", ("profile",))
+CAMERA_FRAME_SEND_SECONDS = Histogram("oven_camera_frame_send_seconds",
+                                      "Time for the server to hand one MJPEG frame to the client")
+CAMERA_FRAMES_DROPPED = Counter("oven_camera_frames_dropped_total",
+                                "Frames replaced before a slow consumer received them")
+
+# --- Process ---
+PROCESS_RSS = Gauge("process_resident_memory_bytes", "Resident memory size in bytes")
+PROCESS_CPU = Counter("process_cpu_seconds_total", "User and system CPU time spent in seconds")
+LOG_RECORDS_DROPPED = Counter("oven_log_records_dropped_total", "Log records dropped because the log queue was full")
+
+def _resident_memory() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+def _cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+PROCESS_RSS.set_function(_resident_memory)
+PROCESS_CPU.set_function(_cpu_seconds)
+LOG_RECORDS_DROPPED.set_function(lambda: queue_handler.dropped)
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests and timing them per route template
+    
+    Timing stops when the response headers go out, so long-lived streams
+    don't skew the latency histogram; they show up in the in-flight gauge.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        method = scope["method"]
+        recorded = False
+        
+        def record(status: int):
+            nonlocal recorded
+            recorded = True
+            route = scope.get("route")
+            # Unmatched paths share one label so scanners can't blow up the series count
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.labels(method, route_path).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(method, route_path, status).inc()
+        
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start" and not recorded:
+                record(message["status"])
+            await send(message)
+        
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        except Exception:
+            if not recorded:
+                record(500)
+            raise
+        finally:
+            HTTP_IN_FLIGHT.dec()
@@ -0,0 +1,256 @@
+# Import logger first to avoid circular imports
+from logger import logger
+import time
+import threading
+from enum import Enum
+from typing import List, NamedTuple, Optional
+from controller import HeaterMode, get_controller
+from hardware import get_sampler
+from config import RECIPE_TICK_INTERVAL, RECIPE_TEMPERATURE_TOLERANCE
+
+class StopCondition(str, Enum):
+    TIME = "time"                # Phase ends `duration` minutes after it starts
+    TEMPERATURE = "temperature"  # Phase ends as soon as the oven reaches the target
+    HOLD = "hold"                # Phase ends `duration` minutes after the oven reaches the target
+
+class RecipeState(str, Enum):
+    IDLE = "idle"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    STOPPED = "stopped"
+    ABORTED = "aborted"
+
+class RecipePhase(NamedTuple):
+    """One step of a bake program"""
+    name: str
+    temperature: float
+    duration: float = 0.0                 # Minutes
+    stop_condition: StopCondition = StopCondition.TIME
+    ramp_rate: Optional[float] = None     # °C per minute; None jumps straight to the target
+    elements: HeaterMode = HeaterMode.BOTH
+
+# --- Global executor instance ---
+_executor = None
+_executor_lock = threading.Lock()
+
+class RecipeExecutor:
+    """Runs a multi-phase bake program on a server-side scheduler
+    
+    On entering a phase the executor retargets the heater control loop, which
+    ramps its setpoint at the phase's ramp rate. Every `tick_interval`
+    seconds it checks the phase's stop condition and advances when it is met. It runs on its
+    own thread, so a program keeps going when every client disconnects.
+    """
+    
+    def __init__(self, tick_interval: float = RECIPE_TICK_INTERVAL,
+                 tolerance: float = RECIPE_TEMPERATURE_TOLERANCE):
+        self.tick_interval = tick_interval
+        self.tolerance = tolerance
+        self.state = RecipeState.IDLE
+        self.name = None
+        self.phases: List[RecipePhase] = []
+        self.phase_index = None
+        self.setpoint = None
+        self.started_at = None
+        self.ended_at = None
+        self.message = None
+        self._phase_started = None         # Monotonic start of the current phase
+        self._target_reached_at = None     # Monotonic time the current phase first reached its target
+        self._phase_log = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self, name: str, phases: List[RecipePhase]):
+        """Start a program from its first phase
+        
+        Raises:
+            Exception: If a program is already running or there are no phases
+        """
+        if not phases:
+            raise Exception("Recipe has no phases")
+        
+        with self._lock:
+            if self.is_running:
+                raise Exception(f"Recipe '{self.name}' is already running")
+            
+            # Start the loop before taking over the state, so a refusal (autotune running,
+            # interlock tripped) leaves the previous program's status untouched
+            controller = get_controller()
+            first = phases[0]
+            if not controller.is_running:
+                controller.start(first.temperature, first.elements, _ramp_rate(first))
+            
+            self.name = name
+            self.phases = list(phases)
+            self.state = RecipeState.RUNNING
+            self.started_at = time.time()
+            self.ended_at = None
+            self.message = None
+            self._phase_log = []
+            try:
+                self._enter_phase(0)
+                self._stop_event.clear()
+                self._thread = threading.Thread(target=self._run, name="recipe-executor", daemon=True)
+                self._thread.start()
+            except Exception as e:
+                self._thread = None
+                self._finish(RecipeState.ABORTED, f"Failed to start: {e}")
+                raise
+        
+        logger.info(f"Recipe '{name}' started with {len(phases)} phases")
+    
+    def stop(self):
+        """Stop the program and the heater control loop"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.tick_interval * 2 + 1.0)
+            self._thread = None
+        with self._lock:
+            if self.state == RecipeState.RUNNING:
+                self._finish(RecipeState.STOPPED, "Stopped by request")
+    
+    def skip_phase(self):
+        """End the current phase now and move on to the next one"""
+        with self._lock:
+            if not self.is_running or self.phase_index is None:
+                raise Exception("No recipe is running")
+            self._advance()
+    
+    def _run(self):
+        next_tick = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                with self._lock:
+                    if self.state != RecipeState.RUNNING:
+                        break
+                    self._tick()
+            except Exception as e:
+                logger.error(f"Recipe tick failed: {e}")
+            
+            next_tick += self.tick_interval
+            self._stop_event.wait(max(0.0, next_tick - time.monotonic()))
+    
+    def _tick(self):
+        controller = get_controller()
+        if not controller.is_running:
+            # Someone stopped the loop or switched to manual heater control
+            self._finish(RecipeState.ABORTED, "Heater control loop stopped outside the recipe", stop_controller=False)
+            return
+        
+        phase = self.phases[self.phase_index]
+        now = time.monotonic()
+        self.setpoint = controller.setpoint
+        
+        temperature = self._current_temperature()
+        if (self._target_reached_at is None and abs(self.setpoint - phase.temperature) <= self.tolerance
+                and temperature is not None and abs(temperature - phase.temperature) <= self.tolerance):
+            self._target_reached_at = now
+            logger.info(f"Recipe phase '{phase.name}' reached {phase.temperature}°C")
+        
+        if self._phase_done(phase, now):
+            self._advance()
+    
+    def _phase_done(self, phase: RecipePhase, now: float) -> bool:
+        if phase.stop_condition == StopCondition.TIME:
+            return now - self._phase_started >= phase.duration * 60.0
+        if self._target_reached_at is None:
+            return False
+        if phase.stop_condition == StopCondition.TEMPERATURE:
+            return True
+        return now - self._target_reached_at >= phase.duration * 60.0
+    
+    def _advance(self):
+        self._phase_log[-1]["ended_at"] = time.time()
+        next_index = self.phase_index + 1
+        if next_index >= len(self.phases):
+            self._finish(RecipeState.COMPLETED, "All phases completed")
+            return
+        self._enter_phase(next_index)
+    
+    def _enter_phase(self, index: int):
+        phase = self.phases[index]
+        controller = get_controller()
+        # The controller ramps from wherever the previous phase left the setpoint
+        controller.set_target(phase.temperature, phase.elements, _ramp_rate(phase))
+        self.phase_index = index
+        self.setpoint = controller.setpoint
+        self._phase_started = time.monotonic()
+        self._target_reached_at = None
+        self._phase_log.append({"index": index, "name": phase.name, "started_at": time.time(), "ended_at": None})
+        logger.info(f"Recipe '{self.name}' phase {index + 1}/{len(self.phases)}: {phase.name}, "
+                    f"target={phase.temperature}°C, elements={phase.elements.value}")
+    
+    def _finish(self, state: RecipeState, message: str, stop_controller: bool = True):
+        self.state = state
+        self.message = message
+        self.ended_at = time.time()
+        if self._phase_log and self._phase_log[-1]["ended_at"] is None:
+            self._phase_log[-1]["ended_at"] = self.ended_at
+        self._stop_event.set()
+        if stop_controller:
+            try:
+                get_controller().stop()
+            except Exception as e:
+                logger.error(f"Failed to stop heater control loop after recipe: {e}")
+        logger.info(f"Recipe '{self.name}' {state.value}: {message}")
+    
+    def _current_temperature(self) -> Optional[float]:
+        snapshot = get_sampler().get_snapshot()
+        if snapshot is None or not snapshot.ok:
+            return None
+        return snapshot.temperature
+    
+    def get_status(self):
+        """Get program progress for the API"""
+        with self._lock:
+            status = {
+                "state": self.state.value,
+                "name": self.name,
+                "phase_index": self.phase_index,
+                "total_phases": len(self.phases),
+                "setpoint": self.setpoint,
+                "started_at": self.started_at,
+                "ended_at": self.ended_at,
+                "message": self.message,
+                "phases": [
+                    {**phase._asdict(), "stop_condition": phase.stop_condition.value, "elements": phase.elements.value}
+                    for phase in self.phases
+                ],
+                "phase_log": [dict(entry) for entry in self._phase_log],
+                "current_phase": None
+            }
+            if self.state == RecipeState.RUNNING and self.phase_index is not None:
+                phase = self.phases[self.phase_index]
+                now = time.monotonic()
+                remaining = None
+                if phase.stop_condition == StopCondition.TIME:
+                    remaining = max(0.0, phase.duration * 60.0 - (now - self._phase_started))
+                elif phase.stop_condition == StopCondition.HOLD and self._target_reached_at is not None:
+                    remaining = max(0.0, phase.duration * 60.0 - (now - self._target_reached_at))
+                status["current_phase"] = {
+                    "name": phase.name,
+                    "target_temperature": phase.temperature,
+                    "elapsed": round(now - self._phase_started, 1),
+                    "remaining": None if remaining is None else round(remaining, 1),
+                    "target_reached": self._target_reached_at is not None
+                }
+            return status
+
+def _ramp_rate(phase: RecipePhase) -> float:
+    # A phase without a ramp rate jumps straight to its target
+    return phase.ramp_rate or 0.0
+
+def get_recipe_executor() -> RecipeExecutor:
+    """Get global recipe executor instance"""
+    global _executor
+    
+    with _executor_lock:
+        if _executor is None:
+            _executor = RecipeExecutor(tick_interval=RECIPE_TICK_INTERVAL, tolerance=RECIPE_TEMPERATURE_TOLERANCE)
+    
+    return _executor
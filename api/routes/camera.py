@@ -1,8 +1,11 @@
 from fastapi import APIRouter, HTTPException, Response
 from fastapi.responses import StreamingResponse
 from logger import logger
-from camera import get_camera, get_camera_info, diagnose_camera, CAMERA_AVAILABLE
-import asyncio
+from diagnostics import get_diagnostics, describe_start
+from camera import (
+    get_camera, get_camera_info, run_in_camera_executor,
+    CAMERA_AVAILABLE, STREAM_PROFILES, DEFAULT_STREAM_PROFILE
+)
 from typing import Optional
 
 router = APIRouter()
@@ -22,34 +25,34 @@ async def camera_info():
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/camera/diagnose")
-async def camera_diagnose(max_devices: int = 20):
-    """Diagnose camera functionality with optional device range limit"""
+def camera_diagnose(max_devices: int = 20, refresh: bool = False):
+    """
+    Start camera diagnostics in the background and return right away.
+    `data` holds the last finished result; poll /diagnostics/jobs/{id} for the running job.
+    """
     try:
-        diagnostics = diagnose_camera(max_devices=max_devices)
+        job, last = get_diagnostics().start("camera", refresh=refresh, max_devices=max_devices)
         logger.info("Camera diagnostics requested")
-        return {
-            "status": "success",
-            "data": diagnostics
-        }
+        return describe_start(job, last)
     except Exception as e:
-        logger.error(f"Error running camera diagnostics: {e}")
+        logger.error(f"Error starting camera diagnostics: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/camera/snapshot")
-async def camera_snapshot():
+async def camera_snapshot(quality: Optional[int] = 90):
     """Capture a single frame as JPEG"""
     if not CAMERA_AVAILABLE:
         raise HTTPException(status_code=503, detail="Camera not available")
     
+    # Validate quality parameter
+    if quality < 1 or quality > 100:
+        raise HTTPException(status_code=400, detail="Quality must be between 1 and 100")
+    
     try:
-        camera = get_camera()
+        camera = await run_in_camera_executor(get_camera)
         
-        # Start camera if not already started
-        if not camera.is_streaming:
-            camera.start()
-        
-        # Capture JPEG frame
-        jpeg_data = camera.capture_jpeg(quality=90)
+        # Take the next frame from the shared broadcaster
+        jpeg_data = await camera.get_snapshot_jpeg(quality=quality)
         
         if jpeg_data is None:
             raise HTTPException(status_code=500, detail="Failed to capture frame")
@@ -60,27 +63,33 @@ async def camera_snapshot():
             media_type="image/jpeg",
             headers={"Cache-Control": "no-cache"}
         )
-        
+    
     except Exception as e:
         logger.error(f"Error capturing snapshot: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/camera/stream")
-async def camera_stream(quality: Optional[int] = 85):
-    """Stream camera feed as MJPEG"""
+async def camera_stream(profile: str = DEFAULT_STREAM_PROFILE, quality: Optional[int] = None):
+    """Stream camera feed as MJPEG using a named profile (thumbnail, dashboard or full)"""
     if not CAMERA_AVAILABLE:
         raise HTTPException(status_code=503, detail="Camera not available")
     
+    if profile not in STREAM_PROFILES:
+        raise HTTPException(status_code=400, detail=f"Unknown profile: {profile}. Available profiles: {list(STREAM_PROFILES)}")
+    stream_profile = STREAM_PROFILES[profile]
+    
     # Validate quality parameter
+    if quality is None:
+        quality = stream_profile.quality
     if quality < 1 or quality > 100:
         raise HTTPException(status_code=400, detail="Quality must be between 1 and 100")
     
     try:
-        camera = get_camera()
-        logger.info(f"Camera stream started with quality {quality}")
+        camera = await run_in_camera_executor(get_camera)
+        logger.info(f"Camera stream started with profile {profile}, quality {quality}")
         
         return StreamingResponse(
-            camera.get_mjpeg_stream(quality=quality),
+            camera.get_mjpeg_stream(profile=stream_profile, quality=quality),
             media_type="multipart/x-mixed-replace; boundary=frame",
             headers={
                 "Cache-Control": "no-cache, no-store, must-revalidate",
@@ -89,7 +98,7 @@ async def camera_stream(quality: Optional[int] = 85):
                 "Connection": "close"
             }
         )
-        
+    
     except Exception as e:
         logger.error(f"Error starting camera stream: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -101,17 +110,16 @@ async def camera_start():
         raise HTTPException(status_code=503, detail="Camera not available")
     
     try:
-        camera = get_camera()
-        if not camera.is_streaming:
-            camera.start()
-            logger.info("Camera started via API")
+        camera = await run_in_camera_executor(get_camera)
+        await run_in_camera_executor(camera.ensure_started)
+        logger.info("Camera started via API")
         
         return {
             "status": "success",
             "message": "Camera started",
             "data": get_camera_info()
         }
-        
+    
     except Exception as e:
         logger.error(f"Error starting camera: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -123,9 +131,9 @@ async def camera_stop():
         raise HTTPException(status_code=503, detail="Camera not available")
     
     try:
-        camera = get_camera()
+        camera = await run_in_camera_executor(get_camera)
         if camera.is_streaming:
-            camera.stop()
+            await run_in_camera_executor(camera.stop)
             logger.info("Camera stopped via API")
         
         return {
@@ -133,7 +141,7 @@ async def camera_stop():
             "message": "Camera stopped",
             "data": get_camera_info()
         }
-        
+    
     except Exception as e:
         logger.error(f"Error stopping camera: {e}")
         raise HTTPException(status_code=500, detail=str(e))
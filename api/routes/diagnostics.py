@@ -0,0 +1,32 @@
+from fastapi import APIRouter, HTTPException
+from diagnostics import get_diagnostics, describe_start
+from logger import logger
+
+router = APIRouter()
+
+@router.get("/gpio/diagnose")
+def gpio_diagnose(refresh: bool = False):
+    """
+    Start GPIO diagnostics in the background and return right away.
+    Every GPIO outside the heater bank is toggled on and off; `data` holds the last finished result.
+    """
+    try:
+        job, last = get_diagnostics().start("gpio", refresh=refresh)
+        logger.info("GPIO diagnostics requested")
+        return describe_start(job, last)
+    except Exception as e:
+        logger.error(f"Error starting GPIO diagnostics: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/diagnostics/jobs")
+def list_diagnostic_jobs():
+    """Recent diagnostics jobs and the last finished job of each kind"""
+    return {"status": "success", "data": get_diagnostics().get_status()}
+
+@router.get("/diagnostics/jobs/{job_id}")
+def get_diagnostic_job(job_id: str):
+    """Progress of a diagnostics job, and its result once finished"""
+    job = get_diagnostics().get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Diagnostics job '{job_id}' not found")
+    return {"status": "success", "data": job.to_dict()}
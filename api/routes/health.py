@@ -1,5 +1,8 @@
 from fastapi import APIRouter
-from hardware import HARDWARE_AVAILABLE, get_sensor
+from fastapi.responses import JSONResponse
+from hardware import HARDWARE_AVAILABLE, is_sensor_initialized
+from startup import get_startup
+from config import HARDWARE_BACKEND
 from logger import logger
 
 router = APIRouter()
@@ -7,14 +10,26 @@ router = APIRouter()
 @router.get("/health")
 def health():
     logger.info("Health check requested")
-    try:
-        sensor = get_sensor()
-        sensor_initialized = sensor is not None
-    except:
-        sensor_initialized = False
-    
+    # Never initializes the sensor here; that happens during startup warm-up
     return {
         "status": "ok",
         "hardware_available": HARDWARE_AVAILABLE,
-        "sensor_initialized": sensor_initialized
+        "backend": HARDWARE_BACKEND,
+        "sensor_initialized": is_sensor_initialized(),
+        "ready": get_startup().is_ready
     }
+
+@router.get("/livez")
+def livez():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "alive", "uptime": get_startup().get_status()["uptime"]}
+
+@router.get("/readyz")
+def readyz():
+    """Readiness probe: 200 once every required component is warmed up, 503 before
+    
+    The body reports each component's init state and timings either way.
+    """
+    startup = get_startup()
+    status = startup.get_status()
+    return JSONResponse(status_code=200 if startup.is_ready else 503, content=status)
@@ -0,0 +1,72 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from autotune import TuningRule, get_autotuner
+from interlock import get_interlock
+from controller import HeaterMode
+from tunings import get_tunings_info, clear_tunings
+from config import AUTOTUNE_HYSTERESIS, AUTOTUNE_CYCLES
+from logger import logger
+
+router = APIRouter()
+
+class AutotuneStartRequest(BaseModel):
+    setpoint: float = Field(..., ge=30, le=280)
+    hysteresis: float = Field(AUTOTUNE_HYSTERESIS, gt=0, le=10)
+    cycles: int = Field(AUTOTUNE_CYCLES, ge=2, le=10)
+    mode: HeaterMode = HeaterMode.BOTH
+    rule: TuningRule = TuningRule.NO_OVERSHOOT
+
+@router.post("/heater/autotune/start")
+def start_autotune(request: AutotuneStartRequest):
+    """
+    Start a relay-feedback autotune experiment around the setpoint.
+    The heaters are switched fully on/off to make the oven oscillate; the resulting
+    gains are saved and used by the controller from the next control loop start.
+    """
+    if request.mode == HeaterMode.OFF:
+        raise HTTPException(status_code=400, detail="Mode must select at least one heater element")
+    
+    autotuner = get_autotuner()
+    if autotuner.is_running:
+        raise HTTPException(status_code=409, detail="Autotune is already running")
+    interlock = get_interlock()
+    if interlock.tripped:
+        raise HTTPException(status_code=409, detail=interlock.trip_message)
+    
+    try:
+        autotuner.start(request.setpoint, request.hysteresis, request.cycles, request.mode, request.rule)
+        return {"status": "success", "message": "Autotune started", "data": autotuner.get_status()}
+    except Exception as e:
+        logger.error(f"Failed to start autotune: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/heater/autotune/stop")
+def stop_autotune():
+    """Abort the autotune experiment and turn both heater elements off"""
+    try:
+        autotuner = get_autotuner()
+        autotuner.stop()
+        return {"status": "success", "message": "Autotune stopped", "data": autotuner.get_status()}
+    except Exception as e:
+        logger.error(f"Failed to stop autotune: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/heater/autotune/status")
+def get_autotune_status():
+    """Get autotune progress and, once completed, the identified Ku, Pu and gains"""
+    return get_autotuner().get_status()
+
+@router.get("/heater/tunings")
+def get_tunings():
+    """Get the active PID gain table and the autotune results it was built from"""
+    return get_tunings_info()
+
+@router.delete("/heater/tunings")
+def delete_tunings():
+    """Forget autotuned gains and go back to the gain table in config.py"""
+    try:
+        clear_tunings()
+        return {"status": "success", "message": "Autotuned gains cleared", "data": get_tunings_info()}
+    except Exception as e:
+        logger.error(f"Failed to clear PID tunings: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,71 +1,138 @@
 from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel
-from simple_pid import PID
-from hardware import get_sensor
+from pydantic import BaseModel, Field
+from hardware import read_temperature
+from controller import ControlStrategy, HeaterMode, PIDEngine, get_controller
+from interlock import get_interlock
+from recipes import get_recipe_executor
+from tunings import get_gain_table, gain_table_to_json
 from logger import logger
 from config import (
-    HEATER_PID_KP, HEATER_PID_KI, HEATER_PID_KD, 
+    HEATER_PID_KP, HEATER_PID_KI, HEATER_PID_KD,
     HEATER_PID_SAMPLE_TIME, HEATER_PID_OUTPUT_LIMITS, HEATER_PID_THRESHOLD
 )
 import time
+from typing import Optional
 
 router = APIRouter()
 
-# Global PID controller instance
+RECIPE_OWNS_LOOP = "A recipe is running and owns the heater control loop; stop it with POST /recipe/stop"
+
+# Global PID controller instance, kept across setpoint changes so the integral survives
 _pid_controller = None
 _last_update_time = None
+_last_output = None
 
 class HeaterControlRequest(BaseModel):
     target_temperature: float
 
+class HeaterLoopStartRequest(BaseModel):
+    target_temperature: float
+    mode: HeaterMode = HeaterMode.BOTH
+    ramp_rate: Optional[float] = Field(None, ge=0, description="°C per minute; 0 jumps to the target")
+    strategy: ControlStrategy = ControlStrategy.PID
+
+class HeaterLoopTargetRequest(BaseModel):
+    target_temperature: float
+    mode: Optional[HeaterMode] = None
+    ramp_rate: Optional[float] = Field(None, ge=0, description="°C per minute; 0 jumps to the target")
+
 class HeaterControlResponse(BaseModel):
     heater_should_be_on: bool
     current_temperature: float
     target_temperature: float
     pid_output: float
+    duty: float
     error: float
     pid_parameters: dict
 
-def get_pid_controller(target_temp: float):
-    """Get or create PID controller with constant parameters from config"""
-    global _pid_controller, _last_update_time
+def get_pid_controller() -> PIDEngine:
+    """Get or create the PID controller used by /heater/control"""
+    global _pid_controller
     
-    # Create new controller if target temperature changed or controller doesn't exist
-    if (_pid_controller is None or _pid_controller.setpoint != target_temp):
-        
-        _pid_controller = PID(HEATER_PID_KP, HEATER_PID_KI, HEATER_PID_KD, setpoint=target_temp)
-        _pid_controller.sample_time = HEATER_PID_SAMPLE_TIME
-        _pid_controller.output_limits = HEATER_PID_OUTPUT_LIMITS
-        _last_update_time = time.time()
-        
-        logger.info(f"Created new PID controller: target={target_temp}°C, Kp={HEATER_PID_KP}, Ki={HEATER_PID_KI}, Kd={HEATER_PID_KD}")
+    # Pick up newly autotuned gains
+    if _pid_controller is None or _pid_controller.gain_table != get_gain_table():
+        _pid_controller = PIDEngine()
+        logger.info(f"Created PID controller with gain table {gain_table_to_json(_pid_controller.gain_table)}")
     
     return _pid_controller
 
+def update_pid_controller(current_temp: float, target_temp: float) -> float:
+    """Run one PID step, at most once per HEATER_PID_SAMPLE_TIME
+    
+    A setpoint change just moves the setpoint of the existing controller, so
+    the integral term carries over instead of restarting from zero.
+    """
+    global _last_update_time, _last_output
+    
+    pid = get_pid_controller()
+    now = time.time()
+    dt = HEATER_PID_SAMPLE_TIME if _last_update_time is None else now - _last_update_time
+    if dt > HEATER_PID_SAMPLE_TIME * 10:
+        # Clients stopped polling for a while; don't integrate the whole gap at once
+        dt = HEATER_PID_SAMPLE_TIME
+    if _last_output is not None and dt < HEATER_PID_SAMPLE_TIME and pid.setpoint == target_temp:
+        return _last_output
+    
+    _last_output = pid.update(current_temp, target_temp, dt)
+    _last_update_time = now
+    return _last_output
+
+def _pid_parameters(tunings):
+    kp, ki, kd = tunings
+    return {
+        "kp": kp,
+        "ki": ki,
+        "kd": kd,
+        "sample_time": HEATER_PID_SAMPLE_TIME,
+        "output_limits": HEATER_PID_OUTPUT_LIMITS,
+        "threshold": HEATER_PID_THRESHOLD
+    }
+
 @router.post("/heater/control", response_model=HeaterControlResponse)
-def control_heater(request: HeaterControlRequest):
+def control_heater(request: HeaterControlRequest, max_age_ms: Optional[float] = Query(None, ge=0)):
     """
     Determine if heater should be on based on current temperature and target temperature using PID control.
-    Uses constant PID parameters defined in config.py.
+    Uses the PID gain table defined in config.py.
     
     Args:
         request: HeaterControlRequest containing target temperature only
-        
+        max_age_ms: Maximum age of the cached temperature sample in milliseconds
+    
     Returns:
         HeaterControlResponse with heater status and control information
     """
     logger.info(f"Heater control requested: target={request.target_temperature}°C")
     
     try:
-        # Get current temperature from sensor
-        sensor = get_sensor()
-        current_temp = sensor.temperature()
+        # When the server-side loop is running it owns the PID, so retarget it instead;
+        # a running recipe owns the target, so the request is only answered with the loop's state
+        controller = get_controller()
+        if controller.is_running:
+            if get_recipe_executor().is_running:
+                logger.info(f"Recipe is running; ignoring heater control target {request.target_temperature}°C")
+            else:
+                controller.set_target(request.target_temperature)
+            loop_status = controller.get_status()
+            target_temp = loop_status["target_temperature"]
+            current_temp = loop_status["current_temperature"]
+            if current_temp is None:
+                current_temp = read_temperature(max_age_ms=max_age_ms).temperature
+            pid_output = loop_status["pid_output"] or 0.0
+            return HeaterControlResponse(
+                heater_should_be_on=loop_status["heater_on"],
+                current_temperature=current_temp,
+                target_temperature=target_temp,
+                pid_output=pid_output,
+                duty=min(1.0, max(0.0, pid_output)),
+                error=target_temp - current_temp,
+                pid_parameters=_pid_parameters(loop_status["pid_tunings"])
+            )
         
-        # Get PID controller with constant parameters
-        pid = get_pid_controller(target_temp=request.target_temperature)
+        # Get current temperature from the background sampler
+        current_temp = read_temperature(max_age_ms=max_age_ms).temperature
         
         # Calculate PID output
-        pid_output = pid(current_temp)
+        pid_output = update_pid_controller(current_temp, request.target_temperature)
         
         # Determine if heater should be on using constant threshold
         heater_should_be_on = pid_output > HEATER_PID_THRESHOLD
@@ -78,29 +145,23 @@ def control_heater(request: HeaterControlRequest):
             current_temperature=current_temp,
             target_temperature=request.target_temperature,
             pid_output=pid_output,
+            duty=min(1.0, max(0.0, pid_output)),
             error=error,
-            pid_parameters={
-                "kp": HEATER_PID_KP,
-                "ki": HEATER_PID_KI,
-                "kd": HEATER_PID_KD,
-                "sample_time": HEATER_PID_SAMPLE_TIME,
-                "output_limits": HEATER_PID_OUTPUT_LIMITS,
-                "threshold": HEATER_PID_THRESHOLD
-            }
+            pid_parameters=_pid_parameters(get_pid_controller().tunings)
         )
         
-        logger.info(f"Heater control: current={current_temp:.2f}°C, target={request.target_temperature}°C, "
-                   f"output={pid_output:.3f}, heater_on={heater_should_be_on}")
+        logger.info("Heater control: current=%.2f°C, target=%s°C, output=%.3f, heater_on=%s",
+                    current_temp, request.target_temperature, pid_output, heater_should_be_on)
         
         return response
-        
+    
     except Exception as e:
         logger.error(f"Failed to control heater: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/heater/status")
-def get_heater_status():
+def get_heater_status(max_age_ms: Optional[float] = Query(None, ge=0)):
     """
     Get current heater control status and PID controller information.
     
@@ -110,9 +171,8 @@ def get_heater_status():
     global _pid_controller, _last_update_time
     
     try:
-        # Get current temperature
-        sensor = get_sensor()
-        current_temp = sensor.temperature()
+        # Get current temperature from the background sampler
+        current_temp = read_temperature(max_age_ms=max_age_ms).temperature
         
         status = {
             "current_temperature": current_temp,
@@ -124,9 +184,11 @@ def get_heater_status():
             status.update({
                 "target_temperature": _pid_controller.setpoint,
                 "pid_tunings": _pid_controller.tunings,
-                "sample_time": _pid_controller.sample_time,
+                "pid_components": _pid_controller.components,
+                "gain_band": _pid_controller.band,
+                "sample_time": HEATER_PID_SAMPLE_TIME,
                 "output_limits": _pid_controller.output_limits,
-                "last_output": getattr(_pid_controller, '_last_output', None)
+                "last_output": _last_output
             })
         
         # Add constant PID parameters for reference
@@ -138,11 +200,12 @@ def get_heater_status():
                 "sample_time": HEATER_PID_SAMPLE_TIME,
                 "output_limits": HEATER_PID_OUTPUT_LIMITS,
                 "threshold": HEATER_PID_THRESHOLD
-            }
+            },
+            "gain_table": gain_table_to_json(get_gain_table())
         })
         
         return status
-        
+    
     except Exception as e:
         logger.error(f"Failed to get heater status: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -155,12 +218,72 @@ def reset_heater_controller():
     Returns:
         Success message
     """
-    global _pid_controller, _last_update_time
+    global _pid_controller, _last_update_time, _last_output
     
     if _pid_controller is not None:
         _pid_controller.reset()
-        _last_update_time = time.time()
+        _last_update_time = None
+        _last_output = None
         logger.info("PID controller reset")
         return {"message": "PID controller reset successfully"}
     else:
         return {"message": "No PID controller to reset"}
+
+
+@router.post("/heater/loop/start")
+def start_heater_loop(request: HeaterLoopStartRequest):
+    """
+    Start the server-side closed-loop controller.
+    The loop runs every HEATER_PID_SAMPLE_TIME seconds and drives the heater GPIOs directly.
+    """
+    if request.mode == HeaterMode.OFF:
+        raise HTTPException(status_code=400, detail="Mode must select at least one heater element")
+    interlock = get_interlock()
+    if interlock.tripped:
+        raise HTTPException(status_code=409, detail=interlock.trip_message)
+    
+    try:
+        controller = get_controller()
+        controller.start(request.target_temperature, request.mode, request.ramp_rate, request.strategy)
+        return {"status": "success", "message": "Heater control loop started", "data": controller.get_status()}
+    except Exception as e:
+        logger.error(f"Failed to start heater control loop: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/heater/loop/target")
+def retarget_heater_loop(request: HeaterLoopTargetRequest):
+    """Change the setpoint and optionally the heater elements of the running loop"""
+    if request.mode == HeaterMode.OFF:
+        raise HTTPException(status_code=400, detail="Use /heater/loop/stop to turn the heaters off")
+    
+    controller = get_controller()
+    if not controller.is_running:
+        raise HTTPException(status_code=409, detail="Heater control loop is not running")
+    if get_recipe_executor().is_running:
+        raise HTTPException(status_code=409, detail=RECIPE_OWNS_LOOP)
+    
+    try:
+        controller.set_target(request.target_temperature, request.mode, request.ramp_rate)
+        return {"status": "success", "message": "Heater control loop retargeted", "data": controller.get_status()}
+    except Exception as e:
+        logger.error(f"Failed to retarget heater control loop: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/heater/loop/stop")
+def stop_heater_loop():
+    """Stop the server-side controller and turn both heater elements off"""
+    if get_recipe_executor().is_running:
+        raise HTTPException(status_code=409, detail=RECIPE_OWNS_LOOP)
+    
+    try:
+        controller = get_controller()
+        controller.stop()
+        return {"status": "success", "message": "Heater control loop stopped", "data": controller.get_status()}
+    except Exception as e:
+        logger.error(f"Failed to stop heater control loop: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/heater/loop/status")
+def get_heater_loop_status():
+    """Get the state of the server-side controller, including loop timing jitter"""
+    return get_controller().get_status()
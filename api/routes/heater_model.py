@@ -0,0 +1,37 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import List, Optional
+from thermal_model import fit_thermal_model, get_thermal_model, save_thermal_model
+from logger import logger
+
+router = APIRouter()
+
+class ThermalModelFitRequest(BaseModel):
+    session_ids: Optional[List[str]] = None
+
+@router.post("/heater/model/fit")
+def fit_model(request: ThermalModelFitRequest):
+    """
+    Fit the oven's thermal model (first order plus dead time, per heater mode) to recorded sessions.
+    Without session_ids the most recent finished sessions are used. The fitted model is saved
+    and used by the control loop's predictive strategy.
+    """
+    try:
+        model = fit_thermal_model(request.session_ids)
+        save_thermal_model(model)
+        return {"status": "success", "message": "Thermal model fitted", "data": model.to_dict()}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=f"Session not found: {e.filename}")
+    except Exception as e:
+        logger.error(f"Failed to fit thermal model: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/heater/model")
+def get_model():
+    """Get the fitted thermal model"""
+    model = get_thermal_model()
+    if model is None:
+        raise HTTPException(status_code=404, detail="No thermal model has been fitted")
+    return model.to_dict()
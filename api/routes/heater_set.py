@@ -1,53 +1,63 @@
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from enum import Enum
-from hardware import set_output, get_output
+from pydantic import BaseModel, Field
+from typing import Optional
+from hardware import set_outputs, get_gpio_bank
+from controller import HeaterMode, HEATER_MODE_GPIOS, get_controller
+from heater_output import get_heater_output
+from autotune import get_autotuner
+from interlock import get_interlock
+from recipes import get_recipe_executor
+from config import BACK_HEATER_GPIO, FRONT_HEATER_GPIO
 from logger import logger
 
 router = APIRouter()
 
-class HeaterMode(str, Enum):
-    OFF = "off"
-    BACK = "back"
-    FRONT = "front"
-    BOTH = "both"
-
 class HeaterRequest(BaseModel):
     mode: HeaterMode
 
+class HeaterDutyRequest(BaseModel):
+    back: Optional[float] = Field(None, ge=0, le=1)
+    front: Optional[float] = Field(None, ge=0, le=1)
+
 @router.post("/heater")
 def heater_control_endpoint(request: HeaterRequest):
     """Control heater elements using GPIO 23 (back) and GPIO 24 (front)"""
     logger.info(f"Heater control requested: {request.mode}")
     
-    # GPIO mapping: 23 = back heater, 24 = front heater
-    BACK_HEATER_GPIO = 23
-    FRONT_HEATER_GPIO = 24
+    messages = {
+        HeaterMode.OFF: "Both heaters turned off",
+        HeaterMode.BACK: "Back heater turned on, front heater turned off",
+        HeaterMode.FRONT: "Front heater turned on, back heater turned off",
+        HeaterMode.BOTH: "Both heaters turned on",
+    }
+    
+    interlock = get_interlock()
+    if interlock.tripped and request.mode != HeaterMode.OFF:
+        raise HTTPException(status_code=409, detail=interlock.trip_message)
+    # A recipe owns the loop for its whole program; stopping it goes through /recipe/stop
+    if get_recipe_executor().is_running:
+        raise HTTPException(status_code=409, detail="A recipe is running; stop it with POST /recipe/stop")
+    # The closed loop owns the elements while it runs; only an explicit OFF stops it
+    controller = get_controller()
+    if controller.is_running and request.mode != HeaterMode.OFF:
+        raise HTTPException(status_code=409, detail="Heater control loop is running; retarget it with "
+                            "POST /heater/loop/target or stop it with POST /heater/loop/stop")
     
     try:
-        if request.mode == HeaterMode.OFF:
-            # Turn off both heaters
-            set_output(BACK_HEATER_GPIO, False)
-            set_output(FRONT_HEATER_GPIO, False)
-            message = "Both heaters turned off"
-            
-        elif request.mode == HeaterMode.BACK:
-            # Turn on back heater only
-            set_output(BACK_HEATER_GPIO, True)
-            set_output(FRONT_HEATER_GPIO, False)
-            message = "Back heater turned on, front heater turned off"
-            
-        elif request.mode == HeaterMode.FRONT:
-            # Turn on front heater only
-            set_output(BACK_HEATER_GPIO, False)
-            set_output(FRONT_HEATER_GPIO, True)
-            message = "Front heater turned on, back heater turned off"
-            
-        elif request.mode == HeaterMode.BOTH:
-            # Turn on both heaters
-            set_output(BACK_HEATER_GPIO, True)
-            set_output(FRONT_HEATER_GPIO, True)
-            message = "Both heaters turned on"
+        # Manual mode overrides autotuning, and OFF also stops the control loop
+        autotuner = get_autotuner()
+        if autotuner.is_running:
+            autotuner.stop()
+            logger.info("Stopped PID autotune for manual heater mode")
+        if controller.is_running:
+            controller.stop()
+            logger.warning("Stopped heater control loop: heaters turned off through POST /heater")
+        get_heater_output().release()
+        
+        # Both elements switch in one GPIO bank transaction
+        energized = HEATER_MODE_GPIOS[request.mode]
+        set_outputs({gpio_num: gpio_num in energized for gpio_num in (BACK_HEATER_GPIO, FRONT_HEATER_GPIO)})
+        message = messages[request.mode]
         
         logger.info(f"Heater control successful: {message}")
         return {
@@ -55,26 +65,66 @@ def heater_control_endpoint(request: HeaterRequest):
             "mode": request.mode,
             "message": message,
             "gpio_states": {
-                "back_heater_gpio_23": True if request.mode in [HeaterMode.BACK, HeaterMode.BOTH] else False,
-                "front_heater_gpio_24": True if request.mode in [HeaterMode.FRONT, HeaterMode.BOTH] else False
+                "back_heater_gpio_23": BACK_HEATER_GPIO in energized,
+                "front_heater_gpio_24": FRONT_HEATER_GPIO in energized
             }
         }
-        
+    
     except Exception as e:
         logger.error(f"Failed to control heater: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/heater/duty")
+def heater_duty_endpoint(request: HeaterDutyRequest):
+    """Drive the back and front elements at independent duty cycles (0-1) through the time-proportioning output"""
+    logger.info(f"Heater duty requested: back={request.back}, front={request.front}")
+    
+    duties = {}
+    if request.back is not None:
+        duties[BACK_HEATER_GPIO] = request.back
+    if request.front is not None:
+        duties[FRONT_HEATER_GPIO] = request.front
+    if not duties:
+        raise HTTPException(status_code=400, detail="Specify a duty for the back and/or front element")
+    interlock = get_interlock()
+    if interlock.tripped and any(duties.values()):
+        raise HTTPException(status_code=409, detail=interlock.trip_message)
+    if get_recipe_executor().is_running:
+        raise HTTPException(status_code=409, detail="A recipe is running; stop it with POST /recipe/stop")
+    
+    try:
+        # Manual duty overrides autotuning and closed-loop control
+        autotuner = get_autotuner()
+        if autotuner.is_running:
+            autotuner.stop()
+            logger.info("Stopped PID autotune for manual heater duty")
+        controller = get_controller()
+        if controller.is_running:
+            controller.stop()
+            logger.info("Stopped heater control loop for manual heater duty")
+        
+        output = get_heater_output()
+        output.set_duties(duties)
+        return {
+            "status": "success",
+            "message": "Heater duty updated",
+            "data": output.get_status()
+        }
+    
+    except Exception as e:
+        logger.error(f"Failed to set heater duty: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/heater/status")
 def get_heater_status():
     """Get current heater status by reading GPIO 23 and 24"""
     logger.info("Heater status requested")
     
-    BACK_HEATER_GPIO = 24
-    FRONT_HEATER_GPIO = 23
-    
     try:
-        back_state = get_output(BACK_HEATER_GPIO)
-        front_state = get_output(FRONT_HEATER_GPIO)
+        # One consistent snapshot of the bank's shadow state, no hardware access
+        states = get_gpio_bank().states()
+        back_state = states[BACK_HEATER_GPIO]
+        front_state = states[FRONT_HEATER_GPIO]
         
         # Determine current mode
         if back_state and front_state:
@@ -95,7 +145,7 @@ def get_heater_status():
             },
             "message": f"Current heater mode: {current_mode}"
         }
-        
+    
     except Exception as e:
         logger.error(f"Failed to get heater status: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,12 +1,21 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
 from datetime import datetime
+from typing import Optional
 from logger import get_logs
 
 router = APIRouter()
 
 @router.get("/logs")
-def get_logs_endpoint():
+def get_logs_endpoint(
+    level: Optional[str] = Query(None, description="Minimum level: DEBUG, INFO, WARNING, ERROR or CRITICAL"),
+    since: Optional[float] = Query(None, description="Only logs at or after this Unix timestamp"),
+    limit: int = Query(500, ge=1, le=5000),
+    cursor: Optional[int] = Query(None, ge=0, description="next_cursor from a previous response")
+):
     """Get recent application logs for debugging"""
-    logs_data = get_logs()
+    try:
+        logs_data = get_logs(level=level, since=since, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     logs_data["timestamp"] = datetime.now().isoformat()
     return logs_data
@@ -0,0 +1,74 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from recipes import RecipePhase, StopCondition, get_recipe_executor
+from controller import HeaterMode
+from interlock import get_interlock
+from logger import logger
+
+router = APIRouter()
+
+class RecipePhaseRequest(BaseModel):
+    name: str
+    temperature: float = Field(..., ge=0, le=300)
+    duration: float = Field(0, ge=0, description="Minutes")
+    stop_condition: StopCondition = StopCondition.TIME
+    ramp_rate: Optional[float] = Field(None, gt=0, description="°C per minute; omit to jump to the target")
+    elements: HeaterMode = HeaterMode.BOTH
+
+class RecipeStartRequest(BaseModel):
+    name: str
+    phases: List[RecipePhaseRequest]
+
+@router.post("/recipe/start")
+def start_recipe(request: RecipeStartRequest):
+    """Start a multi-phase bake program that runs on the server until it completes or is stopped"""
+    if not request.phases:
+        raise HTTPException(status_code=400, detail="Recipe must have at least one phase")
+    if any(phase.elements == HeaterMode.OFF for phase in request.phases):
+        raise HTTPException(status_code=400, detail="Every phase must select at least one heater element")
+    
+    executor = get_recipe_executor()
+    if executor.is_running:
+        raise HTTPException(status_code=409, detail=f"Recipe '{executor.name}' is already running")
+    interlock = get_interlock()
+    if interlock.tripped:
+        raise HTTPException(status_code=409, detail=interlock.trip_message)
+    
+    try:
+        phases = [RecipePhase(**phase.model_dump()) for phase in request.phases]
+        executor.start(request.name, phases)
+        return {"status": "success", "message": f"Recipe '{request.name}' started", "data": executor.get_status()}
+    except Exception as e:
+        logger.error(f"Failed to start recipe: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/recipe/skip")
+def skip_recipe_phase():
+    """End the current phase and move on to the next one"""
+    executor = get_recipe_executor()
+    if not executor.is_running:
+        raise HTTPException(status_code=409, detail="No recipe is running")
+    
+    try:
+        executor.skip_phase()
+        return {"status": "success", "message": "Skipped to the next phase", "data": executor.get_status()}
+    except Exception as e:
+        logger.error(f"Failed to skip recipe phase: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/recipe/stop")
+def stop_recipe():
+    """Stop the running program and turn the heaters off"""
+    try:
+        executor = get_recipe_executor()
+        executor.stop()
+        return {"status": "success", "message": "Recipe stopped", "data": executor.get_status()}
+    except Exception as e:
+        logger.error(f"Failed to stop recipe: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/recipe/status")
+def get_recipe_status():
+    """Get the running program's phase, setpoint and time remaining"""
+    return get_recipe_executor().get_status()
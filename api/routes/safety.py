@@ -0,0 +1,41 @@
+from fastapi import APIRouter, HTTPException
+from interlock import get_interlock
+from logger import logger
+
+router = APIRouter()
+
+@router.get("/safety/interlock")
+def get_interlock_status():
+    """Over-temperature interlock state, limits and reaction time statistics"""
+    return {"status": "success", "data": get_interlock().get_status()}
+
+@router.post("/safety/interlock/reset")
+def reset_interlock():
+    """Clear a tripped interlock once the oven is below the reset temperature and the sensor is healthy"""
+    interlock = get_interlock()
+    try:
+        interlock.reset()
+        return {"status": "success", "message": "Interlock reset", "data": interlock.get_status()}
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to reset interlock: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/safety/interlock/test")
+def test_interlock():
+    """
+    Trip the interlock through its own thread, as if a limit had been breached now.
+    Both heaters are turned off and the interlock stays latched until reset.
+    """
+    interlock = get_interlock()
+    try:
+        reaction_ms = interlock.test()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Interlock test failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if reaction_ms is None:
+        raise HTTPException(status_code=500, detail="Interlock did not trip within the test timeout")
+    return {"status": "success", "message": "Interlock tripped", "reaction_ms": reaction_ms, "data": interlock.get_status()}
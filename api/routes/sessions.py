@@ -0,0 +1,50 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from sessions import list_sessions, get_session, read_series, SERIES_FIELDS
+from config import SESSION_MAX_POINTS
+from logger import logger
+
+router = APIRouter()
+
+@router.get("/sessions")
+def get_sessions():
+    """List recorded bake sessions, newest first"""
+    try:
+        sessions = list_sessions()
+        return {"sessions": sessions, "count": len(sessions)}
+    except Exception as e:
+        logger.error(f"Failed to list bake sessions: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/sessions/{session_id}")
+def get_session_endpoint(session_id: str):
+    """Get a bake session's metadata"""
+    try:
+        return get_session(session_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+    except Exception as e:
+        logger.error(f"Failed to read bake session {session_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/sessions/{session_id}/series")
+def get_session_series(
+    session_id: str,
+    start: Optional[float] = Query(None, ge=0, description="Seconds since the session started"),
+    end: Optional[float] = Query(None, ge=0, description="Seconds since the session started"),
+    max_points: int = Query(SESSION_MAX_POINTS, ge=1, le=SESSION_MAX_POINTS),
+    fields: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(SERIES_FIELDS)}")
+):
+    """Get a time range of a bake session's samples, decimated to at most max_points"""
+    try:
+        field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+        return read_series(session_id, start=start, end=end, max_points=max_points, fields=field_list)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+    except Exception as e:
+        logger.error(f"Failed to read bake session {session_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
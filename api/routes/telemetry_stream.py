@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from telemetry import get_broadcaster
+from logger import logger
+
+router = APIRouter()
+
+@router.get("/telemetry/stream")
+async def telemetry_stream(request: Request):
+    """Push live oven telemetry as Server-Sent Events"""
+    broadcaster = get_broadcaster()
+    subscriber = broadcaster.subscribe()
+    
+    async def event_stream():
+        try:
+            while not await request.is_disconnected():
+                frame = await subscriber.next_frame()
+                yield f"data: {frame}\n\n"
+        finally:
+            broadcaster.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+@router.websocket("/telemetry/ws")
+async def telemetry_websocket(websocket: WebSocket):
+    """Push live oven telemetry over a WebSocket"""
+    await websocket.accept()
+    broadcaster = get_broadcaster()
+    subscriber = broadcaster.subscribe()
+    try:
+        while True:
+            frame = await subscriber.next_frame()
+            await websocket.send_text(frame)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Telemetry WebSocket error: {e}")
+    finally:
+        broadcaster.unsubscribe(subscriber)
@@ -1,17 +1,25 @@
-from fastapi import APIRouter, HTTPException
-from hardware import get_sensor
-from logger import logger
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from hardware import read_temperature
+from logger import logger, read_logger
 
 router = APIRouter()
 
 @router.get("/temperature")
-def get_temp():
-    logger.info("Temperature reading requested")
+def get_temp(max_age_ms: Optional[float] = Query(None, ge=0, description="Maximum age of the cached sample in milliseconds; older samples trigger a fresh read")):
+    read_logger.info("Temperature reading requested")
     try:
-        sensor = get_sensor()
-        temp = sensor.temperature()
-        logger.info(f"Temperature: {temp}°C")
-        return {"temperature": temp, "unit": "celsius"}
+        snapshot = read_temperature(max_age_ms=max_age_ms)
+        read_logger.info("Temperature: %s°C", snapshot.temperature)
+        return {
+            "temperature": snapshot.temperature,
+            "unit": "celsius",
+            "timestamp": snapshot.timestamp,
+            "age_ms": round(snapshot.age_ms(), 3),
+            "faults": list(snapshot.faults),
+            "raw": snapshot.raw,
+            "rejected": snapshot.rejected
+        }
     except Exception as e:
         logger.error(f"Failed to read temperature: {e}")
         raise HTTPException(status_code=500, detail=str(e))
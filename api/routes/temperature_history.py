@@ -0,0 +1,21 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from history import get_history
+from logger import logger
+
+router = APIRouter()
+
+@router.get("/temperature/history")
+def get_temperature_history(
+    since: Optional[float] = Query(None, description="Unix timestamp of the oldest sample to include"),
+    resolution: Optional[float] = Query(None, gt=0, description="Bucket width in seconds")
+):
+    """Get buffered temperature history as min/max/mean buckets"""
+    try:
+        history = get_history()
+        data = history.query(since=since, resolution=resolution)
+        data["buffer"] = history.get_info()
+        return data
+    except Exception as e:
+        logger.error(f"Failed to query temperature history: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
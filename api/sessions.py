@@ -0,0 +1,375 @@
+# Import logger first to avoid circular imports
+from logger import logger
+import json
+import os
+import queue
+import re
+import struct
+import threading
+import time
+from datetime import datetime
+from typing import Optional, Sequence
+import numpy as np
+from config import SESSIONS_DIR, SESSION_FSYNC_INTERVAL, SESSION_MAX_POINTS
+
+# Session files are a fixed 64-byte header followed by packed SAMPLE_DTYPE records
+SESSION_MAGIC = b"OVENSESS"
+SESSION_FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sHHd44x")  # magic, format version, record size, start time (Unix seconds)
+
+SAMPLE_DTYPE = np.dtype([
+    ("t", "<u4"),            # Milliseconds since the session started
+    ("temperature", "<f4"),  # NaN when no valid reading was available
+    ("setpoint", "<f4"),
+    ("p", "<f4"),
+    ("i", "<f4"),
+    ("d", "<f4"),
+    ("output", "<f4"),
+    ("mode", "u1"),          # Index into SESSION_MODES
+    ("faults", "u1"),        # Bit per SESSION_FAULT_NAMES entry
+])
+SERIES_FIELDS = SAMPLE_DTYPE.names[1:]
+
+SESSION_MODES = ("off", "back", "front", "both")
+# MAX31865 fault bits followed by the controller's own failure reasons
+SESSION_FAULT_NAMES = (
+    "high_threshold",
+    "low_threshold",
+    "refin_low",
+    "refin_high",
+    "rtdin_low",
+    "over_under_voltage",
+    "stale",
+    "read_error",
+)
+
+SESSION_ID_PATTERN = re.compile(r"^\d{8}-\d{6}(-\d+)?$")
+
+# --- Global recorder instance ---
+_recorder = None
+_recorder_lock = threading.Lock()
+
+class SessionRecorder:
+    """Appends control-loop samples of one bake session to an on-disk file
+    
+    `record()` only queues a row, so the control loop never waits on the
+    disk. A writer thread appends queued rows in batches and fsyncs the file
+    every `fsync_interval` seconds; a JSON sidecar next to the data file holds
+    the session metadata.
+    """
+    
+    def __init__(self, directory: str = SESSIONS_DIR, fsync_interval: float = SESSION_FSYNC_INTERVAL):
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self.session_id = None
+        self.sample_count = 0
+        self._metadata = None
+        self._file = None
+        self._start_monotonic = None
+        self._queue = None  # Rows of the active session; each session gets its own
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    @property
+    def is_recording(self):
+        return self.session_id is not None
+    
+    def start(self, metadata: Optional[dict] = None) -> str:
+        """Open a new session file and start the writer thread
+        
+        Args:
+            metadata: Extra JSON-serializable fields stored in the sidecar
+        
+        Returns:
+            The new session ID
+        """
+        with self._lock:
+            if self.is_recording:
+                self._close()
+            
+            os.makedirs(self.directory, exist_ok=True)
+            started_at = time.time()
+            session_id = _new_session_id(self.directory, started_at)
+            
+            self._file = open(_data_path(session_id, self.directory), "wb")
+            self._file.write(HEADER.pack(SESSION_MAGIC, SESSION_FORMAT_VERSION, SAMPLE_DTYPE.itemsize, started_at))
+            self._file.flush()
+            
+            self._start_monotonic = time.monotonic()
+            self.sample_count = 0
+            self._metadata = {
+                "id": session_id,
+                "started_at": started_at,
+                "ended_at": None,
+                "sample_count": 0,
+                **(metadata or {})
+            }
+            _write_sidecar(session_id, self._metadata, self.directory)
+            
+            self.session_id = session_id
+            self._queue = queue.SimpleQueue()
+            self._thread = threading.Thread(target=self._run, args=(self._file, self._queue),
+                                            name="session-writer", daemon=True)
+            self._thread.start()
+        
+        logger.info(f"Bake session {session_id} recording started")
+        return session_id
+    
+    def stop(self):
+        """Flush remaining samples, close the session file and finalize its sidecar"""
+        with self._lock:
+            if not self.is_recording:
+                return
+            session_id = self.session_id
+            self._close()
+        logger.info(f"Bake session {session_id} recording stopped after {self.sample_count} samples")
+    
+    def _close(self):
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._queue = None
+        self._file.close()
+        self._file = None
+        
+        self._metadata["ended_at"] = time.time()
+        self._metadata["sample_count"] = self.sample_count
+        _write_sidecar(self.session_id, self._metadata, self.directory)
+        self.session_id = None
+    
+    def record(self, temperature: Optional[float], setpoint: Optional[float], components: Sequence[float],
+               output: float, mode: str, faults: Sequence[str] = ()):
+        """Queue one sample for the active session; does nothing when not recording
+        
+        Args:
+            temperature: Measured temperature, or None if there was no valid reading
+            setpoint: Target temperature
+            components: PID (p, i, d) terms
+            output: Controller output (0-1)
+            mode: Heater mode value ("off", "back", "front" or "both")
+            faults: Names from SESSION_FAULT_NAMES
+        """
+        p, i, d = components
+        # Under the lock so a row can't land in a session that is closing or in the next one
+        with self._lock:
+            if not self.is_recording:
+                return
+            self._queue.put((
+                int((time.monotonic() - self._start_monotonic) * 1000.0),
+                _float_or_nan(temperature),
+                _float_or_nan(setpoint),
+                p, i, d,
+                output,
+                SESSION_MODES.index(mode),
+                encode_faults(faults)
+            ))
+            self.sample_count += 1
+    
+    def _run(self, file, rows_queue: queue.SimpleQueue):
+        last_sync = time.monotonic()
+        stopping = False
+        while not stopping:
+            try:
+                rows = [rows_queue.get(timeout=self.fsync_interval)]
+            except queue.Empty:
+                rows = []
+            # Write everything that queued up meanwhile in one go
+            while True:
+                try:
+                    rows.append(rows_queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in rows:
+                stopping = True
+                rows = [row for row in rows if row is not None]
+            
+            try:
+                if rows:
+                    file.write(np.array(rows, dtype=SAMPLE_DTYPE).tobytes())
+                if stopping or time.monotonic() - last_sync >= self.fsync_interval:
+                    file.flush()
+                    os.fsync(file.fileno())
+                    last_sync = time.monotonic()
+            except Exception as e:
+                logger.error(f"Failed to write bake session samples: {e}")
+
+def encode_faults(faults: Sequence[str]) -> int:
+    """Pack fault names into the SAMPLE_DTYPE faults bitmask"""
+    bits = 0
+    for name in faults:
+        if name in SESSION_FAULT_NAMES:
+            bits |= 1 << SESSION_FAULT_NAMES.index(name)
+    return bits
+
+def decode_faults(bits: int):
+    """Unpack a faults bitmask into fault names"""
+    return [name for index, name in enumerate(SESSION_FAULT_NAMES) if bits & (1 << index)]
+
+def list_sessions(directory: str = SESSIONS_DIR):
+    """List recorded sessions, newest first"""
+    if not os.path.isdir(directory):
+        return []
+    
+    sessions = []
+    for name in os.listdir(directory):
+        session_id, ext = os.path.splitext(name)
+        if ext != ".json" or not SESSION_ID_PATTERN.match(session_id):
+            continue
+        try:
+            sessions.append(get_session(session_id, directory))
+        except Exception as e:
+            logger.warning(f"Skipping unreadable bake session {session_id}: {e}")
+    sessions.sort(key=lambda session: session["started_at"], reverse=True)
+    return sessions
+
+def get_session(session_id: str, directory: str = SESSIONS_DIR):
+    """Get a session's metadata, with the sample count taken from the data file
+    
+    Raises:
+        ValueError: If the session ID is malformed
+        FileNotFoundError: If the session doesn't exist
+    """
+    _check_session_id(session_id)
+    with open(_sidecar_path(session_id, directory)) as f:
+        metadata = json.load(f)
+    
+    size = os.path.getsize(_data_path(session_id, directory))
+    metadata["sample_count"] = _sample_count(size)
+    metadata["size_bytes"] = size
+    metadata["active"] = _recorder is not None and _recorder.session_id == session_id
+    return metadata
+
+def read_series(session_id: str, start: Optional[float] = None, end: Optional[float] = None,
+                max_points: int = SESSION_MAX_POINTS, fields: Optional[Sequence[str]] = None,
+                directory: str = SESSIONS_DIR):
+    """Read a time range of a session through a memory map
+    
+    Only the pages holding the requested range are read. Ranges with more
+    than `max_points` samples are decimated by taking every n-th sample.
+    
+    Args:
+        session_id: Session to read
+        start: Seconds since the session started of the first sample (default: beginning)
+        end: Seconds since the session started of the last sample (default: end)
+        max_points: Maximum number of samples returned
+        fields: Columns to return (default: all of SERIES_FIELDS)
+    
+    Returns:
+        dict with the session's start time, the decimation step and parallel column lists
+    
+    Raises:
+        ValueError: If the session ID or a field name is invalid, or the file is not a session file
+        FileNotFoundError: If the session doesn't exist
+    """
+    _check_session_id(session_id)
+    fields = list(fields) if fields else list(SERIES_FIELDS)
+    unknown = [field for field in fields if field not in SERIES_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    max_points = max(1, min(max_points, SESSION_MAX_POINTS))
+    
+    started_at, samples = _map_samples(session_id, directory)
+    result = {
+        "id": session_id,
+        "started_at": started_at,
+        "start": start,
+        "end": end,
+        "step": 1,
+        "sample_count": 0,
+        "series": {"time": [], **{field: [] for field in fields}}
+    }
+    if samples is None:
+        return result
+    
+    count = samples.size
+    t = samples["t"]
+    lo = 0 if start is None else int(np.searchsorted(t, max(0.0, start) * 1000.0, side="left"))
+    hi = count if end is None else int(np.searchsorted(t, max(0.0, end) * 1000.0, side="right"))
+    step = max(1, -(-(hi - lo) // max_points))
+    selected = np.array(samples[lo:hi:step])
+    del samples
+    
+    result["step"] = step
+    result["sample_count"] = int(selected.size)
+    series = result["series"]
+    series["time"] = np.round(selected["t"] / 1000.0, 3).tolist()
+    for field in fields:
+        values = selected[field]
+        if field == "mode":
+            series[field] = [SESSION_MODES[value] for value in values.tolist()]
+        elif field == "faults":
+            series[field] = [decode_faults(value) if value else [] for value in values.tolist()]
+        else:
+            series[field] = [None if value != value else round(value, 3) for value in values.tolist()]
+    return result
+
+def load_samples(session_id: str, directory: str = SESSIONS_DIR):
+    """Copy all of a session's samples into memory, e.g. for model fitting
+    
+    Returns:
+        tuple of (session start Unix time, SAMPLE_DTYPE array)
+    """
+    _check_session_id(session_id)
+    started_at, samples = _map_samples(session_id, directory)
+    if samples is None:
+        return started_at, np.zeros(0, dtype=SAMPLE_DTYPE)
+    data = np.array(samples)
+    del samples
+    return started_at, data
+
+def _map_samples(session_id: str, directory: str):
+    """Validate a session file's header and memory-map its records (None when empty)"""
+    path = _data_path(session_id, directory)
+    with open(path, "rb") as f:
+        magic, version, record_size, started_at = HEADER.unpack(f.read(HEADER.size))
+    if magic != SESSION_MAGIC or version != SESSION_FORMAT_VERSION or record_size != SAMPLE_DTYPE.itemsize:
+        raise ValueError(f"{path} is not a version {SESSION_FORMAT_VERSION} session file")
+    
+    # The active session may end in a partially written record, which is left out
+    count = _sample_count(os.path.getsize(path))
+    if count == 0:
+        return started_at, None
+    return started_at, np.memmap(path, dtype=SAMPLE_DTYPE, mode="r", offset=HEADER.size, shape=(count,))
+
+def _sample_count(size: int) -> int:
+    return max(0, (size - HEADER.size) // SAMPLE_DTYPE.itemsize)
+
+def _float_or_nan(value: Optional[float]) -> float:
+    return float("nan") if value is None else value
+
+def _check_session_id(session_id: str):
+    if not SESSION_ID_PATTERN.match(session_id):
+        raise ValueError(f"Invalid session ID: {session_id}")
+
+def _new_session_id(directory: str, started_at: float) -> str:
+    base = datetime.fromtimestamp(started_at).strftime("%Y%m%d-%H%M%S")
+    session_id = base
+    suffix = 2
+    while os.path.exists(_data_path(session_id, directory)):
+        session_id = f"{base}-{suffix}"
+        suffix += 1
+    return session_id
+
+def _data_path(session_id: str, directory: str) -> str:
+    return os.path.join(directory, f"{session_id}.bin")
+
+def _sidecar_path(session_id: str, directory: str) -> str:
+    return os.path.join(directory, f"{session_id}.json")
+
+def _write_sidecar(session_id: str, metadata: dict, directory: str):
+    # Write then rename so a crash never leaves a truncated sidecar
+    path = _sidecar_path(session_id, directory)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(tmp_path, path)
+
+def get_session_recorder() -> SessionRecorder:
+    """Get global bake session recorder instance"""
+    global _recorder
+    
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = SessionRecorder(directory=SESSIONS_DIR, fsync_interval=SESSION_FSYNC_INTERVAL)
+    
+    return _recorder
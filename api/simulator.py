@@ -0,0 +1,409 @@
+# Import logger first to avoid circular imports
+from logger import logger
+import math
+import random
+import time
+import threading
+from contextlib import contextmanager
+from enum import Enum
+from types import SimpleNamespace
+from typing import Dict, NamedTuple, Optional
+import numpy as np
+from config import (
+    BACK_HEATER_GPIO, FRONT_HEATER_GPIO,
+    SIMULATOR_AMBIENT, SIMULATOR_TIME_CONSTANT, SIMULATOR_ELEMENT_LAG, SIMULATOR_BACK_GAIN, SIMULATOR_FRONT_GAIN,
+    SIMULATOR_NOISE, SIMULATOR_GLITCH_RATE, SIMULATOR_FAULT_RATE
+)
+
+# Simulated drop-ins for the libraries hardware.py and camera.py use on the Pi
+# (board, busio, digitalio, adafruit_max31865 and picamera2). With
+# HARDWARE_BACKEND=simulated those modules import these instead, so the whole
+# API, control loop and camera stream run against a simulated oven.
+
+# Longest integration step of the oven model in seconds
+SIMULATION_STEP = 0.05
+
+# Fault flags in the order adafruit_max31865's `fault` property returns them
+FAULT_NAMES = (
+    "high_threshold",
+    "low_threshold",
+    "refin_low",
+    "refin_high",
+    "rtdin_low",
+    "over_under_voltage",
+)
+
+# MAX31865 RTD data register and the conversion time of a one-shot read
+RTD_MSB_REGISTER = 0x01
+ONE_SHOT_TIME = 0.075
+# Callendar-Van Dusen coefficients for platinum RTDs
+RTD_A = 3.9083e-3
+RTD_B = -5.775e-7
+
+# --- Global oven instance ---
+_oven = None
+_oven_lock = threading.Lock()
+
+class SimulatedOven:
+    """Thermal model of the oven driven by the simulated heater GPIOs
+    
+    Each element warms up with a first-order lag (`element_lag`), and the oven
+    heats toward `ambient + Σ gain · element` with time constant `tau`. The
+    model advances lazily whenever it is read or an element switches.
+    """
+    
+    def __init__(self, ambient: float = SIMULATOR_AMBIENT, tau: float = SIMULATOR_TIME_CONSTANT,
+                 element_lag: float = SIMULATOR_ELEMENT_LAG,
+                 gains: Optional[Dict[int, float]] = None):
+        self.ambient = ambient
+        self.tau = tau
+        self.element_lag = element_lag
+        self.gains = dict(gains) if gains is not None else {
+            BACK_HEATER_GPIO: SIMULATOR_BACK_GAIN,
+            FRONT_HEATER_GPIO: SIMULATOR_FRONT_GAIN,
+        }
+        self.temperature = ambient
+        self.switch_count = 0
+        self._elements = {gpio_num: False for gpio_num in self.gains}
+        self._heat = {gpio_num: 0.0 for gpio_num in self.gains}  # 0-1 warm-up state of each element
+        self._time = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _advance(self, now: float):
+        elapsed = now - self._time
+        self._time = now
+        if elapsed <= 0:
+            return
+        if elapsed > 10 * (self.tau + self.element_lag):
+            # Long enough to have settled, jump straight to steady state
+            for gpio_num, on in self._elements.items():
+                self._heat[gpio_num] = 1.0 if on else 0.0
+            self.temperature = self.ambient + sum(self.gains[g] * self._heat[g] for g in self.gains)
+            return
+        
+        steps = max(1, math.ceil(elapsed / SIMULATION_STEP))
+        dt = elapsed / steps
+        for _ in range(steps):
+            drive = 0.0
+            for gpio_num, on in self._elements.items():
+                heat = self._heat[gpio_num]
+                heat += dt * ((1.0 if on else 0.0) - heat) / self.element_lag
+                self._heat[gpio_num] = heat
+                drive += self.gains[gpio_num] * heat
+            self.temperature += dt * (self.ambient + drive - self.temperature) / self.tau
+    
+    def set_element(self, gpio_num: int, on: bool):
+        """Switch a heater element; other GPIOs are ignored"""
+        if gpio_num not in self._elements:
+            return
+        with self._lock:
+            self._advance(time.monotonic())
+            if self._elements[gpio_num] != on:
+                self.switch_count += 1
+            self._elements[gpio_num] = on
+    
+    def read_temperature(self) -> float:
+        """Current oven temperature in °C"""
+        with self._lock:
+            self._advance(time.monotonic())
+            return self.temperature
+    
+    def set_temperature(self, temperature: float):
+        """Jump the oven (and cool the elements) to a temperature, e.g. to start a test warm"""
+        with self._lock:
+            self._advance(time.monotonic())
+            self.temperature = temperature
+            for gpio_num in self._heat:
+                self._heat[gpio_num] = 0.0
+    
+    def get_state(self):
+        with self._lock:
+            self._advance(time.monotonic())
+            return {
+                "temperature": self.temperature,
+                "ambient": self.ambient,
+                "elements": {gpio_num: on for gpio_num, on in self._elements.items()},
+                "element_heat": dict(self._heat),
+                "switch_count": self.switch_count
+            }
+
+def get_simulated_oven() -> SimulatedOven:
+    """Get global simulated oven instance"""
+    global _oven
+    
+    with _oven_lock:
+        if _oven is None:
+            _oven = SimulatedOven()
+    
+    return _oven
+
+# --- board / busio / digitalio ---
+
+class Pin(NamedTuple):
+    id: object
+    
+    def __repr__(self):
+        return f"board.{self.id if isinstance(self.id, str) else f'D{self.id}'}"
+
+board = SimpleNamespace(
+    SCLK=Pin("SCLK"), MOSI=Pin("MOSI"), MISO=Pin("MISO"),
+    **{f"D{number}": Pin(number) for number in range(28)}
+)
+
+class SPI:
+    def __init__(self, clock, MOSI=None, MISO=None):
+        self.clock = clock
+    
+    def deinit(self):
+        pass
+
+busio = SimpleNamespace(SPI=SPI)
+
+class Direction(Enum):
+    INPUT = "input"
+    OUTPUT = "output"
+
+class DigitalInOut:
+    """GPIO line; writes to a heater GPIO switch the simulated element"""
+    
+    def __init__(self, pin: Pin):
+        self.pin = pin
+        self.direction = Direction.INPUT
+        self._value = False
+    
+    @property
+    def value(self):
+        return self._value
+    
+    @value.setter
+    def value(self, value):
+        self._value = bool(value)
+        if self.direction == Direction.OUTPUT:
+            get_simulated_oven().set_element(self.pin.id, self._value)
+    
+    def deinit(self):
+        if self.direction == Direction.OUTPUT and self._value:
+            get_simulated_oven().set_element(self.pin.id, False)
+        self._value = False
+
+digitalio = SimpleNamespace(Direction=Direction, DigitalInOut=DigitalInOut)
+
+# --- adafruit_max31865 ---
+
+class MAX31865:
+    """MAX31865 RTD amplifier reading the simulated oven
+    
+    Each conversion adds gaussian noise (`noise` °C). With probability
+    `glitch_rate` a conversion is a wild spike, and with probability
+    `fault_rate` it latches a random fault flag. Faults can also be injected
+    with `inject_fault`; while one is held, conversions read as an open RTD.
+    """
+    
+    def __init__(self, spi, cs, rtd_nominal=100, ref_resistor=430.0, wires=2,
+                 noise: float = SIMULATOR_NOISE, glitch_rate: float = SIMULATOR_GLITCH_RATE,
+                 fault_rate: float = SIMULATOR_FAULT_RATE):
+        self.rtd_nominal = rtd_nominal
+        self.ref_resistor = ref_resistor
+        self.wires = wires
+        self.noise = noise
+        self.glitch_rate = glitch_rate
+        self.fault_rate = fault_rate
+        self.bias = False
+        self.auto_convert = False
+        self._latched = set()
+        self._held = {}  # Injected fault name -> monotonic expiry (None holds it until cleared)
+    
+    def inject_fault(self, name: str, duration: Optional[float] = None):
+        """Hold a fault flag for `duration` seconds, or until `release_fault` if None"""
+        if name not in FAULT_NAMES:
+            raise ValueError(f"Unknown MAX31865 fault: {name}. Available faults: {list(FAULT_NAMES)}")
+        self._held[name] = None if duration is None else time.monotonic() + duration
+        self._latched.add(name)
+    
+    def release_fault(self, name: str):
+        self._held.pop(name, None)
+    
+    def _active_holds(self):
+        now = time.monotonic()
+        for name, expiry in list(self._held.items()):
+            if expiry is not None and now >= expiry:
+                del self._held[name]
+        return self._held
+    
+    def _convert(self) -> int:
+        """One conversion as the 15-bit RTD/reference ratio"""
+        if self._active_holds():
+            return 0x7FFF
+        if self.fault_rate and random.random() < self.fault_rate:
+            self._latched.add(random.choice(FAULT_NAMES))
+        
+        temperature = get_simulated_oven().read_temperature()
+        if self.noise:
+            temperature += random.gauss(0.0, self.noise)
+        if self.glitch_rate and random.random() < self.glitch_rate:
+            temperature += random.choice((-1, 1)) * random.uniform(50.0, 500.0)
+        
+        resistance = self.rtd_nominal * (1.0 + RTD_A * temperature + RTD_B * temperature * temperature)
+        return max(0, min(0x7FFF, int(resistance / self.ref_resistor * 32768)))
+    
+    def _read_u16(self, address: int) -> int:
+        if address != RTD_MSB_REGISTER:
+            raise ValueError(f"Register 0x{address:02x} is not simulated")
+        return (self._convert() << 1) | (1 if self._latched else 0)
+    
+    def read_rtd(self) -> int:
+        if not self.auto_convert:
+            time.sleep(ONE_SHOT_TIME)
+        return self._convert()
+    
+    @property
+    def resistance(self) -> float:
+        return self.read_rtd() * self.ref_resistor / 32768
+    
+    @property
+    def temperature(self) -> float:
+        resistance = self.resistance
+        z2 = RTD_A * RTD_A - (4 * RTD_B)
+        z3 = (4 * RTD_B) / self.rtd_nominal
+        return (math.sqrt(max(0.0, z2 + z3 * resistance)) - RTD_A) / (2 * RTD_B)
+    
+    @property
+    def fault(self):
+        self._latched.update(self._active_holds())
+        return tuple(name in self._latched for name in FAULT_NAMES)
+    
+    def clear_faults(self):
+        self._latched = set(self._active_holds())
+
+adafruit_max31865 = SimpleNamespace(MAX31865=MAX31865)
+
+# --- picamera2 ---
+
+class _SimulatedRequest:
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.arrays = arrays
+    
+    def make_array(self, name: str) -> np.ndarray:
+        return self.arrays[name]
+    
+    def release(self):
+        pass
+
+class Picamera2:
+    """Camera producing synthetic frames at the configured frame rate
+    
+    Frames are a fixed gradient with a bar that moves one step per frame, tinted
+    by the simulated oven temperature. Streams use the same pixel layouts as
+    the Pi camera (RGB888 as BGR, YUV420 as a (height * 3 / 2, width) plane
+    buffer), so the JPEG encoders run exactly as on the Pi.
+    """
+    
+    def __init__(self, camera_num: int = 0):
+        self.camera_num = camera_num
+        self.started = False
+        self.frame_count = 0
+        self._config = None
+        self._bases = {}
+        self._next_frame = 0.0
+        self._lock = threading.Lock()
+        self.configure(self.create_video_configuration())
+    
+    def create_video_configuration(self, main=None, lores=None, controls=None, **kwargs):
+        return {
+            "main": {"size": (640, 480), "format": "RGB888", **(main or {})},
+            "lores": dict(lores) if lores else None,
+            "controls": {"FrameRate": 30, **(controls or {})}
+        }
+    
+    create_still_configuration = create_video_configuration
+    create_preview_configuration = create_video_configuration
+    
+    def configure(self, config):
+        self._config = config
+        self._bases = {
+            name: self._make_base(stream["format"], tuple(stream["size"]))
+            for name, stream in (("main", config["main"]), ("lores", config["lores"]))
+            if stream
+        }
+    
+    @staticmethod
+    def _make_base(pixel_format: str, size):
+        width, height = size
+        gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :] * np.ones((height, 1), dtype=np.float32)
+        if pixel_format == "YUV420":
+            base = np.full((height * 3 // 2, width), 128, dtype=np.uint8)
+            base[:height] = gradient.astype(np.uint8)
+            return base
+        return np.repeat(gradient.astype(np.uint8)[:, :, None], 3, axis=2)
+    
+    def start(self):
+        self.started = True
+        self._next_frame = time.monotonic()
+    
+    def stop(self):
+        self.started = False
+    
+    def close(self):
+        self.started = False
+    
+    def start_encoder(self, *args, **kwargs):
+        raise Exception("Hardware encoders are not simulated")
+    
+    def stop_encoder(self, *args, **kwargs):
+        pass
+    
+    def _capture(self, names) -> Dict[str, np.ndarray]:
+        if not self.started:
+            raise Exception("Camera is not started")
+        with self._lock:
+            # Block until the next frame is due, like the real sensor
+            interval = 1.0 / float(self._config["controls"]["FrameRate"])
+            delay = self._next_frame - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_frame = max(self._next_frame + interval, time.monotonic())
+            self.frame_count += 1
+            index = self.frame_count
+        
+        heat = min(1.0, max(0.0, (get_simulated_oven().read_temperature() - SIMULATOR_AMBIENT) / 250.0))
+        arrays = {}
+        for name in names:
+            base = self._bases[name]
+            frame = base.copy()
+            width = frame.shape[1]
+            bar = (index * 8) % width
+            if frame.ndim == 3:
+                frame[:, bar:bar + 8] = 255
+                frame[:, :, 2] = np.maximum(frame[:, :, 2], np.uint8(heat * 255))  # Red channel of BGR
+            else:
+                height = frame.shape[0] * 2 // 3
+                frame[:height, bar:bar + 8] = 255
+            arrays[name] = frame
+        return arrays
+    
+    def capture_array(self, name: str = "main") -> np.ndarray:
+        return self._capture([name])[name]
+    
+    def capture_arrays(self, names=("main",)):
+        arrays = self._capture(names)
+        return [arrays[name] for name in names], {"FrameCount": self.frame_count}
+    
+    @contextmanager
+    def captured_request(self):
+        request = _SimulatedRequest(self._capture([name for name in self._bases]))
+        try:
+            yield request
+        finally:
+            request.release()
+
+class MappedArray:
+    def __init__(self, request: _SimulatedRequest, stream: str):
+        self.array = request.make_array(stream)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        pass
+
+logger.info("Simulated hardware backend loaded")
@@ -0,0 +1,216 @@
+# Import logger first to avoid circular imports
+from logger import logger
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Sequence
+from config import STARTUP_WARM_CAMERA
+from hardware import (
+    HARDWARE_AVAILABLE, load_hardware_libraries, get_sensor, get_sampler, get_gpio_bank
+)
+from hardware_actor import Priority, get_hardware_actor
+from camera import CAMERA_AVAILABLE, get_camera
+
+# --- Component states ---
+PENDING = "pending"
+RUNNING = "running"
+READY = "ready"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+# --- Global startup instance ---
+_startup = None
+_startup_lock = threading.Lock()
+
+def _process_started_at() -> float:
+    """Monotonic time at which this process started, so timings include interpreter and import time"""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 (starttime) follows the parenthesised command name, which may contain spaces
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        age = uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+        return time.monotonic() - max(0.0, age)
+    except Exception:
+        return time.monotonic()
+
+class Component:
+    """Init progress and timing of one component warmed up at startup"""
+    
+    def __init__(self, name: str, init: Optional[Callable[[], None]], required: bool,
+                 depends_on: Sequence[str] = (), skip_reason: Optional[str] = None):
+        self.name = name
+        self.init = init
+        self.required = required
+        self.depends_on = tuple(depends_on)
+        self.state = SKIPPED if skip_reason else PENDING
+        self.error = skip_reason
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+        if skip_reason:
+            self.done.set()
+    
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return round((end - self.started_at) * 1000, 1)
+    
+    def to_dict(self, origin: float):
+        """Describe the component, with times in milliseconds since `origin`"""
+        return {
+            "state": self.state,
+            "required": self.required,
+            "depends_on": list(self.depends_on),
+            "started_ms": round((self.started_at - origin) * 1000, 1) if self.started_at is not None else None,
+            "duration_ms": self.duration_ms,
+            "error": self.error
+        }
+
+class Startup:
+    """Warms up the hardware on background threads after the server starts
+    
+    Importing the hardware libraries and opening the sensor and camera used to
+    happen at import time or on the first request. Here each component runs
+    on its own thread as soon as the ones it depends on are ready, so the
+    server answers /livez immediately and /readyz reports progress until
+    every required component is up.
+    """
+    
+    def __init__(self):
+        self.created_at = _process_started_at()
+        self.serving_at = None
+        self.components: Dict[str, Component] = {}
+        self._threads = []
+    
+    def add_component(self, name: str, init: Optional[Callable[[], None]], required: bool = True,
+                      depends_on: Sequence[str] = (), skip_reason: Optional[str] = None):
+        """Register a component to warm up
+        
+        Args:
+            name: Component name reported by /readyz
+            init: Blocking callable that initializes the component, raising on failure
+            required: Whether the API is ready only once this component is
+            depends_on: Components that must be ready before this one starts
+            skip_reason: If set, the component is not initialized and reported as skipped
+        """
+        for dependency in depends_on:
+            if dependency not in self.components:
+                raise ValueError(f"Unknown dependency '{dependency}' for component '{name}'")
+        self.components[name] = Component(name, init, required, depends_on, skip_reason)
+    
+    def start(self):
+        """Start warming up every pending component in the background"""
+        if self.serving_at is not None:
+            return
+        self.serving_at = time.monotonic()
+        logger.info(f"Server up {(self.serving_at - self.created_at) * 1000:.0f} ms after process start, warming up hardware")
+        for component in self.components.values():
+            if component.state != PENDING:
+                continue
+            thread = threading.Thread(target=self._run, args=(component,),
+                                      name=f"warmup-{component.name}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+    
+    def _run(self, component: Component):
+        try:
+            for dependency in component.depends_on:
+                self.components[dependency].done.wait()
+                if self.components[dependency].state != READY:
+                    component.state = FAILED
+                    component.error = f"Dependency '{dependency}' is {self.components[dependency].state}"
+                    logger.error(f"Skipping warm-up of {component.name}: {component.error}")
+                    return
+            
+            component.started_at = time.monotonic()
+            component.state = RUNNING
+            try:
+                component.init()
+            except Exception as e:
+                component.finished_at = time.monotonic()
+                component.error = str(e)
+                component.state = FAILED
+                logger.error(f"Warm-up of {component.name} failed after {component.duration_ms:.0f} ms: {e}")
+                return
+            component.finished_at = time.monotonic()
+            component.state = READY
+            logger.info(f"Warmed up {component.name} in {component.duration_ms:.0f} ms")
+        finally:
+            component.done.set()
+    
+    @property
+    def status(self) -> str:
+        """Overall state: ready, failed if a required component failed, else starting"""
+        required = [c for c in self.components.values() if c.required]
+        if any(c.state == FAILED for c in required):
+            return FAILED
+        if self.serving_at is not None and all(c.state in (READY, SKIPPED) for c in required):
+            return READY
+        return "starting"
+    
+    @property
+    def is_ready(self) -> bool:
+        return self.status == READY
+    
+    def get_status(self):
+        """Readiness with per-component progress, times in milliseconds since the process started"""
+        finished = [c.finished_at for c in self.components.values() if c.required and c.finished_at is not None]
+        ready_ms = None
+        if self.is_ready:
+            ready_at = max(finished) if finished else self.serving_at
+            ready_ms = round((ready_at - self.created_at) * 1000, 1)
+        return {
+            "status": self.status,
+            "uptime": time.monotonic() - self.created_at,
+            "serving_ms": round((self.serving_at - self.created_at) * 1000, 1) if self.serving_at is not None else None,
+            "ready_ms": ready_ms,
+            "components": {name: c.to_dict(self.created_at) for name, c in self.components.items()}
+        }
+
+def _warm_sensor():
+    """Open SPI and the MAX31865, take a first sample and start the sampler"""
+    sampler = get_sampler()
+    try:
+        get_hardware_actor().call(Priority.READ, get_sensor)
+        snapshot = sampler.sample()
+    finally:
+        # Keep sampling even if the first read failed so the sensor can recover
+        sampler.start()
+    if snapshot.error is not None:
+        raise Exception(snapshot.error)
+
+def _warm_gpio():
+    """Claim the heater GPIOs, driving both elements off"""
+    get_gpio_bank().open()
+
+def _warm_camera():
+    """Import Picamera2 and open and configure the camera without starting it"""
+    get_camera()
+
+def get_startup() -> Startup:
+    """Get global startup instance"""
+    global _startup
+    
+    with _startup_lock:
+        if _startup is None:
+            _startup = Startup()
+            hardware_skip = None if HARDWARE_AVAILABLE else "Hardware libraries not available"
+            _startup.add_component("hardware_libraries", load_hardware_libraries, skip_reason=hardware_skip)
+            _startup.add_component("sensor", _warm_sensor, depends_on=("hardware_libraries",),
+                                   skip_reason=hardware_skip)
+            _startup.add_component("gpio", _warm_gpio, depends_on=("hardware_libraries",),
+                                   skip_reason=hardware_skip)
+            
+            # The API works without a camera, so it never holds back readiness
+            camera_skip = None
+            if not CAMERA_AVAILABLE:
+                camera_skip = "Picamera2 not available"
+            elif not STARTUP_WARM_CAMERA:
+                camera_skip = "Disabled by STARTUP_WARM_CAMERA, opened on first use"
+            _startup.add_component("camera", _warm_camera, required=False, skip_reason=camera_skip)
+    
+    return _startup
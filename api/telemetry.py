@@ -0,0 +1,161 @@
+# Import logger first to avoid circular imports
+from logger import logger
+import asyncio
+import json
+import time
+from typing import Optional
+from hardware import get_sampler, get_output
+from controller import HeaterMode, get_controller
+from camera import get_camera_info
+from recipes import RecipeState, get_recipe_executor
+from config import TELEMETRY_INTERVAL, BACK_HEATER_GPIO, FRONT_HEATER_GPIO
+
+# --- Global broadcaster instance ---
+_broadcaster = None
+
+class TelemetrySubscriber:
+    """Per-client mailbox holding only the newest undelivered frame
+    
+    If the client hasn't consumed the previous frame when a new one arrives,
+    the old one is replaced and counted as dropped, so a slow client costs a
+    single frame of memory no matter how far behind it falls.
+    """
+    
+    def __init__(self):
+        self._frame = None
+        self._event = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+    
+    def offer(self, frame: str):
+        if self._frame is not None:
+            self.dropped += 1
+        self._frame = frame
+        self._event.set()
+    
+    async def next_frame(self) -> str:
+        await self._event.wait()
+        self._event.clear()
+        frame, self._frame = self._frame, None
+        self.sent += 1
+        return frame
+
+class TelemetryBroadcaster:
+    """Builds one telemetry frame per interval and fans it out to every subscriber
+    
+    Frames are assembled from cached state only (sensor snapshot, controller
+    status, GPIO state, camera info) and serialized once, so the cost at the
+    sensor and per frame is independent of the number of connected dashboards.
+    """
+    
+    def __init__(self, interval: float = TELEMETRY_INTERVAL):
+        self.interval = interval
+        self.sequence = 0
+        self._subscribers = set()
+        self._task = None
+    
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+    
+    def subscribe(self) -> TelemetrySubscriber:
+        subscriber = TelemetrySubscriber()
+        self._subscribers.add(subscriber)
+        logger.info(f"Telemetry subscriber added ({len(self._subscribers)} active)")
+        return subscriber
+    
+    def unsubscribe(self, subscriber: TelemetrySubscriber):
+        self._subscribers.discard(subscriber)
+        logger.info(f"Telemetry subscriber removed after {subscriber.sent} frames, "
+                    f"{subscriber.dropped} dropped ({len(self._subscribers)} active)")
+    
+    def start(self):
+        """Start the producer task on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"Telemetry broadcaster started at {1.0 / self.interval:.1f} Hz")
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            if self._subscribers:
+                try:
+                    frame = json.dumps(self.build_frame())
+                    for subscriber in list(self._subscribers):
+                        subscriber.offer(frame)
+                except Exception as e:
+                    logger.error(f"Failed to build telemetry frame: {e}")
+            
+            next_tick += self.interval
+            delay = next_tick - loop.time()
+            if delay < 0:
+                next_tick = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+    
+    def build_frame(self):
+        """Assemble the current oven state without touching the sensor"""
+        self.sequence += 1
+        snapshot = get_sampler().get_snapshot()
+        controller = get_controller()
+        
+        return {
+            "sequence": self.sequence,
+            "timestamp": time.time(),
+            "sensor": snapshot.to_dict() if snapshot is not None else None,
+            "control": {
+                "running": controller.is_running,
+                "target_temperature": controller.target_temperature,
+                "setpoint": controller.setpoint,
+                "pid_output": controller.last_output,
+                "mode": controller.mode.value
+            },
+            "recipe": _recipe_progress(),
+            "heater_mode": _heater_mode(),
+            "camera": get_camera_info()
+        }
+
+def _recipe_progress() -> Optional[dict]:
+    executor = get_recipe_executor()
+    if executor.state == RecipeState.IDLE:
+        return None
+    return {
+        "state": executor.state.value,
+        "name": executor.name,
+        "phase_index": executor.phase_index,
+        "total_phases": len(executor.phases),
+        "setpoint": executor.setpoint
+    }
+
+def _heater_mode() -> Optional[str]:
+    try:
+        back = get_output(BACK_HEATER_GPIO)
+        front = get_output(FRONT_HEATER_GPIO)
+    except Exception:
+        return None
+    if back and front:
+        return HeaterMode.BOTH.value
+    if back:
+        return HeaterMode.BACK.value
+    if front:
+        return HeaterMode.FRONT.value
+    return HeaterMode.OFF.value
+
+def get_broadcaster() -> TelemetryBroadcaster:
+    """Get global telemetry broadcaster instance"""
+    global _broadcaster
+    
+    if _broadcaster is None:
+        _broadcaster = TelemetryBroadcaster(interval=TELEMETRY_INTERVAL)
+    
+    return _broadcaster
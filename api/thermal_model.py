@@ -0,0 +1,267 @@
+# Import logger first to avoid circular imports
+from logger import logger
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from sessions import SESSION_MODES, get_session, list_sessions, load_samples
+from config import THERMAL_MODEL_FILE, THERMAL_MODEL_MAX_SESSIONS, THERMAL_MODEL_MAX_DEAD_TIME
+
+# Heater modes that get their own gain in the model
+HEATING_MODES = ("back", "front", "both")
+# Minimum number of samples with a mode's elements on before its gain is trusted
+MIN_MODE_SAMPLES = 30
+# Samples further apart than this multiple of the typical interval split a recording into segments
+GAP_FACTOR = 5.0
+
+# --- Cached model ---
+_model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+
+class ThermalModel:
+    """First-order-plus-dead-time (FOPDT) oven model
+    
+        tau · dT/dt = -(T - ambient) + gain[mode] · u(t - dead_time)
+    
+    `u` is the 0-1 controller output applied to the elements selected by
+    `mode`, and `gain[mode]` is how far above ambient the oven would settle at
+    full power with those elements. Heat loss (`tau`, `ambient`) is shared
+    between modes.
+    """
+    
+    def __init__(self, tau: float, ambient: float, dead_time: float, gains: Dict[str, Optional[float]],
+                 rmse: Optional[float] = None, samples: int = 0, sessions: Sequence[str] = (),
+                 fitted_at: Optional[float] = None):
+        self.tau = tau
+        self.ambient = ambient
+        self.dead_time = dead_time
+        self.gains = dict(gains)
+        self.rmse = rmse
+        self.samples = samples
+        self.sessions = list(sessions)
+        self.fitted_at = fitted_at
+    
+    def max_temperature(self, mode: str) -> Optional[float]:
+        """Steady-state temperature at full power with the mode's elements"""
+        gain = self.gains.get(mode)
+        return None if gain is None else self.ambient + gain
+    
+    def steady_state_duty(self, target: float, mode: str) -> Optional[float]:
+        """Output that holds the oven at the target with the mode's elements"""
+        gain = self.gains.get(mode)
+        if not gain:
+            return None
+        return min(1.0, max(0.0, (target - self.ambient) / gain))
+    
+    def fastest_mode(self, candidates: Sequence[str] = HEATING_MODES) -> Optional[str]:
+        """Learned mode with the highest gain, i.e. the fastest heat-up"""
+        learned = [mode for mode in candidates if self.gains.get(mode)]
+        if not learned:
+            return None
+        return max(learned, key=lambda mode: self.gains[mode])
+    
+    def predict_peak(self, temperature: float, pending: Sequence, dt: float) -> float:
+        """Highest temperature reached if power were cut now
+        
+        Args:
+            temperature: Current temperature
+            pending: (mode, output) pairs applied within the last dead_time,
+                oldest first; they have not affected the temperature yet
+            dt: Seconds between pending entries
+        """
+        peak = temperature
+        for mode, output in pending:
+            gain = self.gains.get(mode) or 0.0
+            temperature += dt * (gain * output - (temperature - self.ambient)) / self.tau
+            peak = max(peak, temperature)
+        # With no input left the temperature only decays toward ambient
+        return peak
+    
+    def to_dict(self):
+        return {
+            "tau": self.tau,
+            "ambient": self.ambient,
+            "dead_time": self.dead_time,
+            "gains": self.gains,
+            "max_temperature": {mode: self.max_temperature(mode) for mode in HEATING_MODES},
+            "rmse": self.rmse,
+            "samples": self.samples,
+            "sessions": self.sessions,
+            "fitted_at": self.fitted_at
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            tau=data["tau"],
+            ambient=data["ambient"],
+            dead_time=data["dead_time"],
+            gains=data["gains"],
+            rmse=data.get("rmse"),
+            samples=data.get("samples", 0),
+            sessions=data.get("sessions", ()),
+            fitted_at=data.get("fitted_at")
+        )
+
+def fit_thermal_model(session_ids: Optional[List[str]] = None,
+                      max_dead_time: float = THERMAL_MODEL_MAX_DEAD_TIME) -> ThermalModel:
+    """Fit a ThermalModel to recorded bake sessions with least squares
+    
+    The model is discretized per sample as
+        dT/dt = a·T + c + Σ b_mode·u_mode(t - dead_time)
+    and fitted with numpy.linalg.lstsq for every candidate dead time up to
+    `max_dead_time`; the dead time with the smallest residual wins. Then
+    tau = -1/a, ambient = -c/a and gain = b·tau.
+    
+    Sessions are recorded at different rates (autotune samples faster than
+    the control loop), so candidate dead times step by the shortest session
+    sample interval and each sample looks up the input applied that many
+    seconds earlier in its own segment.
+    
+    Args:
+        session_ids: Sessions to learn from (default: the THERMAL_MODEL_MAX_SESSIONS most recent finished ones)
+    
+    Raises:
+        ValueError: If there is not enough usable data or the fit is not physical
+    """
+    if not session_ids:
+        session_ids = [session["id"] for session in list_sessions() if not session["active"]]
+        session_ids = session_ids[:THERMAL_MODEL_MAX_SESSIONS]
+    if not session_ids:
+        raise ValueError("No recorded sessions to learn from")
+    
+    segments = []
+    intervals = []
+    for session_id in session_ids:
+        _, samples = load_samples(session_id)
+        session_segments = _split_segments(samples)
+        if session_segments:
+            segments.extend(session_segments)
+            intervals.append(_sample_interval(session_id, session_segments))
+    if not segments:
+        raise ValueError("Sessions contain no usable temperature data")
+    
+    step = min(intervals)
+    best = None
+    for dead_time in step * np.arange(int(max_dead_time / step) + 1):
+        fit = _fit_with_delay(segments, dead_time)
+        if fit is not None and (best is None or fit[1] < best[1]):
+            best = (dead_time, fit[1], fit[0], fit[2], fit[3])
+    if best is None:
+        raise ValueError("Not enough samples to fit a thermal model")
+    
+    dead_time, rmse, coefficients, samples, mode_samples = best
+    a, c = coefficients[0], coefficients[1]
+    if a >= 0:
+        raise ValueError("Recorded data shows no heat loss; record a heat-up followed by a cool-down")
+    
+    tau = -1.0 / a
+    gains = {
+        mode: (float(coefficients[2 + index] * tau) if mode_samples[index] >= MIN_MODE_SAMPLES else None)
+        for index, mode in enumerate(HEATING_MODES)
+    }
+    model = ThermalModel(
+        tau=float(tau),
+        ambient=float(-c / a),
+        dead_time=float(dead_time),
+        gains=gains,
+        rmse=float(rmse),
+        samples=samples,
+        sessions=session_ids,
+        fitted_at=time.time()
+    )
+    logger.info(f"Thermal model fitted on {samples} samples: tau={model.tau:.0f}s, ambient={model.ambient:.1f}°C, "
+                f"dead_time={model.dead_time:.0f}s, gains={gains}")
+    return model
+
+def _split_segments(samples):
+    """Split a session into contiguous runs of valid readings as (t seconds, T, per-mode output) arrays"""
+    valid = ~np.isnan(samples["temperature"])
+    samples = samples[valid]
+    if samples.size < 3:
+        return []
+    
+    t = samples["t"].astype(np.float64) / 1000.0
+    temperature = samples["temperature"].astype(np.float64)
+    output = np.nan_to_num(samples["output"].astype(np.float64))
+    modes = np.array(SESSION_MODES)[samples["mode"]]
+    inputs = np.stack([np.where(modes == mode, output, 0.0) for mode in HEATING_MODES], axis=1)
+    
+    dt = np.diff(t)
+    breaks = np.flatnonzero(dt > GAP_FACTOR * np.median(dt)) + 1
+    return [
+        (t[lo:hi], temperature[lo:hi], inputs[lo:hi])
+        for lo, hi in zip(np.concatenate(([0], breaks)), np.concatenate((breaks, [t.size])))
+        if hi - lo >= 3
+    ]
+
+def _sample_interval(session_id: str, segments) -> float:
+    """Seconds between a session's samples, as recorded in its metadata or else measured"""
+    try:
+        interval = get_session(session_id).get("sample_interval")
+    except Exception as e:
+        logger.warning(f"Failed to read metadata of bake session {session_id}: {e}")
+        interval = None
+    if interval:
+        return float(interval)
+    return float(np.median(np.concatenate([np.diff(t) for t, _, _ in segments])))
+
+def _fit_with_delay(segments, dead_time: float):
+    rows = []
+    targets = []
+    for t, temperature, inputs in segments:
+        k = np.arange(t.size - 1)
+        # Index of the input in effect dead_time seconds before each sample; outputs hold until the next sample
+        delayed = np.searchsorted(t, t[k] - dead_time, side="right") - 1
+        k, delayed = k[delayed >= 0], delayed[delayed >= 0]
+        if k.size == 0:
+            continue
+        slope = (temperature[k + 1] - temperature[k]) / (t[k + 1] - t[k])
+        rows.append(np.column_stack((temperature[k], np.ones(k.size), inputs[delayed])))
+        targets.append(slope)
+    if not rows:
+        return None
+    
+    X = np.concatenate(rows)
+    y = np.concatenate(targets)
+    if X.shape[0] < X.shape[1] * 10:
+        return None
+    coefficients, _, _, _ = np.linalg.lstsq(X, y, rcond=None)
+    rmse = math.sqrt(float(np.mean((X @ coefficients - y) ** 2)))
+    mode_samples = np.count_nonzero(X[:, 2:] > 0, axis=0)
+    return coefficients, rmse, int(X.shape[0]), mode_samples.tolist()
+
+def get_thermal_model() -> Optional[ThermalModel]:
+    """Get the saved thermal model, or None if none has been fitted"""
+    global _model, _model_loaded
+    
+    with _model_lock:
+        if not _model_loaded:
+            _model_loaded = True
+            if os.path.exists(THERMAL_MODEL_FILE):
+                try:
+                    with open(THERMAL_MODEL_FILE) as f:
+                        _model = ThermalModel.from_dict(json.load(f))
+                except Exception as e:
+                    logger.error(f"Failed to load thermal model from {THERMAL_MODEL_FILE}: {e}")
+        return _model
+
+def save_thermal_model(model: ThermalModel):
+    """Persist a fitted model and make it the active one"""
+    global _model, _model_loaded
+    
+    with _model_lock:
+        directory = os.path.dirname(THERMAL_MODEL_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write then rename so a crash never leaves a truncated file
+        tmp_path = f"{THERMAL_MODEL_FILE}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(model.to_dict(), f, indent=2)
+        os.replace(tmp_path, THERMAL_MODEL_FILE)
+        _model = model
+        _model_loaded = True
@@ -0,0 +1,108 @@
+# Import logger first to avoid circular imports
+from logger import logger
+import json
+import os
+import threading
+from config import PID_TUNINGS_FILE, HEATER_PID_GAIN_TABLE
+
+# Autotune results closer together than this (°C) replace each other
+SETPOINT_MATCH_TOLERANCE = 5.0
+
+# --- Cached active gain table ---
+_gain_table = None
+_tunings_lock = threading.Lock()
+
+def get_gain_table():
+    """Get the active PID gain table
+    
+    Autotuned gains from PID_TUNINGS_FILE take precedence over
+    HEATER_PID_GAIN_TABLE from config.py.
+    
+    Returns:
+        tuple of (upper bound °C, kp, ki, kd) rows sorted by bound
+    """
+    global _gain_table
+    
+    with _tunings_lock:
+        if _gain_table is None:
+            results = _load_results()
+            _gain_table = build_gain_table(results) if results else tuple(sorted(HEATER_PID_GAIN_TABLE))
+        return _gain_table
+
+def build_gain_table(results):
+    """Turn autotune results into gain bands
+    
+    Each result covers the temperatures closest to its own setpoint: band
+    boundaries sit halfway between neighbouring setpoints and the hottest
+    band has no upper bound.
+    """
+    results = sorted(results, key=lambda result: result["setpoint"])
+    table = []
+    for index, result in enumerate(results):
+        if index + 1 < len(results):
+            upper = (result["setpoint"] + results[index + 1]["setpoint"]) / 2.0
+        else:
+            upper = float("inf")
+        tunings = result["tunings"]
+        table.append((upper, tunings["kp"], tunings["ki"], tunings["kd"]))
+    return tuple(table)
+
+def save_autotune_result(result: dict):
+    """Persist an autotune result and make its gains active
+    
+    A previous result for a setpoint within SETPOINT_MATCH_TOLERANCE is replaced.
+    """
+    global _gain_table
+    
+    with _tunings_lock:
+        results = [
+            existing for existing in _load_results()
+            if abs(existing["setpoint"] - result["setpoint"]) > SETPOINT_MATCH_TOLERANCE
+        ]
+        results.append(result)
+        
+        directory = os.path.dirname(PID_TUNINGS_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write then rename so a crash never leaves a truncated file
+        tmp_path = f"{PID_TUNINGS_FILE}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"autotune_results": results}, f, indent=2)
+        os.replace(tmp_path, PID_TUNINGS_FILE)
+        
+        _gain_table = build_gain_table(results)
+    logger.info(f"Saved autotuned PID gains for {result['setpoint']}°C to {PID_TUNINGS_FILE}")
+
+def clear_tunings():
+    """Delete saved autotune results and fall back to HEATER_PID_GAIN_TABLE"""
+    global _gain_table
+    
+    with _tunings_lock:
+        if os.path.exists(PID_TUNINGS_FILE):
+            os.remove(PID_TUNINGS_FILE)
+        _gain_table = None
+    logger.info("Cleared autotuned PID gains")
+
+def get_tunings_info():
+    """Get the active gain table and where it came from"""
+    results = _load_results()
+    return {
+        "source": "autotune" if results else "config",
+        "file": PID_TUNINGS_FILE,
+        "gain_table": gain_table_to_json(get_gain_table()),
+        "autotune_results": results
+    }
+
+def gain_table_to_json(table):
+    """Gain table rows as JSON-safe lists, with null for the unbounded top band"""
+    return [[None if upper == float("inf") else upper, kp, ki, kd] for upper, kp, ki, kd in table]
+
+def _load_results():
+    if not os.path.exists(PID_TUNINGS_FILE):
+        return []
+    try:
+        with open(PID_TUNINGS_FILE) as f:
+            return json.load(f).get("autotune_results", [])
+    except Exception as e:
+        logger.error(f"Failed to read PID tunings from {PID_TUNINGS_FILE}: {e}")
+        return []
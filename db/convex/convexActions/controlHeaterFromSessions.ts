@@ -1,7 +1,8 @@
 import { internalAction } from "../_generated/server";
 import { api } from "../_generated/api";
 
-// Internal action to control heater based on active cooking sessions
+// Internal action to drive the API's closed-loop heater controller from active cooking sessions.
+// The loop runs on the API server; this only starts it, keeps its target in sync and stops it.
 export default internalAction({
   handler: async (ctx) => {
     // Get API URL from Convex environment variables
@@ -18,48 +19,37 @@ export default internalAction({
         api.queries.getActiveCookingSession.default
       );
 
-      if (!activeSessions) {
-        // No active cooking session, turn off heater
-        console.log("No active cooking session found, turning off heater");
-        await turnOffHeater(API_BASE_URL);
+      const loopStatus = await getLoopStatus(API_BASE_URL);
+      if (!loopStatus) {
         return;
       }
 
-      console.log(
-        `Active cooking session found: ${activeSessions.recipeName}, target temp: ${activeSessions.targetTemp}°C`
-      );
-
-      // Call heater control API to determine if heater should be on
-      const heaterControlResponse = await fetch(
-        `${API_BASE_URL}/heater/control`,
-        {
-          method: "POST",
-          headers: {
-            "Content-Type": "application/json",
-          },
-          body: JSON.stringify({
-            target_temperature: activeSessions.targetTemp,
-          }),
+      if (!activeSessions) {
+        // No active cooking session, stop the control loop if it is running
+        if (loopStatus.running) {
+          console.log("No active cooking session found, stopping heater control loop");
+          await postLoop(API_BASE_URL, "stop");
         }
-      );
-
-      if (!heaterControlResponse.ok) {
-        console.error(
-          `Heater control API failed: ${heaterControlResponse.status}`
-        );
         return;
       }
 
-      const heaterControlData = await heaterControlResponse.json();
       console.log(
-        `Heater control response: heater_should_be_on=${heaterControlData.heater_should_be_on}, current_temp=${heaterControlData.current_temperature}°C`
+        `Active cooking session found: ${activeSessions.recipeName}, target temp: ${activeSessions.targetTemp}°C`
       );
 
-      // Control heater based on PID controller decision
-      if (heaterControlData.heater_should_be_on) {
-        await turnOnHeater(API_BASE_URL);
+      if (!loopStatus.running) {
+        await postLoop(API_BASE_URL, "start", {
+          target_temperature: activeSessions.targetTemp,
+          mode: "both",
+        });
+      } else if (loopStatus.target_temperature !== activeSessions.targetTemp) {
+        await postLoop(API_BASE_URL, "target", {
+          target_temperature: activeSessions.targetTemp,
+        });
       } else {
-        await turnOffHeater(API_BASE_URL);
+        console.log(
+          `Heater control loop running: setpoint=${loopStatus.setpoint}°C, current_temp=${loopStatus.current_temperature}°C, heater_on=${loopStatus.heater_on}`
+        );
       }
     } catch (error) {
       console.error("Failed to control heater from cooking sessions:", error);
@@ -67,46 +57,43 @@ export default internalAction({
   },
 });
 
-async function turnOnHeater(apiBaseUrl: string) {
+async function getLoopStatus(apiBaseUrl: string) {
   try {
-    const response = await fetch(`${apiBaseUrl}/heater`, {
-      method: "POST",
-      headers: {
-        "Content-Type": "application/json",
-      },
-      body: JSON.stringify({
-        mode: "both",
-      }),
-    });
-
-    if (response.ok) {
-      console.log("Heater turned on successfully");
-    } else {
-      console.error(`Failed to turn on heater: ${response.status}`);
+    const response = await fetch(`${apiBaseUrl}/heater/loop/status`);
+    if (!response.ok) {
+      console.error(`Heater loop status API failed: ${response.status}`);
+      return null;
     }
+    return await response.json();
   } catch (error) {
-    console.error("Error turning on heater:", error);
+    console.error("Error getting heater loop status:", error);
+    return null;
   }
 }
 
-async function turnOffHeater(apiBaseUrl: string) {
+async function postLoop(
+  apiBaseUrl: string,
+  action: "start" | "target" | "stop",
+  body?: Record<string, unknown>
+) {
   try {
-    const response = await fetch(`${apiBaseUrl}/heater`, {
+    const response = await fetch(`${apiBaseUrl}/heater/loop/${action}`, {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
       },
-      body: JSON.stringify({
-        mode: "off",
-      }),
+      body: body ? JSON.stringify(body) : undefined,
     });
 
     if (response.ok) {
-      console.log("Heater turned off successfully");
+      console.log(`Heater control loop ${action} succeeded`);
     } else {
-      console.error(`Failed to turn off heater: ${response.status}`);
+      // 409 means something else (a recipe, autotune or the safety interlock) owns the heaters
+      console.error(
+        `Heater control loop ${action} failed: ${response.status} ${await response.text()}`
+      );
     }
   } catch (error) {
-    console.error("Error turning off heater:", error);
+    console.error(`Error calling heater control loop ${action}:`, error);
   }
 }
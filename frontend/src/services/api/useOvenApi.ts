@@ -1,4 +1,5 @@
-import { useQuery, useMutation } from "@tanstack/react-query";
+import { useEffect } from "react";
+import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
 
 // Base API URL
 const API_BASE_URL = import.meta.env.VITE_API_URL || "http://192.168.0.71:8081";
@@ -15,14 +16,31 @@ export const useHealth = () => {
 };
 
 // Get temperature
+// Live values are pushed over the telemetry SSE channel; polling is only a fallback
 export const useTemperature = () => {
+  const queryClient = useQueryClient();
+
+  useEffect(() => {
+    const source = new EventSource(`${API_BASE_URL}/telemetry/stream`);
+    source.onmessage = (event) => {
+      const frame = JSON.parse(event.data);
+      if (frame.sensor?.temperature != null) {
+        queryClient.setQueryData(["temperature"], {
+          temperature: frame.sensor.temperature,
+          unit: "celsius",
+        });
+      }
+    };
+    return () => source.close();
+  }, [queryClient]);
+
   return useQuery({
     queryKey: ["temperature"],
     queryFn: async () => {
       const response = await fetch(`${API_BASE_URL}/temperature`);
       return response.json();
     },
-    refetchInterval: 5000, // Refetch every 5 seconds
+    refetchInterval: 30000, // Fallback in case the telemetry stream drops
   });
 };
 